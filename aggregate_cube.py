@@ -0,0 +1,118 @@
+"""
+This file is the engine's summary sheet.
+Instead of rescanning every transaction on each refresh, all the dashboard numbers are read
+from a small pre-aggregated "cube": one cell per Year x Month x Category x sign, holding the
+sum and the count of the matching transactions.
+
+A cube has a few hundred cells even for years of history, so any year/month selection is
+answered by summing a handful of rows. New transactions are folded in incrementally.
+"""
+
+import numpy as np
+import pandas as pd
+
+# The dimensions of the cube. Sign is +1 (income), -1 (expense) or 0 (zero-amount rows)
+CUBE_KEYS = ['Year', 'Month_Num', 'Month', 'Category', 'Sign']
+CUBE_COLUMNS = CUBE_KEYS + ['Sum', 'Count']
+
+
+class AggregateCube:
+    def __init__(self, df: pd.DataFrame = None, amount_scale: int = 1):
+        # Amount units per shekel (100 for the compact schema, where amounts are integer agorot).
+        # Cube sums are always kept in shekels.
+        self.amount_scale = amount_scale
+        self.cells = pd.DataFrame(columns=CUBE_COLUMNS)
+        if df is not None:
+            self.cells = _cells_of(df, amount_scale)
+
+    @classmethod
+    def from_cells(cls, cells: pd.DataFrame, amount_scale: int = 1):
+        """A cube from previously computed cells (e.g. a warm-start snapshot)."""
+        cube = cls(amount_scale=amount_scale)
+        cube.cells = cells
+        return cube
+
+    def copy(self):
+        """A cube that can be updated without touching this one (cells are replaced, never edited in place)."""
+        return AggregateCube.from_cells(self.cells, self.amount_scale)
+
+    # --- INCREMENTAL UPDATES ---
+
+    def add(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Folds new transactions into the cube. Returns the cells that were added."""
+        cells = _cells_of(df, self.amount_scale)
+        self._merge(cells)
+        return cells
+
+    def remove(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Takes transactions back out of the cube (e.g. rows of a deleted file). Returns the (negated) cells."""
+        cells = _cells_of(df, self.amount_scale)
+        cells['Sum'] = -cells['Sum']
+        cells['Count'] = -cells['Count']
+        self._merge(cells)
+        return cells
+
+    def _merge(self, cells: pd.DataFrame):
+        if cells.empty:
+            return
+        if self.cells.empty:
+            self.cells = cells
+            return
+
+        merged = pd.concat([self.cells, cells], ignore_index=True)
+        merged = merged.groupby(CUBE_KEYS, observed=True, sort=False, as_index=False)[['Sum', 'Count']].sum()
+
+        # Cells whose transactions were all removed disappear
+        self.cells = merged[merged['Count'] > 0].reset_index(drop=True)
+
+    # --- QUERIES ---
+
+    def select(self, year="All Years", month="All Months") -> pd.DataFrame:
+        """The cells of a year/month selection."""
+        cells = self.cells
+        if year != "All Years":
+            cells = cells[cells['Year'] == year]
+        if month != "All Months":
+            cells = cells[cells['Month'] == month]
+        return cells
+
+    def kpis(self, year, month):
+        """Total income (positive) and total expense (negative) of a selection."""
+        cells = self.select(year, month)
+        total_income = cells.loc[cells['Sign'] > 0, 'Sum'].sum()
+        total_expense = cells.loc[cells['Sign'] < 0, 'Sum'].sum()
+        return total_income, total_expense
+
+    def category_totals(self, year, month, sign) -> pd.Series:
+        """Absolute amount per category for one sign (+1 income, -1 expense), largest first."""
+        cells = self.select(year, month)
+        cells = cells[cells['Sign'] == sign]
+        totals = cells.groupby('Category', observed=True)['Sum'].sum().abs()
+        return totals.sort_values(ascending=False, kind='stable')
+
+    def monthly_trend(self, year) -> pd.DataFrame:
+        """Income and (positive) expense per month, oldest first."""
+        cells = self.select(year)
+        if cells.empty:
+            return pd.DataFrame(columns=['Year', 'Month_Num', 'Month', 'Income', 'Expense'])
+
+        cells = cells.assign(
+            Income=cells['Sum'].where(cells['Sign'] > 0, 0),
+            Expense=-cells['Sum'].where(cells['Sign'] < 0, 0),
+        )
+        monthly = cells.groupby(['Year', 'Month_Num', 'Month'], observed=True, as_index=False)[['Income', 'Expense']].sum()
+        return monthly.sort_values(['Year', 'Month_Num'], kind='stable').reset_index(drop=True)
+
+
+def _cells_of(df: pd.DataFrame, amount_scale: int = 1) -> pd.DataFrame:
+    """Aggregates raw transactions into cube cells."""
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    amount = df['Amount'].to_numpy()
+    sign = np.sign(amount).astype('int8')
+    if amount_scale != 1:
+        amount = amount / amount_scale
+
+    grouped = df.assign(Sign=sign, Amount=amount).groupby(CUBE_KEYS, observed=True, sort=False)['Amount']
+    return grouped.agg(Sum='sum', Count='size').reset_index()
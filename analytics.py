@@ -0,0 +1,170 @@
+"""
+This file is the engine's ledger book.
+It keeps a dense NumPy matrix with one row per calendar month and one column per category
+(income and expense sums, in shekels), so trends over time are whole-array operations instead of
+regrouping the transactions on every request:
+running balance (cumulative sums), 3/6/12-month rolling averages (differences of the prefix sums)
+and year-over-year changes (the monthly totals against themselves 12 rows earlier).
+
+The matrix is filled from the aggregate cube cells. Months without transactions are zero rows,
+so every window really spans N calendar months. New cells are folded in incrementally: the prefix
+sums are only recomputed from the first month that changed, so appending a month is cheap.
+"""
+
+import calendar
+
+import numpy as np
+import pandas as pd
+
+
+class MonthlyMatrix:
+    def __init__(self, cells: pd.DataFrame = None):
+        # Month index (year * 12 + month - 1) of row 0, None while empty
+        self.first_month = None
+        self.categories = []
+        self._columns = {}
+
+        # Positive sums per month x category, and their prefix sums (one extra leading zero row)
+        self.income = np.zeros((0, 0))
+        self.expense = np.zeros((0, 0))
+        self._cum_income = np.zeros((1, 0))
+        self._cum_expense = np.zeros((1, 0))
+
+        if cells is not None:
+            self.add(cells)
+
+    def copy(self):
+        """A matrix that can be updated without touching this one."""
+        other = MonthlyMatrix()
+        other.first_month = self.first_month
+        other.categories = list(self.categories)
+        other._columns = dict(self._columns)
+        other.income, other.expense = self.income.copy(), self.expense.copy()
+        other._cum_income, other._cum_expense = self._cum_income.copy(), self._cum_expense.copy()
+        return other
+
+    # --- INCREMENTAL UPDATES ---
+
+    def add(self, cells: pd.DataFrame):
+        """Folds aggregate cube cells in. Cells with negated sums (AggregateCube.remove) take rows back out."""
+        if cells is None or cells.empty:
+            return
+
+        months = pd.to_numeric(cells['Year']).to_numpy(dtype=np.int64) * 12 + pd.to_numeric(cells['Month_Num']).to_numpy(dtype=np.int64) - 1
+        columns = self._column_numbers(cells['Category'])
+        first_changed = self._cover_months(months.min(), months.max())
+
+        rows = months - self.first_month
+        sums = cells['Sum'].to_numpy(dtype=float)
+        sign = cells['Sign'].to_numpy()
+        income, expense = sign > 0, sign < 0
+        np.add.at(self.income, (rows[income], columns[income]), sums[income])
+        np.add.at(self.expense, (rows[expense], columns[expense]), -sums[expense])
+
+        self._update_prefix_sums(min(first_changed, rows.min()))
+
+    def _column_numbers(self, categories) -> np.ndarray:
+        """Column of every category, new categories get a new (zero) column."""
+        names = pd.Series(categories).astype(str)
+        new = [c for c in names.unique() if c not in self._columns]
+        if new:
+            for name in new:
+                self._columns[name] = len(self.categories)
+                self.categories.append(name)
+            pad = ((0, 0), (0, len(new)))
+            self.income, self.expense = np.pad(self.income, pad), np.pad(self.expense, pad)
+            self._cum_income, self._cum_expense = np.pad(self._cum_income, pad), np.pad(self._cum_expense, pad)
+        return names.map(self._columns).to_numpy(dtype=np.int64)
+
+    def _cover_months(self, first, last) -> int:
+        """Grows the matrix to span first..last. Returns the first row whose prefix sums are out of date."""
+        if self.first_month is None:
+            self.first_month = first
+        n = len(self.income)
+
+        before = max(0, self.first_month - first)
+        after = max(0, last - (self.first_month + n - 1))
+        if before or after:
+            pad = ((before, after), (0, 0))
+            self.income, self.expense = np.pad(self.income, pad), np.pad(self.expense, pad)
+            self._cum_income, self._cum_expense = np.pad(self._cum_income, pad), np.pad(self._cum_expense, pad)
+            self.first_month -= before
+
+        # Earlier months shift every prefix sum, later ones only need their own rows filled in
+        return 0 if before else n
+
+    def _update_prefix_sums(self, start):
+        self._cum_income[start + 1:] = self._cum_income[start] + np.cumsum(self.income[start:], axis=0)
+        self._cum_expense[start + 1:] = self._cum_expense[start] + np.cumsum(self.expense[start:], axis=0)
+
+    # --- QUERIES ---
+
+    def running_balance(self, year="All Years"):
+        """Labels and the cumulative net (income - expense) since the first month, for the months of a year."""
+        rows = self._rows_of(year)
+        balance = self._cum_income[1:].sum(axis=1) - self._cum_expense[1:].sum(axis=1)
+        return self._labels(rows), _as_list(balance[rows])
+
+    def rolling_average(self, window, kind="expense", year="All Years", top=5):
+        """
+        Labels and the window-month moving average of the top categories of a year (by total).
+        Months with less than a full window of history before them are None.
+        """
+        rows = self._rows_of(year)
+        values, cum = (self.expense, self._cum_expense) if kind == "expense" else (self.income, self._cum_income)
+        if not len(values):
+            return [], {}
+
+        # Window sums straight from the prefix sums: cum[i + 1] - cum[i + 1 - window]
+        averages = np.full(values.shape, np.nan)
+        if len(values) >= window:
+            averages[window - 1:] = (cum[window:] - cum[:-window]) / window
+
+        totals = values[rows].sum(axis=0)
+        order = np.argsort(-totals, kind='stable')[:top]
+        series = {self.categories[c]: _as_list(averages[rows, c]) for c in order if totals[c] > 0}
+        return self._labels(rows), series
+
+    def year_over_year(self, year="All Years", kind="expense"):
+        """
+        Month by month totals of a year and of the year before, and the change in percent.
+        'All Years' compares the latest year in the data. Months outside the data are None.
+        """
+        if self.first_month is None:
+            return None, [], [], [], []
+        if year == "All Years":
+            year = (self.first_month + len(self.income) - 1) // 12
+
+        values = self.expense if kind == "expense" else self.income
+        totals = values.sum(axis=1)
+
+        def months_of(y):
+            rows = np.arange(int(y) * 12, int(y) * 12 + 12) - self.first_month
+            inside = (rows >= 0) & (rows < len(totals))
+            out = np.full(12, np.nan)
+            out[inside] = totals[rows[inside]]
+            return out
+
+        current, previous = months_of(year), months_of(int(year) - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+
+        labels = list(calendar.month_abbr[1:])
+        return int(year), labels, _as_list(current), _as_list(previous), _as_list(np.round(change, 1))
+
+    def _rows_of(self, year) -> slice:
+        """Matrix rows of a year ('All Years' = every row)."""
+        if year == "All Years" or self.first_month is None:
+            return slice(0, len(self.income))
+        start = min(max(int(year) * 12 - self.first_month, 0), len(self.income))
+        stop = min(max(int(year) * 12 + 12 - self.first_month, 0), len(self.income))
+        return slice(start, stop)
+
+    def _labels(self, rows):
+        months = range(self.first_month or 0, (self.first_month or 0) + len(self.income))[rows]
+        return [f"{calendar.month_abbr[m % 12 + 1]} {m // 12}" for m in months]
+
+
+def _as_list(values):
+    """A chart-ready list: rounded floats, None for missing values."""
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
@@ -0,0 +1,62 @@
+"""
+Benchmark: the vectorized CategoryClassifier against the original row-by-row
+data_loader._get_category (Series.apply) path.
+
+Usage: python benchmarks/bench_classifier.py [--rows 200000] [--merchants 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+# Let the script run from the repo root or from inside benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import data_loader
+from category_classifier import CategoryClassifier
+from create_demo_files import MERCHANTS
+
+
+def make_descriptions(rows: int, merchants: int, seed: int = 42) -> pd.Series:
+    """Card-statement style descriptions: a known merchant plus a branch/terminal suffix."""
+    rng = random.Random(seed)
+    names = [m for group in MERCHANTS.values() for m in group] + ['כרטיסי אשראי', 'משכורת', 'Unknown Shop']
+    pool = [f"{rng.choice(names)} {rng.randint(1, 999)}" for _ in range(merchants)]
+    return pd.Series([rng.choice(pool) for _ in range(rows)])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--merchants', type=int, default=2_000)
+    args = parser.parse_args()
+
+    descs = make_descriptions(args.rows, args.merchants)
+    print(f"{args.rows:,} rows, {descs.nunique():,} unique descriptions")
+
+    expected, t_apply = timed(descs.apply, data_loader._get_category)
+
+    classifier = CategoryClassifier(config.CATEGORY_RULES)
+    cold, t_cold = timed(classifier.classify_series, descs)
+    warm, t_warm = timed(classifier.classify_series, descs)
+
+    assert (cold == expected).all() and (warm == expected).all(), "classifier disagrees with _get_category"
+
+    print(f"apply(_get_category) : {t_apply * 1000:9.1f} ms")
+    print(f"classifier (cold)    : {t_cold * 1000:9.1f} ms  ({t_apply / t_cold:6.1f}x)")
+    print(f"classifier (warm)    : {t_warm * 1000:9.1f} ms  ({t_apply / t_warm:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
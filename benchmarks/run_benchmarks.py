@@ -0,0 +1,171 @@
+"""
+Benchmark suite: ingestion and dashboard queries on synthetic data at several sizes.
+
+For every size a statement folder is generated with create_demo_files.generate, then
+load_data_folder, _read_smart, _get_category, the merchant index (cold and warm), filter_data, get_kpis,
+get_category_breakdown, get_monthly_trend and the category drill-down are timed. Results are written as JSON,
+so runs can be compared to catch regressions.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 10k,1M,10M] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Let the script run from the repo root or from inside benchmarks/
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import config
+import data_loader
+from create_demo_files import generate
+from finance_engine import FinanceEngine
+
+SIZE_SUFFIXES = {'k': 1_000, 'M': 1_000_000}
+
+# Row-by-row _get_category is far too slow for millions of rows, it is timed on a sample
+CATEGORY_SAMPLE_ROWS = 100_000
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def timed(func, *args, repeat=1):
+    """Runs func repeat times, returns the last result and the median seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def make_dataset(folder: str, rows: int, args) -> list:
+    """Spreads the requested rows over years x 12 months x accounts files."""
+    files_per_month = args.accounts + 1  # card accounts plus one bank account
+    rows_per_file = max(1, rows // (args.years * 12 * files_per_month))
+    years = list(range(2024 - args.years + 1, 2025))
+    return generate(folder, years, accounts=args.accounts, rows=rows_per_file, merchants=args.merchants,
+                    file_format=args.format, encoding=args.encoding, junk_rows=args.junk_rows, seed=42)
+
+
+def bench_size(label: str, rows: int, args) -> list:
+    results = []
+
+    def record(name, seconds, **extra):
+        results.append({"size": label, "metric": name, "seconds": round(seconds, 6), **extra})
+        print(f"  {name:<28} {seconds * 1000:12.1f} ms")
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as folder:
+        files, t = timed(make_dataset, folder, rows, args)
+        print(f"[{label}] generated {len(files)} files in {t:.1f}s")
+
+        # --- INGESTION ---
+        master_df, t = timed(data_loader.load_data_folder, folder, False)
+        record("load_data_folder", t, rows=len(master_df), files=len(files))
+
+        largest = max(files, key=os.path.getsize)
+        raw_df, t = timed(data_loader._read_smart, largest, repeat=args.repeat)
+        record("_read_smart", t, rows=len(raw_df), file_bytes=os.path.getsize(largest))
+
+        descs = master_df['Desc']
+        sample = descs.iloc[:CATEGORY_SAMPLE_ROWS]
+        _, t = timed(sample.apply, data_loader._get_category)
+        record("_get_category", t, rows=len(sample))
+
+        # A fresh index, so canonicalizing and classifying every merchant is part of the timing
+        index = data_loader.MerchantIndex(config.CATEGORY_RULES, config.MERCHANT_BRANCH_WORDS,
+                                          config.MERCHANT_FUZZY_THRESHOLD, config.MERCHANT_FUZZY_MIN_LENGTH)
+        _, t = timed(index.classify_series, descs)
+        record("merchant_classify[cold]", t, rows=len(descs), merchants=len(index.names))
+        _, t = timed(index.classify_series, descs, repeat=args.repeat)
+        record("merchant_classify[warm]", t, rows=len(descs))
+
+        # --- ENGINE ---
+        engine = FinanceEngine()
+        _, t = timed(engine.set_data, data_loader.IngestReport(master_df))
+        record("engine_build", t, rows=len(master_df))
+
+        year = engine.available_years[-1]
+        selections = [("all", "All Years", "All Months"), ("year", year, "All Months"), ("month", year, "March")]
+        for name, sel_year, sel_month in selections:
+            _, t = timed(engine.filter_data, sel_year, sel_month, repeat=args.repeat)
+            record(f"filter_data[{name}]", t, rows=len(engine.active_df))
+
+            # The undecorated methods, so the result cache does not hide the real cost
+            queries = [
+                ("get_kpis", FinanceEngine.get_kpis.__wrapped__, ()),
+                ("get_category_breakdown", FinanceEngine.get_category_breakdown.__wrapped__, ("expense",)),
+                ("get_monthly_trend", FinanceEngine.get_monthly_trend.__wrapped__, ()),
+                ("get_transactions_page", FinanceEngine.get_transactions_page.__wrapped__, ("Groceries",)),
+            ]
+            for query, method, query_args in queries:
+                _, t = timed(method, engine, *query_args, repeat=args.repeat)
+                record(f"{query}[{name}]", t)
+
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10k,1M,10M', help="comma separated row counts (k/M suffixes)")
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--accounts', type=int, default=2, help="credit card accounts")
+    parser.add_argument('--merchants', type=int, default=5_000, help="distinct merchant names")
+    parser.add_argument('--format', choices=['csv', 'xlsx', 'mixed'], default='csv')
+    parser.add_argument('--encoding', choices=['utf-8-sig', 'utf-8', 'cp1255', 'mixed'], default='mixed')
+    parser.add_argument('--junk-rows', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per fast operation (median is reported)")
+    parser.add_argument('--workdir', default=None, help="where the generated data goes (default: system temp)")
+    parser.add_argument('--output', default=None, help="JSON results file (default: print only)")
+    args = parser.parse_args()
+
+    results = []
+    for label in args.sizes.split(','):
+        results.extend(bench_size(label.strip(), parse_size(label), args))
+
+    payload = {"environment": environment(), "params": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=1)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(payload, indent=1))
+
+
+if __name__ == "__main__":
+    main()
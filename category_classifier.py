@@ -0,0 +1,87 @@
+"""
+This file is the sorting machine of the assembly line.
+It compiles the rule book (config.CATEGORY_RULES) once into a single regex and classifies
+whole description columns at once instead of looping over every keyword for every row.
+
+Precedence is the same as data_loader._get_category: the first category (in rule book order)
+that has a keyword inside the description wins.
+"""
+
+import re
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Other'
+
+# Merchant names repeat heavily, so results are memoized per unique description.
+# The memo is simply dropped when it grows past this size.
+MAX_MEMO_SIZE = 200_000
+
+
+class CategoryClassifier:
+    def __init__(self, rules: Dict[str, List[str]], default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self.categories = list(rules)
+        self.rules_key = rules_key(rules)
+
+        # Every keyword gets the rank of the first category that lists it
+        self._rank = {}
+        for rank, keywords in enumerate(rules.values()):
+            for k in keywords:
+                self._rank.setdefault(k, rank)
+
+        # One combined pattern. The lookahead makes it report a match at *every* position,
+        # and since alternatives are ordered by rank, each position reports its best keyword.
+        # The lowest rank over all positions is exactly the "first rule wins" answer.
+        keywords = sorted(self._rank, key=lambda k: (self._rank[k], -len(k)))
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))") if keywords else None
+
+        self._memo: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def classify(self, desc) -> str:
+        """Classifies a single description."""
+        desc = str(desc)
+        category = self._memo.get(desc)
+        if category is not None:
+            self.hits += 1
+            return category
+
+        self.misses += 1
+        category = self._match(desc.upper())
+
+        if len(self._memo) >= MAX_MEMO_SIZE:
+            self._memo.clear()
+        self._memo[desc] = category
+        return category
+
+    def classify_series(self, descs: pd.Series) -> pd.Series:
+        """Classifies a whole column. Only the unique descriptions are ever matched."""
+        codes, uniques = pd.factorize(descs)
+
+        # Missing values (code -1) land on the extra slot at the end, like str(nan) does in _get_category
+        labels = [self.classify(u) for u in uniques] + [self.classify(np.nan)]
+        labels = np.array(labels, dtype=object)
+
+        return pd.Series(labels[codes], index=descs.index)
+
+    def _match(self, upper_desc: str) -> str:
+        if self._pattern is None:
+            return self.default
+
+        best = None
+        for keyword in self._pattern.findall(upper_desc):
+            rank = self._rank[keyword]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0: break
+
+        return self.default if best is None else self.categories[best]
+
+
+def rules_key(rules: Dict[str, List[str]]) -> tuple:
+    """Hashable snapshot of a rule book, used to notice when the rules were edited."""
+    return tuple((cat, tuple(keywords)) for cat, keywords in rules.items())
@@ -1,4 +1,5 @@
 # config.py
+import os
 
 # --- 1. SYSTEM CONFIGURATION ---
 DATA_FOLDER = r"D:\AI\Financial_Dashboard\demo_data"
@@ -67,4 +68,109 @@ CATEGORY_ICONS = {
     'Education': 'school',
     'Travel': 'flight',
     'Other': 'attach_money'
-}
\ No newline at end of file
+}
+
+# --- 5. INGESTION CACHE ---
+# The loader remembers every file it parsed (manifest + Parquet copy of the clean rows).
+# On the next start only new or changed files are parsed again.
+USE_INGEST_CACHE = True
+CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# --- 6. PARALLEL INGESTION ---
+# Number of worker processes used to parse files that are not in the cache.
+# None = one per CPU core. Batches smaller than PARALLEL_MIN_FILES are parsed in-process.
+INGEST_WORKERS = None
+PARALLEL_MIN_FILES = 8
+
+# --- 7. QUERY RESULT CACHE ---
+# How many query results (KPIs, breakdowns, trends, drill-downs) FinanceEngine keeps in its LRU cache
+QUERY_CACHE_SIZE = 256
+# Memory budget of that cache. Least recently used results are evicted beyond it
+QUERY_CACHE_MAX_MB = 64
+
+# --- 8. COMPACT SCHEMA ---
+# Store master data with small ints, categoricals and integer agorot instead of strings and floats.
+# Cuts memory a lot on millions of rows. FinanceEngine.memory_report shows the before/after bytes.
+COMPACT_SCHEMA = False
+
+# --- 9. LIVE RELOAD ---
+# Watch DATA_FOLDER and hot-reload only the files that were added, changed or removed.
+# Uses the optional 'watchdog' package for file events when installed, otherwise polls.
+WATCH_DATA_FOLDER = True
+WATCH_POLL_SECONDS = 2.0
+# A burst of file drops is collected until the folder has been quiet this long
+WATCH_DEBOUNCE_SECONDS = 1.5
+
+# --- 10. STREAMING INGESTION ---
+# Files of at least STREAM_MIN_FILE_MB are read in chunks of STREAM_CHUNK_ROWS rows,
+# so a multi-year export never has to fit in memory in raw form.
+# This bounds the raw read only: the file's normalized rows are still held together in memory
+STREAM_MIN_FILE_MB = 64
+STREAM_CHUNK_ROWS = 50_000
+
+# --- 11. STORAGE BACKEND ---
+# "memory": master data is loaded into pandas on every start (default).
+# "sqlite": normalized rows are kept in a local SQLite file and every query runs as SQL,
+#           so startup is near-instant and memory does not grow with years of history.
+#           With RECONCILE, a sync that changes files reads back the stored rows they can affect (same account and
+#           dates, card months they add to or pay) to reconcile them with the new ones.
+STORE_BACKEND = "memory"
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "transactions.sqlite")
+
+# --- 12. METRICS & PROFILING ---
+# Stage timings and counters are always recorded (see metrics.py and the /admin page).
+# How many past runs (ingestions, engine builds) the admin page keeps
+METRICS_HISTORY = 20
+# Measure peak memory of every run with tracemalloc. Accurate, but slows ingestion down noticeably
+METRICS_TRACE_MEMORY = False
+# Profile every run: None, "cprofile" or "pyinstrument" (optional package)
+PROFILER = None
+
+# --- 13. WARM START ---
+# On shutdown master data and aggregates are written to SNAPSHOT_FOLDER. The next start serves the
+# dashboard from there (after checking the folder for changed files) instead of re-ingesting everything.
+WARM_START = True
+SNAPSHOT_FOLDER = os.path.join(CACHE_FOLDER, "snapshot")
+
+# --- 14. TREND ANALYTICS ---
+# Rolling average windows (months) offered by the trend charts, and how many categories they draw
+ROLLING_WINDOWS = [3, 6, 12]
+TREND_TOP_CATEGORIES = 5
+
+# --- 15. MERCHANT INDEX ---
+# Descriptions are canonicalized to a merchant name before classification: case, digits, punctuation,
+# Hebrew final letters, niqqud and direction marks, and trailing branch words like the ones below.
+# "Dominos Pizza" and "DOMINOS TLV 123" are then one merchant, classified once.
+MERCHANT_BRANCH_WORDS = [
+    'TLV', 'TEL AVIV', 'JLM', 'JERUSALEM', 'HAIFA', 'BRANCH', 'LTD', 'INC',
+    'סניף', 'תל אביב', 'ירושלים', 'חיפה', 'בעמ',
+]
+# Merchants no keyword matches are fuzzy matched to the keywords: a keyword matches when at least this
+# share of its trigrams occurs in the merchant name (1.0 turns fuzzy matching off).
+# Keywords shorter than MERCHANT_FUZZY_MIN_LENGTH are too ambiguous and only ever match exactly.
+MERCHANT_FUZZY_THRESHOLD = 0.7
+MERCHANT_FUZZY_MIN_LENGTH = 5
+
+# --- 16. RECONCILIATION ---
+# After all files are merged, rows that overlapping exports brought in twice are dropped, and so is the
+# bank's monthly credit card bill when the card file of that month is loaded and adds up to it (its rows itemize the bill).
+RECONCILE = True
+CARD_BILL_CATEGORY = 'Credit Cards'
+# Which card statement month a bill pays, relative to the bill's statement month (0 = same month, -1 = the month before)
+CARD_BILL_MONTH_OFFSET = 0
+# A bill is dropped only when it is within this many shekels of its card month's total. Bills further off
+# are kept (the card file may be missing rows, or the bill pays another card) and listed as unmatched
+CARD_BILL_TOLERANCE = 1.0
+
+# --- 17. PREFETCH ---
+# After a period is drawn, the periods the year/month arrows lead to are computed in the background,
+# so stepping through them is served from the query cache. Results count against QUERY_CACHE_MAX_MB.
+PREFETCH_ADJACENT = True
+PREFETCH_WORKERS = 2
+
+# --- 18. EXPORT ---
+# Target of the dashboard's export button and of `python exporter.py`: Year/Month partitioned files
+# of the normalized rows, "parquet" or "csv" (gzip). EXPORT_COLUMNS = None exports every column.
+EXPORT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "export")
+EXPORT_FORMAT = "parquet"
+EXPORT_COLUMNS = None
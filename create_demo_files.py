@@ -1,11 +1,13 @@
 import pandas as pd
 import numpy as np
 import os
+import argparse
 import calendar
 import random
-from datetime import datetime, timedelta
 
 # --- CONFIGURATION ---
+# Defaults reproduce the small demo folder. Every knob can be changed from the command line,
+# e.g. a big benchmark set: python create_demo_files.py --output bench_data --years 5 --accounts 3 --rows 20000
 OUTPUT_DIR = "demo_data"
 YEARS = [2024, 2025]
 
@@ -21,89 +23,195 @@ MERCHANTS = {
     'Income': ['Salary - Tech Corp', 'Salary - Freelance', 'Bit Transfer', 'Refund']
 }
 
+# Lines some banks print above the real table (title, account number, export date).
+# None of them contains a header keyword, so the loader has to skip them.
+JUNK_HEADER_LINES = [
+    'דוח תנועות בחשבון',
+    'מספר חשבון: 12-345-678901',
+    'הופק ביום 01/01/2026',
+    'Account Statement Export',
+]
+
 def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-def random_date(year, month):
+def random_dates(rng, year, month, n):
+    """n random days of the month (vectorized, so big files are quick to generate)."""
     # Get random day in month
     num_days = calendar.monthrange(year, month)[1]
-    day = random.randint(1, num_days)
-    return datetime(year, month, day).strftime("%d-%m-%Y") # Israel format
+    days = pd.to_datetime(f"{year}-{month:02d}-01") + pd.to_timedelta(rng.integers(0, num_days, n), unit='D')
+    return days.strftime("%d-%m-%Y") # Israel format
 
-def generate_cc_file(year, month, file_path):
-    # Generate 15-30 transactions
-    num_tx = random.randint(15, 30)
-    data = []
-    
-    for _ in range(num_tx):
-        cat = random.choice(list(MERCHANTS.keys()))
-        if cat == 'Income': continue # CC is expense only usually
-        
-        merchant = random.choice(MERCHANTS[cat])
-        amount = round(random.uniform(50, 600), 2)
-        date = random_date(year, month)
-        
-        # MaxIt Structure: תאריך עסקה, שם בית העסק, קטגוריה, סכום חיוב, הערות
-        data.append([date, merchant, cat, amount, ""])
-
-    df = pd.DataFrame(data, columns=['תאריך עסקה', 'שם בית העסק', 'קטגוריה', 'סכום חיוב', 'הערות'])
+def merchant_pool(cardinality=None, seed=0):
+    """
+    The (merchant, category) names card transactions are drawn from.
+    cardinality=None keeps the base list, otherwise branch numbers are added until there are that many
+    distinct names (e.g. 'Shufersal 117'), which is what real card statements look like.
+    """
+    base = [(m, cat) for cat, names in MERCHANTS.items() if cat != 'Income' for m in names] # CC is expense only usually
+    if not cardinality or cardinality <= len(base):
+        return base[:cardinality] if cardinality else base
+
+    rng = random.Random(seed)
+    pool = set(base)
+    while len(pool) < cardinality:
+        name, cat = rng.choice(base)
+        pool.add((f"{name} {rng.randint(1, 99999)}", cat))
+    return sorted(pool)
+
+def write_table(df, file_path, file_format='csv', encoding='utf-8-sig', junk_rows=0):
+    """Writes a statement as CSV or XLSX, optionally with junk lines above the header."""
+    junk = (JUNK_HEADER_LINES * (junk_rows // len(JUNK_HEADER_LINES) + 1))[:junk_rows]
+
+    if file_format == 'xlsx':
+        with pd.ExcelWriter(file_path) as writer:
+            if junk:
+                pd.DataFrame(junk).to_excel(writer, header=False, index=False)
+            df.to_excel(writer, startrow=len(junk), index=False)
+        return
+
+    with open(file_path, 'w', encoding=encoding, newline='') as f:
+        for line in junk:
+            f.write(line + '\n')
+        df.to_csv(f, index=False)
+
+def generate_cc_file(year, month, file_path, rows=None, merchants=None, rng=None, **write_options):
+    # Generate 15-30 transactions, unless a size was asked for
+    rng = rng or np.random.default_rng()
+    merchants = merchants or merchant_pool()
+    num_tx = rows or int(rng.integers(15, 31))
+
+    picks = rng.integers(0, len(merchants), num_tx)
+    names = np.array([m for m, _ in merchants], dtype=object)
+    cats = np.array([c for _, c in merchants], dtype=object)
+
+    # MaxIt Structure: תאריך עסקה, שם בית העסק, קטגוריה, סכום חיוב, הערות
+    df = pd.DataFrame({
+        'תאריך עסקה': random_dates(rng, year, month, num_tx),
+        'שם בית העסק': names[picks],
+        'קטגוריה': cats[picks],
+        'סכום חיוב': np.round(rng.uniform(50, 600, num_tx), 2),
+        'הערות': "",
+    })
     # Save as CSV with utf-8-sig for Hebrew support
-    df.to_csv(file_path, index=False, encoding='utf-8-sig')
+    write_table(df, file_path, **write_options)
 
-def generate_bank_file(year, month, file_path):
+def generate_bank_file(year, month, file_path, rows=None, rng=None, **write_options):
+    rng = rng or np.random.default_rng()
     data = []
-    
+
     # 1. Salary (Income)
     date = f"10-{month:02d}-{year}"
-    data.append([date, "משכורת", random.choice([18000, 19500, 21000]), 0, "העברה", "משכורת ממעסיק"])
-    
+    data.append([date, "משכורת", int(rng.choice([18000, 19500, 21000])), 0, "העברה", "משכורת ממעסיק"])
+
     # 2. Mortgage (Expense)
     date = f"15-{month:02d}-{year}"
     data.append([date, "משכנתא", 0, 4500, "הוראת קבע", "משכנתא"])
-    
+
     # 3. Credit Card Payment (Expense)
     date = f"02-{month:02d}-{year}"
-    cc_total = random.randint(3000, 6000)
+    cc_total = int(rng.integers(3000, 6001))
     data.append([date, "כרטיסי אשראי", 0, cc_total, "הרשאה לחיוב", "מקס איט"])
-    
+
     # 4. Utilities
     for util in ['Electric Co', 'Water Bill', 'Arnona TLV']:
-        if random.random() > 0.5: # Not every month
-            date = random_date(year, month)
-            amount = random.randint(200, 800)
+        if rng.random() > 0.5: # Not every month
+            date = random_dates(rng, year, month, 1)[0]
+            amount = int(rng.integers(200, 801))
             data.append([date, util, 0, amount, "הוראת קבע", "חשבונות"])
 
     # Columns: תאריך, פרטים, זכות, חובה, הפעולה, פרטים נוספים
-    df = pd.DataFrame(data, columns=['תאריך', 'פרטים', 'זכות', 'חובה', 'הפעולה', 'פרטים נוספים'])
-    df.to_csv(file_path, index=False, encoding='utf-8-sig')
+    columns = ['תאריך', 'פרטים', 'זכות', 'חובה', 'הפעולה', 'פרטים נוספים']
+    df = pd.DataFrame(data, columns=columns)
+
+    # 5. Filler lines (transfers and bills) up to the requested size
+    extra = (rows or 0) - len(df)
+    if extra > 0:
+        descs = np.array(['Bit Transfer', 'Electric Co', 'Water Bill', 'Bezeq', 'Refund'], dtype=object)
+        picks = rng.integers(0, len(descs), extra)
+        is_credit = np.isin(descs[picks], ['Bit Transfer', 'Refund'])
+        amounts = rng.integers(20, 2000, extra)
+        filler = pd.DataFrame({
+            'תאריך': random_dates(rng, year, month, extra),
+            'פרטים': descs[picks],
+            'זכות': np.where(is_credit, amounts, 0),
+            'חובה': np.where(is_credit, 0, amounts),
+            'הפעולה': "העברה",
+            'פרטים נוספים': "",
+        })
+        df = pd.concat([df, filler], ignore_index=True)
+
+    write_table(df, file_path, **write_options)
+
+def generate(output_dir=OUTPUT_DIR, years=YEARS, accounts=1, bank_accounts=1, rows=None, merchants=None,
+             file_format='csv', encoding='utf-8-sig', junk_rows=0, seed=None):
+    """
+    Writes one statement per account per month into output_dir/<year>/ and returns the written paths.
+    file_format / encoding may be 'mixed', which alternates between the options file by file.
+    """
+    rng = np.random.default_rng(seed)
+    pool = merchant_pool(merchants, seed or 0)
+    formats = ['csv', 'xlsx'] if file_format == 'mixed' else [file_format]
+    encodings = ['utf-8-sig', 'utf-8', 'cp1255'] if encoding == 'mixed' else [encoding]
+
+    written = []
+    def options():
+        n = len(written)
+        return dict(file_format=formats[n % len(formats)], encoding=encodings[n % len(encodings)], junk_rows=junk_rows)
 
-def main():
     # 1. Create main Data folder
-    ensure_dir(OUTPUT_DIR)
-    print(f"Generating demo data in '{OUTPUT_DIR}'...")
-    
-    for year in YEARS:
+    ensure_dir(output_dir)
+
+    for year in years:
         # 2. Create Year Folder (e.g., demo_data/2024)
-        year_folder = os.path.join(OUTPUT_DIR, str(year))
+        year_folder = os.path.join(output_dir, str(year))
         ensure_dir(year_folder)
-        
+
         for month in range(1, 13):
             month_name = calendar.month_name[month].lower()
-            
+
             # 3. Generate Credit Card (_maxit style) inside the year folder
-            # Naming format: 1_january_2024_maxit.csv
-            cc_filename = f"{month}_{month_name}_{year}_maxit.csv"
-            cc_path = os.path.join(year_folder, cc_filename)
-            generate_cc_file(year, month, cc_path)
-            
+            # Naming format: 1_january_2024_maxit.csv (more cards: 1_january_2024_card2.csv)
+            for account in range(1, accounts + 1):
+                write = options()
+                suffix = "maxit" if account == 1 else f"card{account}"
+                cc_path = os.path.join(year_folder, f"{month}_{month_name}_{year}_{suffix}.{write['file_format']}")
+                generate_cc_file(year, month, cc_path, rows=rows, merchants=pool, rng=rng, **write)
+                written.append(cc_path)
+
             # 4. Generate Bank file inside the year folder
-            # Naming format: 1_january_2024.csv
-            bank_filename = f"{month}_{month_name}_{year}.csv"
-            bank_path = os.path.join(year_folder, bank_filename)
-            generate_bank_file(year, month, bank_path)
-            
-    print(f"Done! Created data for years: {YEARS}")
+            # Naming format: 1_january_2024.csv (more banks: 1_january_2024_bank2.csv)
+            for account in range(1, bank_accounts + 1):
+                write = options()
+                suffix = "" if account == 1 else f"_bank{account}"
+                bank_path = os.path.join(year_folder, f"{month}_{month_name}_{year}{suffix}.{write['file_format']}")
+                generate_bank_file(year, month, bank_path, rows=rows, rng=rng, **write)
+                written.append(bank_path)
+
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates synthetic bank and credit card statements.")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="target folder")
+    parser.add_argument('--years', type=int, default=len(YEARS), help="number of years")
+    parser.add_argument('--start-year', type=int, default=YEARS[0])
+    parser.add_argument('--accounts', type=int, default=1, help="credit card accounts (one file per month each)")
+    parser.add_argument('--bank-accounts', type=int, default=1, help="bank accounts (one file per month each)")
+    parser.add_argument('--rows', type=int, default=None, help="rows per file (default: 15-30 card rows, a few bank rows)")
+    parser.add_argument('--merchants', type=int, default=None, help="distinct merchant names (default: the base list)")
+    parser.add_argument('--format', dest='file_format', choices=['csv', 'xlsx', 'mixed'], default='csv')
+    parser.add_argument('--encoding', choices=['utf-8-sig', 'utf-8', 'cp1255', 'mixed'], default='utf-8-sig', help="CSV encoding")
+    parser.add_argument('--junk-rows', type=int, default=0, help="junk lines above the header row")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    years = list(range(args.start_year, args.start_year + args.years))
+    print(f"Generating demo data in '{args.output}'...")
+
+    written = generate(args.output, years, args.accounts, args.bank_accounts, args.rows, args.merchants,
+                       args.file_format, args.encoding, args.junk_rows, args.seed)
+    print(f"Done! Created {len(written)} files for years: {years}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
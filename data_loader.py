@@ -6,72 +6,557 @@ It will return a single perfectly uniform pandas dataframe ready for analysi
 
 
 import pandas as pd
+import numpy as np
+import codecs
 import glob
+import io
 import os
 import re
 import calendar
-from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from pandas.api.types import union_categoricals
+from pandas.io.common import dedup_names
 import config  # We use the config file we just created
+import metrics
+from category_classifier import rules_key
+from merchant_index import MerchantIndex
+from reconciler import Reconciliation, account_of, card_bill_periods, reconcile
+from ingest_cache import IngestCache
+from transaction_store import TransactionStore
 
 # Constants for column standardization
-REQUIRED_COLUMNS = ['Date', 'Year', 'Month', 'Month_Num', 'Desc', 'Category', 'Amount', 'Source_Type']
+REQUIRED_COLUMNS = ['Date', 'Year', 'Month', 'Month_Num', 'Desc', 'Category', 'Amount', 'Source_Type', 'Source_File']
 
-def load_data_folder(folder_path: str) -> pd.DataFrame:
+# Header detection: the first row (within the first HEADER_SCAN_ROWS) containing one of these is the header
+HEADER_KEYWORDS = ['תאריך', 'Date', 'שם בית עסק', 'Description', 'פרטים']
+HEADER_SCAN_ROWS = 20
+
+# Canonical merchants and their categories, see get_merchant_index()
+_MERCHANT_INDEX: Optional[MerchantIndex] = None
+
+@dataclass
+class FileResult:
+    """What happened to a single file during ingestion."""
+    path: str
+    rows: int = 0
+    bytes: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+    # Modification time when the file was read, None if it could not be
+    mtime: Optional[float] = None
+    # Milliseconds per stage (sniff, parse, normalize...), empty for files served from the cache
+    timings: Dict[str, float] = field(default_factory=dict)
+
+@dataclass
+class IngestReport:
+    """Per-file results and errors of one load_data_folder run, plus the merged master frame."""
+    master_df: pd.DataFrame
+    files: List[FileResult] = field(default_factory=list)
+    workers: int = 1
+    # Stage timings, counters and peak memory of the run (travels back from a worker process with the report)
+    run: Optional[metrics.RunRecord] = None
+    # Rows dropped by the reconciliation (with a Reason column) and what it matched, see reconciler.py
+    excluded: Optional[pd.DataFrame] = None
+    reconciliation: Optional[Reconciliation] = None
+
+    @property
+    def errors(self) -> List[FileResult]:
+        return [f for f in self.files if f.error]
+
+    def file_stats(self) -> Dict[str, Tuple[int, float]]:
+        """
+        (size, mtime) of every file the rows came from, as it was when it was read.
+        Failed files are left out, so whoever records these (store, warm snapshot) tries them again.
+        """
+        return {f.path: (f.bytes, f.mtime) for f in self.files if not f.error and f.mtime is not None}
+
+def load_data_folder(folder_path: str, use_cache: Optional[bool] = None,
+                     workers: Optional[int] = None) -> pd.DataFrame:
     """
     Scans a folder for CSV/XLSX files, processes them, and returns
     a single merged Master DataFrame.
     """
+    return ingest_folder(folder_path, use_cache, workers).master_df
+
+def ingest_folder(folder_path: str, use_cache: Optional[bool] = None,
+                  workers: Optional[int] = None) -> IngestReport:
+    """
+    Same as load_data_folder, but returns the full IngestReport.
+    With the ingestion cache on, only new or changed files are parsed,
+    the rest are read back from the cache. Deleted files are evicted automatically.
+    Files that need parsing are fanned out over a process pool when there are enough of them.
+    """
     if not os.path.exists(folder_path):
         print(f"Error: Folder {folder_path} not found.")
         # Return empty dataframe with the given column names
-        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+        return IngestReport(pd.DataFrame(columns=REQUIRED_COLUMNS))
 
-    # Use glob to find every .csv and .xlsx file in the folder
-    all_files = glob.glob(os.path.join(folder_path, "**", "*.csv"), recursive=True) + \
-                glob.glob(os.path.join(folder_path, "**", "*.xlsx"), recursive=True)
-    
+    return _ingest(None, use_cache, workers, folder=folder_path)
+
+def ingest_files(file_paths: List[str], removed_files: List[str] = (),
+                 use_cache: Optional[bool] = None, workers: Optional[int] = None) -> IngestReport:
+    """
+    Ingests only the given files (e.g. the ones a folder watcher saw change),
+    and forgets the cached results of removed files.
+    """
+    return _ingest(file_paths, use_cache, workers, removed_files=removed_files)
+
+def _ingest(file_paths: Optional[List[str]], use_cache: Optional[bool], workers: Optional[int],
+            folder: Optional[str] = None, removed_files: List[str] = ()) -> IngestReport:
+    """
+    Ingests file_paths (or every file in folder, evicting the cache entries of files gone from it).
+    The whole run is measured, see IngestReport.run.
+    """
+    if use_cache is None:
+        use_cache = config.USE_INGEST_CACHE
+
+    with metrics.run("ingest") as record:
+        report = _ingest_measured(file_paths, use_cache, workers, folder, removed_files)
+
+    record.files = [{k: v for k, v in vars(f).items() if k != 'timings'} for f in report.files]
+    report.run = record
+    return report
+
+def _ingest_measured(file_paths: Optional[List[str]], use_cache: bool, workers: Optional[int],
+                     folder: Optional[str], removed_files: List[str]) -> IngestReport:
+    if file_paths is None:
+        with metrics.stage("glob"):
+            file_paths = find_data_files(folder)
+
+    # Absolute and sorted, so the merged frame never depends on the order the OS lists files in
+    all_files = sorted({os.path.abspath(p) for p in file_paths})
+    cache = IngestCache(config.CACHE_FOLDER) if use_cache else None
+
+    frames = {}
+    # Stat before reading: a file that changes while it is read then looks changed to the next sync
+    results = {path: _file_result(path) for path in all_files}
+    to_parse = []
+
+    # 1. Serve whatever we can from the cache
+    with metrics.stage("cache_read"):
+        for file_path in all_files:
+            try:
+                clean_df = cache.get(file_path) if cache else None
+            except Exception as e:
+                clean_df = None
+                print(f"Cache read failed for {file_path}: {e}")
+
+            if clean_df is None:
+                to_parse.append(file_path)
+            else:
+                frames[file_path] = clean_df
+                results[file_path].cached = True
+
+    # 2. Parse the rest, in parallel if it is worth starting a pool
+    workers = _resolve_workers(workers, len(to_parse))
+    for file_path, clean_df, error, timings, counters in _parse_files(to_parse, workers):
+        # Stage timings and counters of the file (possibly measured in a worker process) count towards this run
+        results[file_path].timings = timings
+        for name, ms in timings.items():
+            metrics.record(name, ms)
+        for name, n in counters.items():
+            metrics.count(name, n)
+
+        if error:
+            results[file_path].error = error
+            print(f"Failed to load {file_path}: {error}")
+            continue
+
+        frames[file_path] = clean_df
+        if cache:
+            with metrics.stage("cache_write"):
+                cache.put(file_path, clean_df)
+
+    if cache:
+        with metrics.stage("cache_write"):
+            # Files removed from the folder disappear from the manifest (and so from the master frame)
+            if folder:
+                cache.evict_missing(folder, all_files)
+            cache.evict(removed_files)
+            cache.save()
+
+    # 3. Merge in file order with a single concat (deterministic regardless of completion order)
     df_list = []
-    
     for file_path in all_files:
+        clean_df = frames.get(file_path)
+        if clean_df is not None and not clean_df.empty:
+            results[file_path].rows = len(clean_df)
+            # Remember where every row came from, so a changed file can be swapped out later
+            clean_df['Source_File'] = file_path
+            df_list.append(clean_df)
+
+    metrics.count("files", len(all_files))
+    metrics.count("files_cached", len(all_files) - len(to_parse))
+    metrics.count("files_parsed", len(to_parse))
+    metrics.count("files_failed", sum(1 for r in results.values() if r.error))
+    metrics.count("bytes", sum(r.bytes for r in results.values()))
+
+    report = IngestReport(pd.DataFrame(columns=REQUIRED_COLUMNS), list(results.values()), workers)
+    if not df_list:
+        return report
+
+    # Combine and Sort. A stable sort keeps same-day rows in file order.
+    with metrics.stage("concat"):
+        master_df = pd.concat(df_list, ignore_index=True)
+
+    # Cross-file duplicates and card bills need every file, so only a whole-folder load reconciles here.
+    # Hot reloads are reconciled against the loaded data by FinanceEngine (DataSnapshot.patched)
+    if folder and config.RECONCILE:
+        with metrics.stage("reconcile"):
+            master_df, report.excluded, report.reconciliation = reconcile_frame(master_df)
+        metrics.count("reconcile_duplicates", report.reconciliation.duplicates)
+        metrics.count("reconcile_card_bills", report.reconciliation.card_bills)
+        metrics.count("reconcile_unmatched_bills", len(report.reconciliation.unmatched))
+        print(f"Reconciliation: {report.reconciliation.summary()}")
+    with metrics.stage("sort"):
+        master_df.sort_values(by='Date', ascending=False, inplace=True, kind='stable')
+
+    metrics.count("rows", len(master_df))
+    report.master_df = master_df
+    return report
+
+def reconcile_frame(df: pd.DataFrame, amount_scale: int = 1, settled: Optional[np.ndarray] = None):
+    """Runs reconciler.reconcile with the configured card bill settings and merchant canonicalization."""
+    return reconcile(df, get_merchant_index().canonicalize, config.CARD_BILL_CATEGORY,
+                     config.CARD_BILL_MONTH_OFFSET, amount_scale, config.CARD_BILL_TOLERANCE, settled)
+
+def _file_result(file_path: str) -> FileResult:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return FileResult(file_path)
+    return FileResult(file_path, bytes=stat.st_size, mtime=stat.st_mtime)
+
+# --- TRANSACTION STORE ---
+
+def sync_store(folder_path: str, store_path: Optional[str] = None, use_cache: Optional[bool] = None,
+               workers: Optional[int] = None) -> IngestReport:
+    """
+    Brings the on-disk transaction store in line with the folder.
+    Only files that are new or changed since the last sync are ingested, rows of deleted files are dropped.
+    The report lists the ingested files, its master_df stays empty (the rows live in the store).
+    """
+    if not os.path.exists(folder_path):
+        print(f"Error: Folder {folder_path} not found.")
+        return IngestReport(pd.DataFrame(columns=REQUIRED_COLUMNS))
+
+    store = TransactionStore(store_path or config.STORE_PATH)
+    try:
+        known = store.file_stats()
+        folder = os.path.join(os.path.abspath(folder_path), "")
+        present = {os.path.abspath(p) for p in find_data_files(folder_path)}
+
+        changed = [p for p in present if known.get(p) != _stat_key(p)]
+        removed = [p for p in known if p.startswith(folder) and p not in present]
+        return _sync_into(store, changed, removed, use_cache, workers)
+    finally:
+        store.close()
+
+def sync_store_files(file_paths: List[str], removed_files: List[str] = (), store_path: Optional[str] = None,
+                     use_cache: Optional[bool] = None, workers: Optional[int] = None) -> IngestReport:
+    """Re-ingests only the given files into the store and drops the rows of removed files."""
+    store = TransactionStore(store_path or config.STORE_PATH)
+    try:
+        return _sync_into(store, [os.path.abspath(p) for p in file_paths],
+                          [os.path.abspath(p) for p in removed_files], use_cache, workers)
+    finally:
+        store.close()
+
+def _sync_into(store: TransactionStore, changed: List[str], removed: List[str],
+               use_cache: Optional[bool], workers: Optional[int]) -> IngestReport:
+    report = _ingest(changed, use_cache, workers, removed_files=removed)
+
+    # Files that failed are not recorded, so the next sync tries them again
+    parsed = report.file_stats()
+    report.excluded, report.reconciliation = store_rows(store, report.master_df, parsed, changed + removed)
+    if report.reconciliation is not None:
+        print(f"Reconciliation: {report.reconciliation.summary()}")
+
+    report.master_df = pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return report
+
+def store_rows(store: TransactionStore, new_df: pd.DataFrame, file_stats: Dict[str, Tuple[int, float]],
+               drop_files: List[str] = ()) -> Tuple[Optional[pd.DataFrame], Optional[Reconciliation]]:
+    """
+    Writes new_df to the store in place of the rows of drop_files, and returns (excluded rows, Reconciliation).
+    New files can duplicate or pay for stored rows, and dropped ones can bring excluded rows back, so with
+    RECONCILE the change is reconciled against the stored rows it can affect, like DataSnapshot.patched does
+    in memory. Only those are read back: the rows of the touched accounts on the touched dates, and the card rows
+    and bills of the card months these add to or pay. Only the rows that change sides are rewritten.
+    The returned excluded rows and Reconciliation cover that scope. A sync without changes reads nothing.
+    """
+    if not config.RECONCILE or (new_df.empty and not drop_files):
+        store.replace_files(new_df, file_stats, drop_files=drop_files)
+        return None, None
+
+    with metrics.stage("reconcile"):
+        new_df = new_df.reindex(columns=REQUIRED_COLUMNS).assign(_Table="", _Rowid=-1, Reason=None)
+        dropped = store.rows_on(drop_files)
+        # An empty frame would turn Amount into objects
+        touched = pd.concat([f for f in (new_df, dropped) if not f.empty] or [dropped], ignore_index=True)
+
+        # Every copy of a touched row has its date and account, so only these rows can change duplicate status
+        accounts = {account_of(f) for f in touched['Source_File'].unique()}
+        files = [f for f in store.source_files() if f not in drop_files and account_of(f) in accounts]
+        dates = touched['Date'].unique()
+        open_rows = store.rows_on(files, dates)
+
+        # The card months these rows add to or pay are matched anew. Their other rows keep their duplicate status
+        card, bills = card_bill_periods(pd.concat([touched, open_rows], ignore_index=True),
+                                        config.CARD_BILL_CATEGORY, config.CARD_BILL_MONTH_OFFSET)
+        settled = store.card_bill_rows(card, bills, config.CARD_BILL_CATEGORY)
+        settled = settled[~settled['Source_File'].isin(drop_files)
+                          & ~(settled['Source_File'].isin(files) & settled['Date'].isin(dates))]
+
+        frames = [open_rows.assign(_Settled=False), new_df.assign(_Settled=False), settled.assign(_Settled=True)]
+        pool = pd.concat([f for f in frames if not f.empty] or frames[:1], ignore_index=True)
+        pool = pool.rename(columns={"Reason": "_Reason"})
+        kept, excluded, reconciliation = reconcile_frame(pool, settled=pool['_Settled'].to_numpy(dtype=bool))
+    metrics.count("reconcile_duplicates", reconciliation.duplicates)
+    metrics.count("reconcile_card_bills", reconciliation.card_bills)
+    metrics.count("reconcile_unmatched_bills", len(reconciliation.unmatched))
+
+    # Rows that stay where they are stored are not written again
+    moved_in = kept['_Table'] != "transactions"
+    moved_out = (excluded['_Table'] != "excluded") | (excluded['Reason'] != excluded['_Reason'])
+    removed = {
+        "transactions": excluded.loc[excluded['_Table'] == "transactions", '_Rowid'].tolist(),
+        "excluded": kept.loc[kept['_Table'] == "excluded", '_Rowid'].tolist()
+                    + excluded.loc[moved_out & (excluded['_Table'] == "excluded"), '_Rowid'].tolist(),
+    }
+    store.patch(kept[moved_in], excluded[moved_out], removed, file_stats, drop_files=drop_files)
+    return excluded.drop(columns=['_Table', '_Rowid', '_Reason', '_Settled']), reconciliation
+
+def _stat_key(file_path: str) -> Tuple[int, float]:
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime
+
+def _resolve_workers(workers: Optional[int], num_files: int) -> int:
+    """Picks the pool size. Small batches stay in-process, since starting workers costs more than it saves."""
+    if workers is None:
+        workers = config.INGEST_WORKERS or os.cpu_count() or 1
+    if num_files < config.PARALLEL_MIN_FILES:
+        return 1
+    return max(1, min(workers, num_files))
+
+def _parse_files(file_paths: List[str], workers: int):
+    """Returns (path, frame, error, stage timings, counters) for every file, using a process pool when workers > 1."""
+    outcomes = None
+    if workers > 1:
         try:
-            # 1. Parse Metadata from Filename
-            filename = os.path.basename(file_path).lower()
-
-            # Extract the date data from the file name
-            year, month_name, month_num = _parse_filename_date(filename)
-            
-            # Determine source type based on filename conventions
-            source_type = 'credit_card' if '_maxit' in filename or 'card' in filename else 'bank'
-
-            # 2. Read the Raw File
-            raw_df = _read_smart(file_path)
-            if raw_df is None or raw_df.empty:
-                continue
-
-            # 3. Normalize to Standard Schema
-            clean_df = _normalize_data(raw_df, source_type)
-            
-            if not clean_df.empty:
-                # Add Metadata columns
-                clean_df['Year'] = year or clean_df['Date'].dt.year.astype(str)
-                clean_df['Month'] = month_name or clean_df['Date'].dt.month_name()
-                clean_df['Month_Num'] = month_num or clean_df['Date'].dt.month
-                clean_df['Source_Type'] = source_type
-                
-                df_list.append(clean_df)
-                
+            # pool.map keeps input order, whatever order the workers finish in
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(_load_file_safe, file_paths))
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Parallel ingestion unavailable ({e}), falling back to a single process")
+
+    if outcomes is None:
+        outcomes = [_load_file_safe(path) for path in file_paths]
+
+    return [(path, *outcome) for path, outcome in zip(file_paths, outcomes)]
+
+def _load_file_safe(file_path: str) -> Tuple[Optional[pd.DataFrame], Optional[str], Dict[str, float],
+                                             Dict[str, int]]:
+    """
+    Worker entry point. Never raises, so one bad file cannot take down the whole pool.
+    Timings and counters are returned with the frame: a worker's own METRICS never reaches the admin page.
+    """
+    with metrics.collect() as timings, metrics.collect_counts() as counters:
+        try:
+            df, error = _load_file(file_path), None
         except Exception as e:
-            print(f"Failed to load {file_path}: {e}")
-            continue
+            df, error = None, str(e)
+    return df, error, timings, counters
 
-    if not df_list:
-        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+def find_data_files(folder_path: str) -> List[str]:
+    """Use glob to find every .csv and .xlsx file in the folder"""
+    return glob.glob(os.path.join(folder_path, "**", "*.csv"), recursive=True) + \
+           glob.glob(os.path.join(folder_path, "**", "*.xlsx"), recursive=True)
+
+def _load_file(file_path: str) -> Optional[pd.DataFrame]:
+    """Runs a single file through the whole pipeline: metadata, read, normalize."""
+    # Very large exports are read chunk by chunk, so memory never holds the whole raw file.
+    # The normalized chunks are still joined into one frame: the cache, dedupe and reconciliation work per file
+    if os.path.getsize(file_path) >= config.STREAM_MIN_FILE_MB * 1024 * 1024:
+        chunks = list(stream_file(file_path))
+        return concat_frames(chunks) if chunks else None
 
-    # Combine and Sort
-    master_df = pd.concat(df_list, ignore_index=True)
-    master_df.sort_values(by='Date', ascending=False, inplace=True)
+    # 1. Parse Metadata from Filename
+    year, month_name, month_num, source_type = _file_metadata(file_path)
+
+    # 2. Read the Raw File
+    raw_df = _read_smart(file_path)
+    if raw_df is None or raw_df.empty:
+        return None
+
+    # 3. Normalize to Standard Schema
+    with metrics.stage("normalize"):
+        clean_df = _normalize_data(raw_df, source_type)
+    return _add_metadata(clean_df, year, month_name, month_num, source_type)
+
+def _file_metadata(file_path: str) -> Tuple[Optional[str], Optional[str], Optional[int], str]:
+    """Year, month and source type of a statement, taken from its file name."""
+    filename = os.path.basename(file_path).lower()
+
+    # Extract the date data from the file name
+    year, month_name, month_num = _parse_filename_date(filename)
     
-    return master_df
+    # Determine source type based on filename conventions
+    source_type = 'credit_card' if '_maxit' in filename or 'card' in filename else 'bank'
+    return year, month_name, month_num, source_type
+
+def _add_metadata(clean_df: pd.DataFrame, year, month_name, month_num, source_type: str) -> pd.DataFrame:
+    if not clean_df.empty:
+        # Add Metadata columns
+        clean_df['Year'] = year or clean_df['Date'].dt.year.astype(str)
+        clean_df['Month'] = month_name or clean_df['Date'].dt.month_name()
+        clean_df['Month_Num'] = month_num or clean_df['Date'].dt.month
+        clean_df['Source_Type'] = source_type
+
+    return clean_df
+
+# --- STREAMING ---
+
+# Bytes sniffed from the top of a streamed CSV to pick the encoding and find the header row
+STREAM_SNIFF_BYTES = 64 * 1024
+
+def stream_file(file_path: str, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields a file as normalized, classified chunks of at most chunk_rows raw rows.
+    Only one raw chunk is in memory at a time. The normalized rows (categorical, far smaller than the
+    raw text) are the caller's to keep: _load_file joins them into the file's frame.
+    """
+    chunk_rows = chunk_rows or config.STREAM_CHUNK_ROWS
+    year, month_name, month_num, source_type = _file_metadata(file_path)
+
+    if file_path.endswith(('.xlsx', '.xls')):
+        raw_chunks = _iter_excel_chunks(file_path, chunk_rows)
+    else:
+        raw_chunks = _iter_csv_chunks(file_path, chunk_rows)
+
+    date_format = None
+    while True:
+        with metrics.stage("parse"):
+            raw_df = next(raw_chunks, None)
+        if raw_df is None:
+            break
+
+        raw_df.columns = _clean_columns(raw_df.columns)
+
+        # The date format is inferred once per file, from the first chunk
+        if date_format is None:
+            date_col = _find_date_col(raw_df.columns)
+            date_format = infer_date_format(raw_df[date_col]) if date_col else None
+
+        with metrics.stage("normalize"):
+            clean_df = _normalize_data(raw_df, source_type, date_format)
+        if not clean_df.empty:
+            yield _add_metadata(clean_df, year, month_name, month_num, source_type)
+
+def _iter_csv_chunks(file_path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Sniffs encoding and header row from the first bytes, then lets pandas read the rest in chunks."""
+    with metrics.stage("sniff"):
+        with open(file_path, 'rb') as f:
+            prefix = f.read(STREAM_SNIFF_BYTES)
+
+        # The prefix may end in the middle of a character, so validate it with an incremental decoder
+        encoding = _detect_encoding(prefix, final=False)
+        if encoding is None: return
+
+        preview_lines = codecs.getincrementaldecoder(encoding)().decode(prefix).split('\n', HEADER_SCAN_ROWS)[:HEADER_SCAN_ROWS]
+        header_idx = _find_header_row(preview_lines)
+        if header_idx == -1: return # Could not find a valid header
+
+    # Only the prefix was validated. Bad bytes further down raise, and the file is reported as failed
+    with pd.read_csv(file_path, skiprows=header_idx, encoding=encoding, chunksize=chunk_rows) as reader:
+        yield from reader
+
+def _iter_excel_chunks(file_path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Iterates the sheet with openpyxl in read-only mode, which never holds the whole workbook in memory."""
+    from openpyxl import load_workbook  # only needed for streamed workbooks
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+
+        # Step A: Find the Header Row in the first rows
+        preview = [row for _, row in zip(range(HEADER_SCAN_ROWS), rows)]
+        header_idx = _find_header_row([' '.join(map(str, row)) for row in preview])
+        if header_idx == -1: return # Could not find a valid header
+
+        # Named like _read_excel_once names them, so both paths pick the same columns
+        header = [f"Unnamed: {i}" if name is None else name for i, name in enumerate(preview[header_idx])]
+        header = dedup_names(header, is_potential_multiindex=False)
+
+        # Step B: Rows below the header, chunk by chunk (the rest of the preview goes first)
+        chunk = preview[header_idx + 1:]
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+# --- COMPACT SCHEMA ---
+
+# Amounts are stored as integer agorot in compact mode (1 ₪ = 100 agorot)
+AMOUNT_SCALE = 100
+
+# Columns with few distinct values become pandas categoricals (dictionary encoded)
+CATEGORICAL_COLUMNS = ['Month', 'Category', 'Source_Type', 'Desc', 'Source_File']
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the master dataframe to a compact typed schema:
+    Year/Month_Num to small ints, Month/Category/Source_Type/Desc to categoricals
+    and Amount to integer agorot (divide by AMOUNT_SCALE to get shekels back).
+    """
+    if df.empty:
+        return df
+
+    out = df.copy(deep=False)
+    out['Year'] = pd.to_numeric(df['Year']).astype('int16')
+    out['Month_Num'] = pd.to_numeric(df['Month_Num']).astype('int8')
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in out.columns:
+            out[col] = df[col].astype('category')
+
+    # Pick the smallest integer type that can hold every amount
+    agorot = (pd.to_numeric(df['Amount']) * AMOUNT_SCALE).round()
+    fits_int32 = agorot.abs().max() < np.iinfo('int32').max
+    out['Amount'] = agorot.astype('int32' if fits_int32 else 'int64')
+
+    return out
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """pd.concat that keeps categorical columns categorical, by unioning their categories first."""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([f[col].astype('category') for f in frames]).categories
+            frames = [f.assign(**{col: f[col].astype(pd.CategoricalDtype(categories))}) for f in frames]
+
+    return pd.concat(frames, ignore_index=True)
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per column before/after compaction (deep, so string payloads are counted too)."""
+    report = pd.DataFrame({
+        'before_bytes': before.memory_usage(index=False, deep=True),
+        'after_bytes': after.memory_usage(index=False, deep=True),
+    })
+    report.loc['TOTAL'] = report.sum()
+    report['saved_pct'] = (100 - report['after_bytes'] / report['before_bytes'].where(report['before_bytes'] > 0) * 100).round(1)
+    return report
 
 # --- INTERNAL HELPER FUNCTIONS ---
 
@@ -100,77 +585,132 @@ def _parse_filename_date(filename: str) -> Tuple[Optional[str], Optional[str], O
 def _read_smart(file_path: str) -> Optional[pd.DataFrame]:
     """
     Smartly reads CSV or Excel. Detects header row automatically.
+    Every file is read from disk exactly once: the encoding and the header row
+    are sniffed from the same buffer that is then parsed into the table.
     """
     is_excel = file_path.endswith(('.xlsx', '.xls'))
     
     try:
-        # Step A: Read first 20 lines to find the Header Row
-        if is_excel:
-            preview = pd.read_excel(file_path, header=None, nrows=20)
-        else:
-            # Try different encodings for Hebrew support
-            preview = None
-            for enc in ['utf-8', 'cp1255', 'windows-1255', 'utf-8-sig']:
-                try:
-                    preview = pd.read_csv(file_path, header=None, nrows=20, encoding=enc)
-                    break
-                except: continue
-        
-        if preview is None: return None
+        df = _read_excel_once(file_path) if is_excel else _read_csv_once(file_path)
+        if df is None: return None
 
-        # Find the row index that contains common column names
-        header_idx = -1
-        target_keywords = ['תאריך', 'Date', 'שם בית עסק', 'Description', 'פרטים']
-        
-        # Search for the column names in the first 20 rows
-        for i, row in preview.iterrows():
-            row_str = row.astype(str).str.cat(sep=' ')
-            if any(k in row_str for k in target_keywords):
-                header_idx = i
-                break
-        
-        if header_idx == -1: return None # Could not find a valid header
-
-        # Step B: Read the full file using the found header index
-        if is_excel:
-            df = pd.read_excel(file_path, header=header_idx)
-        else:
-            for enc in ['utf-8', 'cp1255', 'windows-1255', 'utf-8-sig']:
-                try:
-                    df = pd.read_csv(file_path, header=header_idx, encoding=enc)
-                    break
-                except: continue
-        
-        # Clean column names (strip whitespace, newlines)
-        df.columns = df.columns.astype(str).str.strip().str.replace("\n", " ")
+        df.columns = _clean_columns(df.columns)
         return df
 
     except Exception:
         return None
 
+def _clean_columns(columns: pd.Index) -> pd.Index:
+    """Clean column names (strip whitespace, newlines)"""
+    return columns.astype(str).str.strip().str.replace("\n", " ")
+
+def _read_csv_once(file_path: str) -> Optional[pd.DataFrame]:
+    """Reads the raw bytes once, then detects encoding, finds the header and parses from memory."""
+    with metrics.stage("read"):
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+
+    with metrics.stage("sniff"):
+        encoding = _detect_encoding(raw)
+        if encoding is None: return None
+
+        text = raw.decode(encoding)
+        del raw  # the decoded text is all we need from here on
+
+        # Step A: Find the Header Row in the first lines of the same buffer
+        preview_lines = text.split('\n', HEADER_SCAN_ROWS)[:HEADER_SCAN_ROWS]
+        header_idx = _find_header_row(preview_lines)
+        if header_idx == -1: return None # Could not find a valid header
+
+    # Step B: Parse the table, skipping the junk lines above the header
+    with metrics.stage("parse"):
+        return pd.read_csv(io.StringIO(text), skiprows=header_idx)
+
+def _read_excel_once(file_path: str) -> Optional[pd.DataFrame]:
+    """Loads the sheet once without a header, then promotes the detected header row in memory."""
+    with metrics.stage("parse"):
+        sheet = pd.read_excel(file_path, header=None)
+    if sheet.empty: return None
+
+    # Step A: Find the Header Row in the already-loaded sheet
+    with metrics.stage("sniff"):
+        preview_rows = [' '.join(map(str, row)) for row in sheet.head(HEADER_SCAN_ROWS).itertuples(index=False)]
+        header_idx = _find_header_row(preview_rows)
+    if header_idx == -1: return None # Could not find a valid header
+
+    # Step B: Everything below the header row is the table
+    header = sheet.iloc[header_idx]
+    df = sheet.iloc[header_idx + 1:].reset_index(drop=True)
+    # Named like read_csv would: blanks become 'Unnamed: i', repeats 'Amount', 'Amount.1'
+    names = [f"Unnamed: {i}" if pd.isna(name) else name for i, name in enumerate(header)]
+    df.columns = dedup_names(names, is_potential_multiindex=False)
+
+    # Columns were loaded together with the text above them, so let pandas re-infer their types
+    return df.infer_objects()
+
+def _detect_encoding(raw: bytes, final: bool = True) -> Optional[str]:
+    """
+    BOM check first, then strict validation of the raw bytes (utf-8 before Hebrew Windows cp1255).
+    final=False when raw is only the start of a file and may end in the middle of a character.
+    """
+    if raw.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    for enc in ['utf-8', 'cp1255']:
+        try:
+            codecs.getincrementaldecoder(enc)().decode(raw, final=final)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def _find_header_row(rows: List[str]) -> int:
+    """Returns the index of the first row that contains common column names, or -1."""
+    for i, row_str in enumerate(rows):
+        if any(k in row_str for k in HEADER_KEYWORDS):
+            return i
+    return -1
+
+def get_merchant_index() -> MerchantIndex:
+    """Returns the merchant index for the current rule book and merchant settings (rebuilt only if they changed)."""
+    global _MERCHANT_INDEX
+    key = (rules_key(config.CATEGORY_RULES), tuple(config.MERCHANT_BRANCH_WORDS),
+           config.MERCHANT_FUZZY_THRESHOLD, config.MERCHANT_FUZZY_MIN_LENGTH)
+    if _MERCHANT_INDEX is None or _MERCHANT_INDEX.rules_key != key:
+        _MERCHANT_INDEX = MerchantIndex(config.CATEGORY_RULES, config.MERCHANT_BRANCH_WORDS,
+                                        config.MERCHANT_FUZZY_THRESHOLD, config.MERCHANT_FUZZY_MIN_LENGTH)
+    return _MERCHANT_INDEX
+
 def _get_category(desc: str) -> str:
-    """Classifies a transaction based on config.CATEGORY_RULES"""
+    """
+    Classifies a transaction based on config.CATEGORY_RULES.
+    Row-by-row reference version of the keyword rules. The pipeline classifies per merchant with
+    get_merchant_index().classify_series, which also catches spelling variants these rules miss.
+    """
     desc = str(desc).upper()
     for cat, keywords in config.CATEGORY_RULES.items():
         if any(k in desc for k in keywords):
             return cat
     return 'Other'
 
-def _normalize_data(df: pd.DataFrame, source_type: str) -> pd.DataFrame:
+def _normalize_data(df: pd.DataFrame, source_type: str, date_format: Optional[str] = None) -> pd.DataFrame:
     """
     Maps raw columns (Hebrew/English) to standard columns: Date, Desc, Amount, Category.
     Since a bank and credit card files can look different, it forces them to speak the same language
+    date_format: explicit format of the date column, inferred from a sample when not given
     """
     norm = pd.DataFrame()
     
     # Identify Columns using keyword matching
     cols = df.columns
-    date_col = next((c for c in cols if 'תאריך' in c or 'Date' in c), None)
+    date_col = _find_date_col(cols)
     
     if not date_col: return pd.DataFrame() # Garbage file
 
-    norm['Date'] = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce')
+    with metrics.stage("parse_dates"):
+        norm['Date'] = parse_dates(df[date_col], date_format)
     norm.dropna(subset=['Date'], inplace=True)
+    rejected = pd.Series(False, index=df.index)
 
     # --- BANK LOGIC ---
     if source_type == 'bank':
@@ -180,10 +720,15 @@ def _normalize_data(df: pd.DataFrame, source_type: str) -> pd.DataFrame:
         
         norm['Desc'] = df[desc_col].fillna('') if desc_col else "Unknown"
         
-        # Calculate Net Amount
-        credit = pd.to_numeric(df[credit_col], errors='coerce').fillna(0) if credit_col else 0
-        debit = pd.to_numeric(df[debit_col], errors='coerce').fillna(0) if debit_col else 0
-        norm['Amount'] = credit - debit
+        # Calculate Net Amount. An empty side is 0, a side that holds no readable amount rejects the row
+        with metrics.stage("parse_amounts"):
+            credit = parse_amounts(df[credit_col]) if credit_col else pd.Series(0.0, index=df.index)
+            debit = parse_amounts(df[debit_col]) if debit_col else pd.Series(0.0, index=df.index)
+            if credit_col:
+                rejected |= _unreadable(df[credit_col], credit)
+            if debit_col:
+                rejected |= _unreadable(df[debit_col], debit)
+        norm['Amount'] = credit.fillna(0) - debit.fillna(0)
 
     # --- CREDIT CARD LOGIC ---
     elif source_type == 'credit_card':
@@ -195,12 +740,137 @@ def _normalize_data(df: pd.DataFrame, source_type: str) -> pd.DataFrame:
         norm['Desc'] = df[desc_col].fillna('') if desc_col else "Unknown"
         
         if amount_col:
-            raw_amount = pd.to_numeric(df[amount_col], errors='coerce').fillna(0)
-            norm['Amount'] = raw_amount * -1
+            with metrics.stage("parse_amounts"):
+                raw_amount = parse_amounts(df[amount_col])
+                rejected = _unreadable(df[amount_col], raw_amount)
+            norm['Amount'] = raw_amount.fillna(0) * -1
         else:
             norm['Amount'] = 0
 
+    # Text that is no amount ('abc', or '3,5' in a column that writes '2.50') would otherwise be ingested as 0
+    rejected = rejected.reindex(norm.index, fill_value=False).to_numpy()
+    if rejected.any():
+        metrics.count("amounts_rejected", int(rejected.sum()))
+        norm = norm[~rejected]
+
     # Apply Category Classification
-    norm['Category'] = norm['Desc'].apply(_get_category)
+    with metrics.stage("classify"):
+        norm['Category'] = get_merchant_index().classify_series(norm['Desc'])
+
+    return norm
+
+def _find_date_col(cols) -> Optional[str]:
+    return next((c for c in cols if 'תאריך' in c or 'Date' in c), None)
+
+# --- DATE & AMOUNT PARSING ---
+
+# Candidate date formats, day-first ones first (Israeli statements). Month-first only wins
+# when no day-first format fits the sample (e.g. '12/31/2024').
+DATE_FORMATS = [
+    '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y',
+    '%d-%m-%y', '%d/%m/%y', '%d.%m.%y',
+    '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M', '%d/%m/%Y %H:%M:%S',
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y/%m/%d',
+    '%m/%d/%Y', '%m-%d-%Y',
+]
+DATE_SAMPLE_SIZE = 200
+
+# Everything that is not part of the number: currency signs and codes, spaces and direction marks.
+# Removed with plain (non-regex) replaces, which are much faster in bulk. Separators are handled by parse_amounts
+AMOUNT_JUNK = ['ש"ח', 'NIS', 'nis', 'ILS', 'ils', '₪', '$', '€', '£', ' ', '\u00a0', '\u200e', '\u200f', '\t']
+
+# A separator followed by one or two final digits is a decimal point ('12,50', '1.234,56' / '12.50', '1,234.56')
+COMMA_DECIMAL = r',\d{1,2}$|\.\d{3},'
+DOT_DECIMAL = r'\.\d{1,2}$|,\d{3}\.'
+
+def infer_date_format(values: pd.Series) -> Optional[str]:
+    """Picks the format that parses the most values of a sample of the column, or None if none fits."""
+    sample = values.dropna().astype(str).str.strip()
+    sample = sample[sample != ''].drop_duplicates().head(DATE_SAMPLE_SIZE)
+    if sample.empty:
+        return None
+
+    best_format, best_hits = None, 0
+    for fmt in DATE_FORMATS:
+        hits = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+            if hits == len(sample):
+                break
+    return best_format
+
+def parse_dates(values: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """
+    Parses a date column in bulk with one explicit format (inferred from a sample if not given).
+    Values that do not fit the format fall back to the old per-element day-first parsing.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values # Excel already delivered real dates
+
+    date_format = date_format or infer_date_format(values)
+    if date_format is None:
+        return pd.to_datetime(values, dayfirst=True, errors='coerce')
+
+    dates = pd.to_datetime(values, format=date_format, errors='coerce')
+
+    # Stray rows in another format (mixed exports, padded cells) already failed the format above,
+    # so they go straight to per-element parsing. The rest stays vectorized
+    misses = dates.isna() & values.notna()
+    if misses.any():
+        text = values[misses].astype(str).str.strip()
+        dates[misses] = pd.to_datetime(text, dayfirst=True, errors='coerce', format='mixed')
+    return dates
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """
+    Turns an amount column into floats in bulk. Strings like '1,200.50', '₪ 300',
+    '(45.90)' or '45.90-' are cleaned instead of silently becoming NaN.
+    The decimal separator is decided per column ('1.234,56' and '3,5' in European exports).
+    Values that contradict the column's separator become NaN rather than a wrong number
+    (_normalize_data drops those rows).
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+
+    # Plain numbers need no cleaning, only the values pandas cannot read go through the cleaner
+    amounts = pd.to_numeric(values, errors='coerce').astype(float)
+    dirty = amounts.isna() & values.notna()
+    if not dirty.any():
+        return amounts
+
+    # Vote on the decimal separator. Plain numbers with a fraction were written with a decimal point
+    text, negative = _amount_text(values[dirty])
+    comma_votes = text.str.contains(COMMA_DECIMAL, regex=True).sum()
+    dot_votes = text.str.contains(DOT_DECIMAL, regex=True).sum() + ((amounts % 1) > 0).sum()
+
+    if comma_votes > dot_votes:
+        # '1.234' is a thousand here, so the values pandas could read are cleaned again too
+        dirty = values.notna()
+        text, negative = _amount_text(values[dirty])
+        number = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        ambiguous = text.str.contains(DOT_DECIMAL, regex=True)
+    else:
+        number = text.str.replace(',', '', regex=False)
+        ambiguous = text.str.contains(COMMA_DECIMAL, regex=True)
+
+    cleaned = pd.to_numeric(number, errors='coerce').astype(float)
+    amounts[dirty] = cleaned.where(~negative, -cleaned).where(~ambiguous)
+    if ambiguous.any():
+        metrics.count("amounts_ambiguous", int(ambiguous.sum()))
+    return amounts
+
+def _unreadable(values: pd.Series, amounts: pd.Series) -> pd.Series:
+    """Cells that hold something, but no amount parse_amounts could read (empty cells are fine)."""
+    missing = amounts.isna() & values.notna()
+    if missing.any():
+        missing[missing] = values[missing].astype(str).str.strip() != ''
+    return missing
+
+def _amount_text(values: pd.Series):
+    """The number part of amount strings, and which of them are accounting negatives ('(45.90)', '45.90-')."""
+    text = values.astype(str).str.replace('\u2212', '-', regex=False) # unicode minus
+    for junk in AMOUNT_JUNK:
+        text = text.str.replace(junk, '', regex=False)
 
-    return norm
\ No newline at end of file
+    negative = (text.str.startswith('(') & text.str.endswith(')')) | (text.str.endswith('-') & ~text.str.startswith('-'))
+    return text.str.strip('()').str.rstrip('-'), negative
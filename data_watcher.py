@@ -0,0 +1,138 @@
+"""
+This file is the doorbell of the data folder.
+It watches config.DATA_FOLDER in the background and reports which statement files were
+added, modified or removed, so only those files have to go through the loader again.
+
+It uses watchdog (inotify & co.) when that package is installed, and falls back to polling
+the folder otherwise. Bursts of file drops are debounced into a single batch.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+import config
+import data_loader
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency, polling works everywhere
+    Observer = None
+
+# on_change(added, modified, removed), each a list of absolute file paths
+ChangeCallback = Callable[[List[str], List[str], List[str]], None]
+
+
+class DataFolderWatcher:
+    def __init__(self, folder_path: str, on_change: ChangeCallback,
+                 debounce: float = None, poll_interval: float = None):
+        self.folder_path = folder_path
+        self.on_change = on_change
+        self.debounce = config.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.poll_interval = config.WATCH_POLL_SECONDS if poll_interval is None else poll_interval
+
+        # Last state reported to on_change, and last state seen by the poller
+        self._snapshot: Dict[str, Tuple[int, float]] = {}
+        self._last_scan: Dict[str, Tuple[int, float]] = {}
+
+        # Debounce state: time of the most recent file event, None when nothing is pending
+        self._last_event = None
+
+        self._observer = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def mode(self) -> str:
+        return "events" if self._observer is not None else "polling"
+
+    def start(self):
+        """Starts watching. The folder's current state is the baseline, so only later changes are reported."""
+        if self._thread is not None or not os.path.isdir(self.folder_path):
+            return
+
+        self._snapshot = self._last_scan = self._scan()
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_PokeHandler(self._poke), self.folder_path, recursive=True)
+                self._observer.start()
+            except Exception as e:
+                print(f"File events unavailable ({e}), polling {self.folder_path} instead")
+                self._observer = None
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-folder-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- INTERNAL HELPERS ---
+
+    def _run(self):
+        # With file events we only need to wake up to check the debounce timer
+        tick = min(self.poll_interval, self.debounce / 2) if self._observer is None else 0.2
+
+        while not self._stop.wait(tick):
+            if self._observer is None:
+                scan = self._scan()
+                if scan != self._last_scan:
+                    self._last_scan = scan
+                    self._poke()
+
+            # Flush once the folder has been quiet for the debounce period
+            if self._last_event is not None and time.monotonic() - self._last_event >= self.debounce:
+                self._flush()
+
+    def _poke(self):
+        """Something changed in the folder. (Re)starts the debounce timer."""
+        self._last_event = time.monotonic()
+
+    def _flush(self):
+        self._last_event = None
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+
+        added = sorted(p for p in current if p not in previous)
+        removed = sorted(p for p in previous if p not in current)
+        modified = sorted(p for p in current if p in previous and current[p] != previous[p])
+
+        if added or modified or removed:
+            try:
+                self.on_change(added, modified, removed)
+            except Exception as e:
+                print(f"Reload after file change failed: {e}")
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        """(size, mtime) of every statement file in the folder."""
+        scan = {}
+        for path in data_loader.find_data_files(self.folder_path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # deleted between listing and stat
+            scan[os.path.abspath(path)] = (stat.st_size, stat.st_mtime)
+        return scan
+
+
+if Observer is not None:
+    class _PokeHandler(FileSystemEventHandler):
+        """Turns every watchdog event into a debounce poke. The actual diff is taken from a fresh scan."""
+        def __init__(self, poke):
+            super().__init__()
+            self.poke = poke
+
+        def on_any_event(self, event):
+            if not event.is_directory:
+                self.poke()
@@ -0,0 +1,187 @@
+"""
+This file is the shipping dock. It writes the cleaned, categorized master data out for other tools,
+so nobody has to run the normalization again elsewhere.
+
+The rows are partitioned by statement month, one file per partition:
+    <folder>/Year=2024/Month_Num=03/part-0.parquet   (or part-0.csv.gz)
+Partitions are written one at a time from row positions of the frame (a month is a contiguous block
+of master_df, which is sorted by Date), so at most one month is ever copied. Only the requested
+columns are written.
+
+Files always hold the plain schema (Year as text, Amount in shekels), whatever COMPACT_SCHEMA is.
+A manifest listing the partitions is written last. load_export reads an export back into a frame
+that FinanceDataset.set_data accepts, so another process (or a later start) can skip ingestion.
+
+Usage: python exporter.py [--output export] [--format parquet|csv] [--columns Date,Desc,Amount]
+                          [--year 2024] [--month March]
+"""
+
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pandas as pd
+import config
+import data_loader
+import metrics
+
+EXPORT_FORMATS = {"parquet": ".parquet", "csv": ".csv.gz"}
+MANIFEST_NAME = "_export.json"
+PARTITION_COLUMNS = ["Year", "Month_Num"]
+
+# Text columns of the plain schema. CSV would otherwise guess their types (a Year of 2024, a Desc of "NA")
+TEXT_COLUMNS = ["Year", "Month", "Desc", "Category", "Source_Type", "Source_File"]
+
+
+@dataclass
+class ExportResult:
+    folder: str
+    fmt: str
+    columns: List[str]
+    rows: int = 0
+    bytes: int = 0
+    # Partition files, relative to folder
+    files: List[str] = field(default_factory=list)
+
+
+def export_frame(df: pd.DataFrame, folder: str, fmt: str = None, columns: Optional[List[str]] = None,
+                 amount_scale: int = 1) -> ExportResult:
+    """
+    Writes df (master_df or a filtered view of it) to folder, partitioned by Year/Month_Num.
+    columns: the columns to write, None for all. amount_scale: as in DataSnapshot (100 in compact mode).
+    A previous export in the same folder is replaced.
+    """
+    fmt = fmt or config.EXPORT_FORMAT
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    columns = list(columns or config.EXPORT_COLUMNS or data_loader.REQUIRED_COLUMNS)
+    unknown = [c for c in columns if c not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+
+    result = ExportResult(os.path.abspath(folder), fmt, columns)
+    os.makedirs(folder, exist_ok=True)
+    _remove_export(folder)
+
+    with metrics.stage("export"):
+        if not df.empty:
+            column_positions = [df.columns.get_loc(c) for c in columns]
+            partitions = df.groupby(PARTITION_COLUMNS, sort=True, observed=True).indices
+            for (year, month_num), positions in partitions.items():
+                part = _plain(df.iloc[positions, column_positions], amount_scale)
+                rel_path = os.path.join(f"Year={year}", f"Month_Num={int(month_num):02d}", "part-0" + EXPORT_FORMATS[fmt])
+                path = os.path.join(folder, rel_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if fmt == "parquet":
+                    part.to_parquet(path, index=False)
+                else:
+                    part.to_csv(path, index=False, compression="gzip", encoding="utf-8")
+
+                result.files.append(rel_path)
+                result.rows += len(part)
+                result.bytes += os.path.getsize(path)
+
+    # The manifest goes last, so a half-written export is never read back
+    manifest = {"format": fmt, "columns": columns, "rows": result.rows, "files": result.files}
+    tmp_path = os.path.join(folder, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(folder, MANIFEST_NAME))
+
+    metrics.count("export_rows", result.rows)
+    return result
+
+
+def load_export(folder: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Reads an export back, newest first like master_df. columns: a subset of the exported ones, None for all."""
+    with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    columns = list(columns or manifest["columns"])
+    unknown = [c for c in columns if c not in manifest["columns"]]
+    if unknown:
+        raise ValueError(f"Columns not in the export: {', '.join(unknown)}")
+    if not manifest["files"]:
+        return pd.DataFrame(columns=columns)
+
+    frames = []
+    for rel_path in manifest["files"]:
+        path = os.path.join(folder, rel_path)
+        if manifest["format"] == "parquet":
+            frames.append(pd.read_parquet(path, columns=columns))
+        else:
+            frames.append(pd.read_csv(path, usecols=columns, keep_default_na=False, encoding="utf-8",
+                                      dtype={c: "str" for c in TEXT_COLUMNS if c in columns},
+                                      parse_dates=["Date"] if "Date" in columns else False))
+
+    df = pd.concat(frames, ignore_index=True)[columns]
+    if "Date" in columns:
+        df.sort_values(by="Date", ascending=False, inplace=True, kind="stable")
+        df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def _plain(part: pd.DataFrame, amount_scale: int) -> pd.DataFrame:
+    """One partition in the plain schema: categoricals and small ints back to text, amounts in shekels."""
+    out = part.reset_index(drop=True)
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype) or col == "Year":
+            out[col] = out[col].astype(str)
+    if "Amount" in out.columns and amount_scale != 1:
+        out["Amount"] = out["Amount"].to_numpy() / amount_scale
+    if "Month_Num" in out.columns:
+        out["Month_Num"] = out["Month_Num"].astype("int64")
+    return out
+
+
+def _remove_export(folder: str):
+    """Deletes the partition files of an earlier export in folder (only those its manifest lists)."""
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            files = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return
+
+    os.remove(manifest_path)
+    for rel_path in files:
+        path = os.path.join(folder, rel_path)
+        try:
+            os.remove(path)
+            # The Month_Num and Year folders, as far as they are empty now
+            os.rmdir(os.path.dirname(path))
+            os.rmdir(os.path.dirname(os.path.dirname(path)))
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the normalized transactions, partitioned by Year/Month.")
+    parser.add_argument('--folder', default=config.DATA_FOLDER, help="statement folder to load")
+    parser.add_argument('--output', default=config.EXPORT_FOLDER, help="target folder")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default=config.EXPORT_FORMAT)
+    parser.add_argument('--columns', help="comma separated columns to export (default: all)")
+    parser.add_argument('--year', default="All Years", help="only this year, as in the dashboard filter")
+    parser.add_argument('--month', default="All Months", help="only this month (e.g. March)")
+    args = parser.parse_args()
+
+    # Same loading and filtering as the dashboard, so the export matches what it shows
+    from finance_engine import FinanceDataset, FinanceEngine
+    config.DATA_FOLDER = args.folder
+    dataset = FinanceDataset()
+    dataset.load()
+    engine = FinanceEngine(dataset)
+    # Years are numbers in compact mode, the command line only has text
+    years = {str(y): y for y in engine.available_years}
+    engine.filter_data(years.get(args.year, args.year), args.month)
+
+    columns = args.columns.split(',') if args.columns else None
+    result = export_frame(engine.active_df, args.output, args.format, columns, engine.amount_scale)
+    print(f"Exported {result.rows:,} rows in {len(result.files)} partitions "
+          f"({result.bytes / 2**20:,.1f} MB) to {result.folder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,102 +4,594 @@ It contains everything loaded from the disk
 The user use filters (year/month) to restrict flow
 It uses an active dataframe that contains only the data the user currently wants to see
 The data from the active dataframe flow into specific UI widgets
+
+It is split in two:
+FinanceDataset is the shared, load-once, read-only side (master data, indexes, aggregates, result cache).
+FinanceEngine is a lightweight per-client view on top of it (filter state and the active slice),
+so every browser session gets its own filters without copying the master data.
 """
 
+import dataclasses
+import functools
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
 import config
 import data_loader
+import exporter
+import metrics
+import warm_start
+from aggregate_cube import AggregateCube
+from analytics import MonthlyMatrix
+from result_cache import ResultCache
+from transaction_store import TransactionStore
 
-class FinanceEngine:
-    def __init__(self):
-        # Keep two copies of the dataframe to avoid re-read files from the hard drive
+# Columns the drill-down grid can be sorted by (UI name -> master_df column)
+PAGE_SORT_COLUMNS = {"Date": "Date", "Description": "Desc", "Amount": "Amount"}
+
+
+def cached_query(method):
+    """Memoizes a query method on (data version, current filter, method, args)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._sync()
+        key = (self._snapshot.version, self.current_year, self.current_month,
+               method.__name__, args, tuple(sorted(kwargs.items())))
+        return self.results.get_or_compute(key, lambda: _timed_call(method, self, *args, **kwargs))
+    return wrapper
+
+
+def _timed_call(method, *args, **kwargs):
+    # Only real computations are timed, cache hits never get here
+    with metrics.stage(method.__name__):
+        return method(*args, **kwargs)
+
+
+class DataSnapshot:
+    """
+    One immutable generation of master data plus everything derived from it.
+    A (re)load never edits a snapshot, it builds a new one and swaps it in,
+    so readers can use whatever snapshot they hold without any locking.
+    """
+    # The on-disk store that answers the queries instead of master_df (see StoreSnapshot)
+    store = None
+
+    def __init__(self, master_df=None, amount_scale=1, cube=None, version=0, report=None, memory_report=None,
+                 analytics=None, excluded=None, file_stats=None):
         # Master Data, the big bucket
-        self.master_df = pd.DataFrame()
+        self.master_df = pd.DataFrame(columns=data_loader.REQUIRED_COLUMNS) if master_df is None else master_df
+        self.version = version
+
+        # Rows the reconciliation dropped (duplicates, linked card bills), kept so a reload can bring them back
+        self.excluded = pd.DataFrame(columns=data_loader.REQUIRED_COLUMNS + ["Reason"]) if excluded is None else excluded
+
+        # (size, mtime) of every statement file master_df was built from, as it was when read (see warm_start.save)
+        self.file_stats = {} if file_stats is None else file_stats
+
+        # Amount units per shekel (100 when master_df is in compact schema, where amounts are agorot)
+        self.amount_scale = amount_scale
+
+        # Per-file results and errors of the load, and bytes per column before/after compaction
+        self.report = report
+        self.memory_report = memory_report
+
+        # unique_years is a sorted list of all years found in the data
+        # Show all years and unique years in the same dropdown
+        unique_years = sorted(self.master_df["Year"].unique().tolist(), reverse=True)
+        self.available_years = ["All Years"] + unique_years
+
+        with metrics.stage("filter_index"):
+            self._build_filter_index()
+
+        # Pre-aggregated Year x Month x Category x sign sums and counts.
+        # Aggregate everything once, every dashboard number is then read from the cube
+        if cube is None:
+            with metrics.stage("cube"):
+                cube = AggregateCube(self.master_df, amount_scale)
+        self.cube = cube
+
+        # Dense month x category matrix for the trend charts, filled from the cube cells
+        if analytics is None:
+            with metrics.stage("analytics"):
+                analytics = MonthlyMatrix(cube.cells)
+        self.analytics = analytics
+
+    def _build_filter_index(self):
+        """
+        Precomputes the row positions of every year, month and (year, month) in master_df.
+        Selecting a period is then a slice/take instead of copying and scanning the master data.
+        """
+        df = self.master_df
+        if df.empty:
+            self._period_rows, self._year_rows, self._month_rows, self._category_rows = {}, {}, {}, {}
+            self.all_months = ["All Months"]
+            return
+
+        # groupby().indices gives positional row numbers per key, in master_df order
+        self._period_rows = {k: _as_slice(v) for k, v in df.groupby(["Year", "Month"], sort=False, observed=True).indices.items()}
+        self._year_rows = {k: _as_slice(v) for k, v in df.groupby("Year", sort=False, observed=True).indices.items()}
+        self._month_rows = {k: _as_slice(v) for k, v in df.groupby("Month", sort=False, observed=True).indices.items()}
+        self.all_months = ["All Months"] + sorted(self._month_rows)
+
+        # Row positions of every category, ascending. master_df is sorted by Date, so these are date-sorted
+        # too, and a drill-down only has to cut the selected period out of them (see category_rows)
+        self._category_rows = dict(df.groupby("Category", sort=False, observed=True).indices)
+
+    def rows(self, year, month):
+        """Row positions (a slice or an array) of a year/month selection."""
+        if year != "All Years" and month != "All Months":
+            rows = self._period_rows.get((year, month))
+        elif year != "All Years":
+            rows = self._year_rows.get(year)
+        elif month != "All Months":
+            rows = self._month_rows.get(month)
+        else:
+            rows = slice(None)
+
+        return slice(0, 0) if rows is None else rows # nothing recorded for this selection
+
+    def category_rows(self, year, month, category):
+        """Row positions (ascending, so newest first) of one category within a year/month selection."""
+        positions = self._category_rows.get(category)
+        if positions is None:
+            return np.empty(0, dtype=np.intp)
+
+        rows = self.rows(year, month)
+        if isinstance(rows, slice):
+            # A contiguous period: two binary searches give the range of the category's rows inside it
+            start, stop, _ = rows.indices(len(self.master_df))
+            return positions[np.searchsorted(positions, start):np.searchsorted(positions, stop)]
+        # Scattered rows (a month across all years), both sides are sorted
+        return np.intersect1d(positions, rows, assume_unique=True)
+
+    def patched(self, new_df, drop_files=(), file_stats=None):
+        """
+        Returns the next snapshot: rows of drop_files dropped, new_df appended, cube updated incrementally.
+        file_stats: (size, mtime) of the files new_df was read from.
+        """
+        master_df = self.master_df
+        excluded = self.excluded
+        report = self.report
+        removed_df = None
+
+        drop_paths = [os.path.abspath(p) for p in drop_files]
+        stats = {p: stat for p, stat in self.file_stats.items() if p not in drop_paths}
+        stats.update(file_stats or {})
+
+        if len(drop_files) and "Source_File" in master_df.columns:
+            drop_mask = master_df["Source_File"].isin(drop_paths).to_numpy()
+            if drop_mask.any():
+                removed_df = master_df[drop_mask]
+                master_df = master_df[~drop_mask]
+            if not excluded.empty:
+                excluded = excluded[~excluded["Source_File"].isin(drop_paths).to_numpy()]
+
+        if self.amount_scale != 1 and not new_df.empty:
+            new_df = data_loader.compact_frame(new_df)
+
+        # Only the touched rows are (de)aggregated, the rest of the cube and the trend matrix is kept
+        cube = self.cube.copy()
+        analytics = self.analytics.copy()
+        if removed_df is not None:
+            analytics.add(cube.remove(removed_df))
+
+        if config.RECONCILE and len(master_df) + len(new_df) + len(excluded):
+            # New files can duplicate or pay for loaded rows, and removed ones can bring excluded rows back,
+            # so loaded, new and excluded rows are reconciled together. Only the rows that change sides
+            # go in or out of the cube. _Origin: 0 = loaded, 1 = new, 2 = previously excluded
+            pool = data_loader.concat_frames([
+                master_df.assign(_Origin=np.int8(0)),
+                new_df.assign(_Origin=np.int8(1)),
+                excluded.drop(columns="Reason").assign(_Origin=np.int8(2)),
+            ])
+            with metrics.stage("reconcile"):
+                kept, dropped, reconciliation = data_loader.reconcile_frame(pool, self.amount_scale)
+            analytics.add(cube.remove(dropped[dropped["_Origin"].to_numpy() == 0]))
+            analytics.add(cube.add(kept[kept["_Origin"].to_numpy() != 0]))
+            master_df = kept.drop(columns="_Origin")
+            excluded = dropped.drop(columns="_Origin")
+            if report is not None:
+                report = dataclasses.replace(report, reconciliation=reconciliation)
+        else:
+            analytics.add(cube.add(new_df))
+            master_df = data_loader.concat_frames([master_df, new_df])
+
+        master_df.sort_values(by="Date", ascending=False, inplace=True, kind="stable")
+
+        return DataSnapshot(master_df, self.amount_scale, cube, self.version + 1, report, self.memory_report,
+                            analytics, excluded, stats)
+
+
+class StoreSnapshot(DataSnapshot):
+    """
+    One generation of the SQLite transaction store (config.STORE_BACKEND = "sqlite").
+    Only the few excluded rows are held in memory: the store answers the queries with SQL, and stands in for
+    the aggregate cube.
+    """
+    def __init__(self, store, version=0, report=None):
+        self.store = store
+        self.master_df = pd.DataFrame(columns=data_loader.REQUIRED_COLUMNS)
+        self.version = version
+        self.amount_scale = 1
+        self.report = report
+        self.memory_report = None
+
+        self.available_years = ["All Years"] + store.years()
+        self.all_months = ["All Months"] + store.months()
+        self.cube = store
+        self.analytics = MonthlyMatrix(store.cube_cells())
+        # Few rows (duplicates, linked card bills), read for the admin page
+        self.excluded = store.excluded_rows()
+
+
+class FinanceDataset:
+    """
+    The shared, load-once side of the engine. Holds the current DataSnapshot and the query result cache.
+    Writers (load / hot reload) are serialized among themselves, readers never wait.
+    """
+    def __init__(self, store=None):
+        # Optional on-disk backend. When set, master data lives in the store instead of memory
+        if store is None and config.STORE_BACKEND == "sqlite":
+            store = TransactionStore(config.STORE_PATH)
+        self.store = store
+
+        self.snapshot = DataSnapshot() if store is None else StoreSnapshot(store)
+
+        # Query results, keyed by filter state. The snapshot version changes whenever master data is swapped,
+        # so results computed on old data can never be served. Shared, since results do not depend on the session
+        self.results = ResultCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_MAX_MB * 2**20)
+
+        self._write_lock = threading.Lock()
+
+    @property
+    def data_version(self):
+        return self.snapshot.version
+
+    def load(self):
+        """The delivery truck. calls the loader to get fresh data from the disk."""
+        if self.store is not None:
+            # Only files changed since the last run are parsed, the rest is already in the store
+            return self.set_data(data_loader.sync_store(config.DATA_FOLDER, self.store.path))
+        return self.set_data(data_loader.ingest_folder(config.DATA_FOLDER))
+
+    def set_data(self, report):
+        """
+        Swaps in the master data of an ingestion report and rebuilds everything derived from it.
+        Split from load so the UI can run the ingestion itself in a worker process.
+        """
+        # The ingestion may have run in a worker process, its measurements came back with the report
+        metrics.METRICS.add_run(report.run)
+
+        if self.store is not None:
+            # The rows were already written to the store by data_loader.sync_store
+            with self._write_lock:
+                self._swap(StoreSnapshot(self.store, self.snapshot.version + 1, report))
+            return f"Store holds {self.store.count()} transactions ({len(report.files)} files synced)"
+
+        master_df = report.master_df
+
+        with self._write_lock, metrics.run("build") as record:
+            # Compact mode: small ints, categoricals and integer agorot instead of strings and floats
+            amount_scale, mem_report = 1, None
+            excluded = report.excluded
+            if config.COMPACT_SCHEMA and not master_df.empty:
+                with metrics.stage("compact"):
+                    compact_df = data_loader.compact_frame(master_df)
+                    mem_report = data_loader.memory_report(master_df, compact_df)
+                    if excluded is not None and not excluded.empty:
+                        excluded = data_loader.compact_frame(excluded)
+                master_df = compact_df
+                amount_scale = data_loader.AMOUNT_SCALE
+
+            self._swap(DataSnapshot(master_df, amount_scale, None, self.snapshot.version + 1, report, mem_report,
+                                    excluded=excluded, file_stats=report.file_stats()))
+        metrics.METRICS.add_run(record)
+
+        failed = len(report.errors)
+        return f"Loaded {len(master_df)} transactions" + (f" ({failed} files failed)" if failed else "")
+
+    def append_transactions(self, new_df):
+        """Adds freshly ingested transactions without reloading everything from disk."""
+        if new_df is None or new_df.empty:
+            return
+
+        with self._write_lock:
+            if self.store is not None:
+                data_loader.store_rows(self.store, new_df, {})
+                self._swap(StoreSnapshot(self.store, self.snapshot.version + 1, self.snapshot.report))
+            else:
+                self._swap(self.snapshot.patched(new_df))
+
+    def reload_files(self, changed_files, removed_files=()):
+        """
+        Hot reload: ingests only the given files and swaps their rows in master data.
+        Rows of changed and removed files are dropped, the fresh rows of changed files are appended.
+        """
+        if self.store is not None:
+            report = data_loader.sync_store_files(changed_files, removed_files, self.store.path)
+            metrics.METRICS.add_run(report.run)
+            with self._write_lock:
+                self._swap(StoreSnapshot(self.store, self.snapshot.version + 1, report))
+            return report
+
+        report = data_loader.ingest_files(changed_files, removed_files)
+        metrics.METRICS.add_run(report.run)
+        with self._write_lock, metrics.stage("patch"):
+            self._swap(self.snapshot.patched(report.master_df, drop_files=set(changed_files) | set(removed_files),
+                                             file_stats=report.file_stats()))
+        return report
+
+    # --- WARM START ---
+
+    def save_snapshot(self, folder=None):
+        """Writes master data and the cube to disk, so the next start can skip ingestion (see warm_start.py)."""
+        snapshot = self.snapshot
+        if self.store is not None or snapshot.version == 0:
+            return # nothing loaded, or the store already is on disk
+
+        with metrics.stage("snapshot_save"):
+            # The stats of the files as they were read, not as they are now: a file added or changed since the
+            # last load or hot reload is not in master_df, so the next start must still ingest it
+            warm_start.save(folder or config.SNAPSHOT_FOLDER, snapshot.master_df, snapshot.cube.cells,
+                            snapshot.excluded, snapshot.amount_scale, config.DATA_FOLDER, snapshot.file_stats)
+
+    def restore_snapshot(self, folder=None):
+        """
+        Serves master data from the last warm snapshot. Returns False if there is no valid one.
+        Files that changed since the snapshot was written are re-ingested incrementally.
+        """
+        if self.store is not None:
+            return False
+
+        with metrics.run("warm_start") as record:
+            warm = warm_start.load(folder or config.SNAPSHOT_FOLDER, config.DATA_FOLDER,
+                                   data_loader.find_data_files(config.DATA_FOLDER))
+            if warm is not None:
+                cube = AggregateCube.from_cells(warm.cube_cells, warm.amount_scale)
+                with self._write_lock:
+                    self._swap(DataSnapshot(warm.master_df, warm.amount_scale, cube, self.snapshot.version + 1,
+                                            excluded=warm.excluded, file_stats=warm.file_stats))
+        metrics.METRICS.add_run(record)
+
+        if warm is None:
+            return False
+        if warm.changed_files or warm.removed_files:
+            self.reload_files(warm.changed_files, warm.removed_files)
+        return True
+
+    def _swap(self, snapshot):
+        # A single reference assignment, so readers see either the old or the new snapshot, never a mix
+        self.snapshot = snapshot
+        self.results.clear()
+
+
+class FinanceEngine:
+    """A per-client view: filter state plus the active slice of the shared dataset."""
+    def __init__(self, dataset=None):
+        # The shared master data. A standalone engine (scripts, notebooks) gets a private dataset
+        self.dataset = dataset if dataset is not None else FinanceDataset()
+        self._snapshot = self.dataset.snapshot
 
         # Active view, what the user sees right now. The small bucket
-        self.active_df = pd.DataFrame()
+        self.active_df = self._snapshot.master_df
+        self.active_count = len(self.active_df)
+
+        # Latency (ms) of the last call of each timed operation
+        self.timings = {}
+
+        # The UI queries the view from worker threads. A filter change and the queries that follow it
+        # must stay consistent. The lock is per view, so sessions never wait on each other
+        self._lock = threading.RLock()
 
         # Filter state of years and months
-        self.available_years = ["All Years"]
         self.available_months = ["All Months"]
         self.current_year = "All Years"
         self.current_month = "All Months"
 
-    def load_data(self):
-        """The delivery truck. calls the loader to get fresh data from the disk."""
-        self.master_df = data_loader.load_data_folder(config.DATA_FOLDER)
+    # --- SHARED DATA (read-only from the view) ---
+
+    @property
+    def master_df(self):
+        return self._snapshot.master_df
+
+    @property
+    def available_years(self):
+        return self._snapshot.available_years
+
+    @property
+    def data_version(self):
+        return self._snapshot.version
+
+    @property
+    def cube(self):
+        return self._snapshot.cube
 
-        if not self.master_df.empty:
-            # unique_years is a sorted list of all years found in the data
-            unique_years = sorted(self.master_df["Year"].unique().tolist(), reverse=True)
-            # Show all years and unique years in the same dropdown
-            self.available_years = ["All Years"] + unique_years
+    @property
+    def analytics(self):
+        return self._snapshot.analytics
 
+    @property
+    def amount_scale(self):
+        return self._snapshot.amount_scale
+
+    @property
+    def last_report(self):
+        return self._snapshot.report
+
+    @property
+    def memory_report(self):
+        return self._snapshot.memory_report
+
+    @property
+    def results(self):
+        return self.dataset.results
+
+    # --- LOADING (affects every view of the dataset) ---
+
+    def load_data(self):
+        """The delivery truck. calls the loader to get fresh data from the disk."""
+        status = self.dataset.load()
         # Make sure the app starts with an active dataframe instead of seeing blank screen
         self.filter_data("All Years", "All Months")
-        return f"Loaded {len(self.master_df)} transactions"
-    
+        return status
+
+    def set_data(self, report):
+        status = self.dataset.set_data(report)
+        self.filter_data("All Years", "All Months")
+        return status
+
+    def append_transactions(self, new_df):
+        self.dataset.append_transactions(new_df)
+        self._sync()
+
+    def reload_files(self, changed_files, removed_files=()):
+        report = self.dataset.reload_files(changed_files, removed_files)
+        self._sync()
+        return report
+
+    def _sync(self):
+        """Re-applies the current selection if the dataset swapped in new data since this view last filtered."""
+        if self._snapshot is not self.dataset.snapshot:
+            self.filter_data(self.current_year, self.current_month)
+
+    # --- FILTERING ---
+
+    def filter_data(self, year, month):
+        """The important function, which updates the active_df based on selected dropdowns."""
+        start = time.perf_counter()
+        with self._lock:
+            snapshot = self.dataset.snapshot
+            self.current_year = year
+            self.current_month = month
+
+            # Show all possible months
+            self.available_months = snapshot.all_months
+
+            if snapshot.store is not None:
+                # Nothing to slice, the store answers every query of the selection itself
+                self.active_df = snapshot.master_df
+                self.active_count = snapshot.store.count(year, month)
+            else:
+                # We look up the precomputed rows of the selection and slice them out of the master dataframe,
+                # which is stored in the active dataframe. Contiguous periods are zero-copy slices.
+                self.active_df = snapshot.master_df.iloc[snapshot.rows(year, month)] # save the result
+                self.active_count = len(self.active_df)
+            self._snapshot = snapshot
+
+        self.timings["filter_data"] = (time.perf_counter() - start) * 1000
+        metrics.record("filter", self.timings["filter_data"])
+
+    def get_dashboard_data(self, year, month, is_current=None):
+        """
+        Filters to (year, month) and computes everything the dashboard shows, as one consistent result.
+        is_current: optional callback. If it returns False by the time this request gets its turn,
+        the request was superseded (e.g. the user clicked on) and None is returned without doing any work.
+        """
+        with self._lock:
+            if is_current is not None and not is_current():
+                return None
+
+            self.filter_data(year, month)
+            return {
+                "kpis": self.get_kpis(),
+                "income": self.get_category_breakdown("income"),
+                "expense": self.get_category_breakdown("expense"),
+                "trend": self.get_monthly_trend(),
+                "balance": self.get_running_balance(),
+                "rolling": {window: self.get_rolling_average(window) for window in config.ROLLING_WINDOWS},
+                "yoy": self.get_year_over_year(),
+                "available_months": self.available_months,
+                "available_years": self.available_years,
+                "data_version": self.data_version,
+            }
+
+    def export_period(self, year, month, folder, fmt=None, columns=None):
+        """Writes the rows of (year, month) to folder, partitioned by month (see exporter.py)."""
+        with self._lock:
+            if (year, month) != (self.current_year, self.current_month):
+                self.filter_data(year, month)
+            active_df, amount_scale = self.active_df, self.amount_scale
+        return exporter.export_frame(active_df, folder, fmt, columns, amount_scale)
+
+    def get_period_transactions_page(self, year, month, category, *args, **kwargs):
+        """get_transactions_page for an explicit (year, month), safe to call from a worker thread."""
+        with self._lock:
+            if (year, month) != (self.current_year, self.current_month):
+                self.filter_data(year, month)
+            return self.get_transactions_page(category, *args, **kwargs)
+
+    # --- QUERIES ---
+
+    @cached_query
     def get_transactions_by_category(self, category):
         """Returns a list of transactions for a specific category from the active view."""
-        if self.active_df.empty:
-            return []
-        
-        # Filter active data for this category
-        df = self.active_df[self.active_df['Category'] == category].copy()
-        
-        # Sort by Date (Newest first)
-        df.sort_values('Date', ascending=False, inplace=True)
-        
-        # Format for UI
-        records = []
-        for _, row in df.iterrows():
-            records.append({
-                'Date': row['Date'].strftime('%d/%m/%Y'),
-                'Description': row['Desc'],
-                'Amount': row['Amount']
-            })
-        
+        records, _ = self.get_transactions_page(category, limit=None)
         return records
-    
-    def filter_data(self, year, month):
-        """The important function, which updates the active_df based on selected dropdowns."""
-        self.current_year = year
-        self.current_month = month
 
-        df = self.master_df.copy() # start fresh with a clone
+    @cached_query
+    def get_transactions_page(self, category, offset=0, limit=50, sort_by="Date", descending=True, text_filter=""):
+        """
+        Returns one page of a category's transactions from the active view, plus the total match count.
+        Only the rows of the requested page are formatted, so the UI never ships the full list.
+        sort_by: one of PAGE_SORT_COLUMNS ('Date', 'Description', 'Amount')
+        """
+        store = self._snapshot.store
+        if store is not None:
+            page, total = store.transactions_page(self.current_year, self.current_month, category,
+                                                  offset, limit, sort_by, descending, text_filter)
+        else:
+            page, total = self._page_in_memory(category, offset, limit, sort_by, descending, text_filter)
 
-        # We load data from the master dataframe and apply filters,
-        # which is stored in the active dataframe
+        if total == 0:
+            return [], 0
 
+        # Format for UI
+        records = pd.DataFrame({
+            "Date": page["Date"].dt.strftime("%d/%m/%Y"),
+            "Description": page["Desc"].astype(str),
+            "Amount": page["Amount"].to_numpy() / self.amount_scale,
+        }).to_dict("records")
+
+        return records, total
+
+    def _page_in_memory(self, category, offset, limit, sort_by, descending, text_filter):
+        """The rows of one page and the total match count, selected from the category index of the snapshot."""
+        df = self._snapshot.master_df
         if df.empty:
-            self.active_df = df
-            return
-        
-        if year != "All Years":
-            df = df[df["Year"] == year] # apply year filter
+            return df, 0
 
-            # Update available months for this specific year
-            valid_months = df.sort_values("Month_Num")["Month"].unique().tolist()
-            self.available_months = ["All Months"] + sorted(self.master_df["Month"].unique().tolist())
-        else:
-            # Show all possible months
-            self.available_months = ["All Months"] + sorted(self.master_df["Month"].unique().tolist())
+        # Positions in master_df, already in Date order (newest first). No scan of the active view
+        positions = self._snapshot.category_rows(self.current_year, self.current_month, category)
+        if text_filter and len(positions):
+            descs = df["Desc"].iloc[positions].astype(str)
+            positions = positions[descs.str.contains(text_filter, case=False, regex=False, na=False).to_numpy()]
+        total = len(positions)
 
-        if month != "All Months":
-            df = df[df["Month"] == month] # apply month filter
+        # Only other orders need a sort
+        if sort_by == "Date":
+            if not descending:
+                positions = positions[::-1]
+        else:
+            keys = df[PAGE_SORT_COLUMNS[sort_by]].iloc[positions].reset_index(drop=True)
+            if isinstance(keys.dtype, pd.CategoricalDtype):
+                keys = keys.astype(str) # categories are not in alphabetical order after a hot reload
+            order = keys.sort_values(ascending=not descending, kind="stable").index.to_numpy()
+            positions = positions[order]
 
-        self.active_df = df # save the result
+        stop = None if limit is None else offset + limit
+        return df.iloc[positions[offset:stop]], total
 
+    @cached_query
     def get_kpis(self):
         """Calculates the 4 big numbers for the top cards."""
-        if self.active_df.empty:
+        if not self.active_count:
             return 0, 0, 0, 0
         
-        # Income = sum of all positive numbers
-        total_income = self.active_df[self.active_df["Amount"] > 0]["Amount"].sum()
-
-        # expense = sum of all negative numbers
-        total_expense = self.active_df[self.active_df["Amount"] < 0]["Amount"].sum()
+        # Income = sum of all positive numbers, expense = sum of all negative numbers.
+        # Both come from the aggregate cube instead of scanning the transactions
+        total_income, total_expense = self.cube.kpis(self.current_year, self.current_month)
 
         net_savings = total_income - (total_expense *-1)
 
@@ -109,73 +601,71 @@ class FinanceEngine:
 
         return total_income, total_expense, net_savings, savings_rate
 
+    @cached_query
     def get_category_breakdown(self, type_filter="expense"):
         """
         Returns a sorted list of categories for charts/tables.
         type_filter: 'expense' (negative values) or 'income' (positive values)
         """
 
-        if self.active_df.empty:
+        if not self.active_count:
             return []
-        
-        df = self.active_df.copy()
-
-        if type_filter == "expense":
-            # Filter for expenses and flip sign to positive for the chart
-            # charts hate negative numbers. convert them to positive numbers
-            df = df[df["Amount"] < 0]
-            df["Abs_Amount"] = df["Amount"].abs()
-            total_vol = df["Abs_Amount"].sum()
-        else:
-            df = df[df["Amount"] > 0]
-            df["Abs_Amount"] = df["Amount"]
-            total_vol = df["Abs_Amount"].sum()
 
-        if total_vol == 0: return []
+        # Expenses are flipped to positive numbers for the chart
+        # charts hate negative numbers. the cube already returns absolute totals
+        sign = -1 if type_filter == "expense" else 1
+        totals = self.cube.category_totals(self.current_year, self.current_month, sign)
+        total_vol = totals.sum()
 
-        # Group by category and sum
-        grouped = df.groupby("Category")["Abs_Amount"].sum().reset_index()
-        grouped.sort_values("Abs_Amount", ascending=False, inplace=True)
+        if total_vol == 0: return []
 
         breakdown = []
-        for _, row in grouped.iterrows():
-            pct = (row["Abs_Amount"] / total_vol) * 100
+        for category, amount in totals.items():
+            pct = (amount / total_vol) * 100
             breakdown.append({
-                "category": row["Category"],
-                "amount": row["Abs_Amount"],
+                "category": category,
+                "amount": amount,
                 "pct": round(pct, 1),
-                "icon": config.CATEGORY_ICONS.get(row["Category"], "help")
+                "icon": config.CATEGORY_ICONS.get(category, "help")
             })
 
         return breakdown
     
+    @cached_query
     def get_monthly_trend(self):
-        if self.active_df.empty:
+        if not self.active_count:
             return [], [], []
 
-        df = self.master_df.copy()
-        if self.current_year != "All Years":
-            df = df[df['Year'] == self.current_year]
+        # One row per month of the selected year (or of all years), already sorted by date
+        monthly = self.cube.monthly_trend(self.current_year)
 
-        df['Sort_Key'] = df['Year'].astype(str) + "-" + df['Month_Num'].astype(str).str.zfill(2)
-        
-        # 1. Income (Sum of positive)
-        monthly = df.groupby(['Sort_Key', 'Month', 'Year']).agg({
-            'Amount': lambda x: x[x > 0].sum() 
-        }).rename(columns={'Amount': 'Income'})
-        
-        # 2. Expense (FIXED HERE)
-        # We use .apply(lambda x: abs(x[x < 0].sum())) to get the POSITIVE sum of negatives
-        monthly['Expense'] = df.groupby(['Sort_Key', 'Month', 'Year'])['Amount'].apply(lambda x: abs(x[x < 0].sum()))
-        
-        # 3. Net Calculation
-        # Because Expense is now positive, we SUBTRACT it to find the remaining Net
-        monthly['Net'] = monthly['Income'] - monthly['Expense']
-        
-        monthly = monthly.reset_index().sort_values('Sort_Key')
-
-        labels = [f"{row['Month'][:3]} {row['Year']}" for _, row in monthly.iterrows()]
+        labels = [f"{month[:3]} {year}" for year, month in zip(monthly['Year'], monthly['Month'])]
         income_data = monthly['Income'].tolist()
         expense_data = monthly['Expense'].tolist()
         
-        return labels, income_data, expense_data
\ No newline at end of file
+        return labels, income_data, expense_data
+
+
+    # --- TREND ANALYTICS ---
+    # Read from the month x category matrix (see analytics.py). They follow the selected year, not the month
+
+    @cached_query
+    def get_running_balance(self):
+        """Cumulative net savings since the first month, for the months of the selected year."""
+        return self.analytics.running_balance(self.current_year)
+
+    @cached_query
+    def get_rolling_average(self, window, type_filter="expense"):
+        """window-month moving average of the top categories of the selected year."""
+        return self.analytics.rolling_average(window, type_filter, self.current_year, config.TREND_TOP_CATEGORIES)
+
+    @cached_query
+    def get_year_over_year(self, type_filter="expense"):
+        """Monthly totals of the selected year (or the latest one) against the year before."""
+        return self.analytics.year_over_year(self.current_year, type_filter)
+
+def _as_slice(positions):
+    """Turns a run of consecutive row positions into a slice (a view), otherwise keeps the position array."""
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        return slice(int(positions[0]), int(positions[-1]) + 1)
+    return np.asarray(positions)
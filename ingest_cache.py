@@ -0,0 +1,192 @@
+"""
+This file is the loader's memory. It remembers every statement file it already processed,
+so a restart does not have to parse years of statements all over again.
+
+For every file we keep a manifest entry (path, size, mtime, content hash) and a Parquet copy
+of the cleaned, categorized rows. Unchanged files are read back from the Parquet copy,
+new or changed files go through the full parsing pipeline, and deleted files are evicted.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+import config
+from reconciler import RECONCILE_VERSION
+
+# Bump this whenever the normalized output of data_loader changes (shape or values, e.g. how amounts
+# or dates are parsed), so old cached frames are thrown away instead of being served.
+# The transaction store and the warm snapshot hold normalized rows too, and are rebuilt as well.
+# 2: decimal commas ('1.234,56', '3,5') in amounts
+# 3: repeated Excel header names are numbered ('Amount', 'Amount.1') like in CSVs
+# 4: rows whose amount cell holds text that is no amount are dropped instead of ingested as 0
+# 5: streamed workbooks number repeated header names too
+CACHE_VERSION = 5
+MANIFEST_NAME = "manifest.json"
+
+
+class IngestCache:
+    def __init__(self, cache_folder: str):
+        self.cache_folder = cache_folder
+        self.manifest_path = os.path.join(cache_folder, MANIFEST_NAME)
+
+        # Counters, so the caller can tell how much work the cache saved
+        self.hits = 0
+        self.misses = 0
+
+        self._dirty = False
+        self.entries: Dict[str, dict] = self._load_manifest()
+
+    # --- PUBLIC API ---
+
+    def get(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Returns the cached normalized frame for a file, or None if it must be parsed again."""
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stat = os.stat(key)
+
+        # Fast path: size and mtime did not move, so the file was not touched
+        if entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            # The file was touched. Only a different content hash means a real change.
+            if entry["size"] != stat.st_size or entry["hash"] != _file_hash(key):
+                self.misses += 1
+                return None
+
+            entry["mtime"] = stat.st_mtime
+            self._dirty = True
+
+        frame = self._read_frame(entry)
+        if frame is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return frame
+
+    def put(self, file_path: str, df: Optional[pd.DataFrame]):
+        """Stores the normalized frame of a freshly parsed file and records it in the manifest."""
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+
+        entry = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "hash": _file_hash(key),
+            "rows": 0,
+            "frame": None,
+        }
+
+        # Files that produced no rows are remembered too, so we do not re-parse garbage files
+        if df is not None and not df.empty:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            frame_name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".parquet"
+            df.to_parquet(os.path.join(self.cache_folder, frame_name), index=False)
+            entry["rows"] = len(df)
+            entry["frame"] = frame_name
+
+        self.entries[key] = entry
+        self._dirty = True
+
+    def evict_missing(self, folder_path: str, present_files: Iterable[str]) -> list:
+        """Drops manifest entries (and their cached frames) for files that no longer exist in the folder."""
+        folder = os.path.join(os.path.abspath(folder_path), "")
+        present = {os.path.abspath(p) for p in present_files}
+
+        return self.evict(k for k in self.entries if k.startswith(folder) and k not in present)
+
+    def evict(self, file_paths: Iterable[str]) -> list:
+        """Drops the manifest entries (and cached frames) of the given files."""
+        evicted = [os.path.abspath(p) for p in file_paths]
+        evicted = [k for k in evicted if k in self.entries]
+        for key in evicted:
+            self._remove_frame(self.entries.pop(key))
+
+        if evicted:
+            self._dirty = True
+        return evicted
+
+    def save(self):
+        """Writes the manifest to disk (atomically, so a crash never leaves half a file)."""
+        if not self._dirty:
+            return
+
+        os.makedirs(self.cache_folder, exist_ok=True)
+        payload = {
+            "version": CACHE_VERSION,
+            "rules": rules_fingerprint(),
+            "files": self.entries,
+        }
+
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self._dirty = False
+
+    # --- INTERNAL HELPERS ---
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # Cached frames are categorized, so a change in the rule book invalidates all of them
+        if payload.get("version") != CACHE_VERSION or payload.get("rules") != rules_fingerprint():
+            for entry in payload.get("files", {}).values():
+                self._remove_frame(entry)
+            self._dirty = True
+            return {}
+
+        return payload.get("files", {})
+
+    def _read_frame(self, entry: dict) -> Optional[pd.DataFrame]:
+        if not entry.get("frame"):
+            return pd.DataFrame()
+
+        try:
+            return pd.read_parquet(os.path.join(self.cache_folder, entry["frame"]))
+        except Exception:
+            return None
+
+    def _remove_frame(self, entry: dict):
+        if entry.get("frame"):
+            try:
+                os.remove(os.path.join(self.cache_folder, entry["frame"]))
+            except OSError:
+                pass
+
+
+def _file_hash(file_path: str) -> str:
+    """Content hash of a file, read in blocks so big exports do not need to fit in memory."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def rules_fingerprint() -> str:
+    # The first matching category wins, so the order of the rules is part of the fingerprint (no sort_keys).
+    # Merchant settings change categories as much as the rules do
+    rules = json.dumps([list(config.CATEGORY_RULES.items()), config.MERCHANT_BRANCH_WORDS,
+                        config.MERCHANT_FUZZY_THRESHOLD, config.MERCHANT_FUZZY_MIN_LENGTH], ensure_ascii=False)
+    return hashlib.sha1(rules.encode("utf-8")).hexdigest()
+
+
+def reconcile_fingerprint() -> str:
+    # Not used by the cache (files are cached before reconciliation), but by what holds reconciled rows:
+    # the transaction store and the warm snapshot
+    settings = json.dumps([RECONCILE_VERSION, config.RECONCILE, config.CARD_BILL_CATEGORY,
+                           config.CARD_BILL_MONTH_OFFSET, config.CARD_BILL_TOLERANCE], ensure_ascii=False)
+    return hashlib.sha1(settings.encode("utf-8")).hexdigest()
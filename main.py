@@ -1,9 +1,82 @@
+import time
+# Time-to-first-render is measured from here, before the heavy imports
+STARTED = time.perf_counter()
+
+import asyncio
+import os
 from nicegui import ui, app, run
-from finance_engine import FinanceEngine
+from nicegui import json as nicegui_json
+from finance_engine import FinanceDataset, FinanceEngine, PAGE_SORT_COLUMNS
 import config
+import data_loader
+import metrics
+from data_watcher import DataFolderWatcher
+from prefetcher import Prefetcher, adjacent_periods
+
+# Rows per page in the category drill-down grid
+TX_PAGE_SIZE = 10
+
+# Every line of the rolling average chart (one per top category) is drawn like this
+ROLLING_SERIES_STYLE = {'type': 'line', 'smooth': True, 'showSymbol': False, 'connectNulls': False}
+
+# --- 1. INITIALIZE DATA ---
+# Master data is loaded once and shared by every browser session (`dataset`, created under the main guard
+# at the bottom, together with the folder watcher and the prefetcher).
+# Each page gets its own FinanceEngine view (filters), see dashboard()
+
+# Only one ingestion runs at a time, however many browsers open the page while it is loading
+_load_lock = asyncio.Lock()
+
+async def ensure_data_loaded():
+    """Loads the master data once, without blocking the event loop."""
+    async with _load_lock:
+        if dataset.data_version == 0:
+            # Warm start: serve the snapshot written on the last shutdown, re-ingesting only files changed since
+            if config.WARM_START and await run.io_bound(dataset.restore_snapshot):
+                metrics.record("startup_data_ready", (time.perf_counter() - STARTED) * 1000)
+                return
+
+            # Parsing runs in a worker process, the index/cube build in a worker thread
+            if dataset.store is not None:
+                report = await run.cpu_bound(data_loader.sync_store, config.DATA_FOLDER, dataset.store.path)
+            else:
+                report = await run.cpu_bound(data_loader.ingest_folder, config.DATA_FOLDER)
+            await run.io_bound(dataset.set_data, report)
+            metrics.record("startup_data_ready", (time.perf_counter() - STARTED) * 1000)
+
+def on_data_change(added, modified, removed):
+    """Called from the watcher thread with one debounced batch of file changes."""
+    dataset.reload_files(added + modified, removed)
+    print(f"Hot reload: {len(added)} added, {len(modified)} modified, {len(removed)} removed files")
+
+async def start_background_services():
+    await ensure_data_loaded()
+    if config.WATCH_DATA_FOLDER:
+        watcher.start()
+
+def stop_background_services():
+    watcher.stop()
+    prefetcher.shutdown()
+    if config.WARM_START:
+        dataset.save_snapshot()
+
+# Printed once, for the first page that gets its dashboard drawn
+_first_render = {'done': False}
+
+def report_first_render(page_opened):
+    """Records how long a page took to show real data, and the server's time-to-first-render once."""
+    now = time.perf_counter()
+    metrics.record("page_first_render", (now - page_opened) * 1000)
+    if not _first_render['done']:
+        _first_render['done'] = True
+        ms = (now - STARTED) * 1000
+        metrics.record("time_to_first_render", ms)
+        print(f"Dashboard interactive {ms:,.0f} ms after start")
 
-# --- 1. INITIALIZE ENGINE ---
-engine = FinanceEngine()
+def meter_payload(payload):
+    """Counts a chart or grid payload about to be sent to the browser, at the size of its JSON."""
+    metrics.count("ui_bytes_sent", len(nicegui_json.dumps(payload).encode()))
+    metrics.count("ui_messages_sent")
 
 # --- 2. UI DASHBOARD ---
 @ui.page('/')
@@ -19,79 +92,219 @@ def dashboard():
         <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
     ''') 
 
-    # 1. Load Data
-    if engine.master_df.empty:
-        engine.load_data()   
-    
-    view_state = {'chart_mode': 'pie'}
-    
+    # This session's view of the shared data: its own year/month filter, no copy of the master data
+    engine = FinanceEngine(dataset)
+
+    # 'request' counts refresh requests, so results of superseded requests can be dropped.
+    # 'data_version' is the engine data version this page last drew.
+    view_state = {'chart_mode': 'pie', 'request': 0, 'data_version': 0,
+                  'window': config.ROLLING_WINDOWS[0], 'rolling': {}}
+    # Charts that got their first full draw, later draws only send what changed
+    drawn_charts = set()
+    page_opened = time.perf_counter()
+    client = ui.context.client
+    client.on_delete(lambda: prefetcher.forget(client.id))
+
+    # --- HELPER: LOAD DATA OFF THE EVENT LOOP ---
+    async def refresh(year, month):
+        """Computes the dashboard data for a period in a worker thread, then redraws."""
+        view_state['request'] += 1
+        token = view_state['request']
+        is_current = lambda: token == view_state['request']
+
+        # Prefetches around the previous period are useless now, and would compete with this request
+        prefetcher.cancel(client.id)
+
+        spinner.visible = True
+        try:
+            data = await run.io_bound(engine.get_dashboard_data, year, month, is_current)
+        finally:
+            if is_current():
+                spinner.visible = False
+
+        # The user already clicked on to another period, this result is stale
+        if data is None or not is_current():
+            return None
+
+        first_draw = view_state['data_version'] == 0
+        view_state['data_version'] = data['data_version']
+        refresh_ui(data)
+        metrics.count("ui_refreshes")
+        if first_draw:
+            report_first_render(page_opened)
+
+        # Warm up where the arrows lead next. Month options are the same for every year
+        if config.PREFETCH_ADJACENT:
+            prefetcher.schedule(client.id, adjacent_periods(data['available_years'], data['available_months'],
+                                                            year, month))
+        return data
+
+    async def export_view():
+        """Exports what the page shows (the selected year/month) without blocking the event loop."""
+        if dataset.store is not None:
+            ui.notify('Export needs STORE_BACKEND = "memory"', type='warning')
+            return
+
+        year, month = sel_year.value, sel_month.value
+        folder = os.path.join(config.EXPORT_FOLDER, f"{year}_{month}".replace(' ', '_'))
+        try:
+            result = await run.io_bound(engine.export_period, year, month, folder)
+        except Exception as e:
+            ui.notify(f"Export failed: {e}", type='negative')
+            return
+        ui.notify(f"Exported {result.rows:,} rows to {result.folder}", type='positive')
+
+    async def check_for_new_data():
+        """Pushes a refresh to this page when the folder watcher hot-reloaded files since it last drew."""
+        if view_state['data_version'] in (0, dataset.data_version):
+            return
+        view_state['data_version'] = dataset.data_version
+        sel_year.options = dataset.snapshot.available_years
+        sel_year.update()
+        # A reload can add a month, or remove the selected one
+        sel_month.options = dataset.snapshot.all_months
+        sel_month.update()
+        if sel_month.value not in sel_month.options:
+            sel_month.value = "All Months"
+            return # the value change refreshes the page
+        await refresh(sel_year.value, sel_month.value)
+
     # --- HELPER: LOGIC TO REFRESH UI ---
-    def refresh_ui():
+    # Cards, rows and charts are built once and then only updated: a refresh pushes the texts,
+    # colors, bar widths and chart series that changed (NiceGUI skips assignments that change nothing).
+    def refresh_ui(data):
         # 1. Get Data from Engine
-        income, expense, net, savings_rate = engine.get_kpis()
+        income, expense, net, savings_rate = data['kpis']
         
         # 2. Update Top Cards
-        # We assume specific element IDs or clear/fill containers. 
-        # Since we use clear() on containers below, we just rebuild them.
-        
-        con_top_cards.clear()
-        with con_top_cards:
-            render_kpi_card("Total Net", net, "savings", "blue-500", "Total savings", f"{'+' if net>0 else ''}{net:,.0f} ₪")
-            render_kpi_card("Total Income", income, "trending_up", "emerald-500", "Earnings", f"{income:,.0f} ₪")
-            render_kpi_card("Total Expenses", expense, "trending_down", "rose-500", "Spending", f"{expense:,.0f} ₪")
-            
-            # Savings Rate Logic
-            color = "emerald-500" if savings_rate >= 20 else "orange-500"
-            if savings_rate < 0: color = "rose-500"
-            render_kpi_card("Savings Rate", savings_rate, "pie_chart", color, "Target: 20%", f"{savings_rate:.1f}%")
+        update_kpi_card(kpi_cards['net'], f"{'+' if net>0 else ''}{net:,.0f} ₪")
+        update_kpi_card(kpi_cards['income'], f"{income:,.0f} ₪")
+        update_kpi_card(kpi_cards['expense'], f"{expense:,.0f} ₪")
+
+        # Savings Rate Logic
+        color = "emerald-500" if savings_rate >= 20 else "orange-500"
+        if savings_rate < 0: color = "rose-500"
+        update_kpi_card(kpi_cards['savings'], f"{savings_rate:.1f}%", color)
 
         # 3. Update Breakdowns
-        con_breakdowns.clear()
-        with con_breakdowns:
-            # Income Breakdown
-            income_data = engine.get_category_breakdown('income')
-            render_breakdown_card("Income Breakdown", income_data, is_income=True)
-            
-            # Expense Breakdown
-            expense_data = engine.get_category_breakdown('expense')
-            render_breakdown_card("Expense Breakdown", expense_data, is_income=False)
+        update_breakdown_card(breakdown_cards['income'], data['income'])
+        update_breakdown_card(breakdown_cards['expense'], data['expense'])
 
         # 4. Update Charts
-        refresh_charts()
+        refresh_charts(data)
 
-    def refresh_charts():
+    def refresh_charts(data):
         # Monthly Trend Chart
-        labels, inc_data, exp_data = engine.get_monthly_trend()
-        chart_trend.options['xAxis']['data'] = labels
-        chart_trend.options['series'][0]['data'] = inc_data
-        chart_trend.options['series'][1]['data'] = exp_data
-        chart_trend.update()
+        labels, inc_data, exp_data = data['trend']
+        update_chart(chart_trend, {'Income': inc_data, 'Expense': exp_data}, axis_data=labels)
+
+        # Trend Analytics: running balance, rolling averages and year over year
+        labels, balance = data['balance']
+        update_chart(chart_balance, {'Balance': balance}, axis_data=labels)
+
+        view_state['rolling'] = data['rolling']
+        refresh_rolling_chart()
+
+        year, months, current, previous, change = data['yoy']
+        lbl_yoy.text = f"{year} vs {year - 1}" if year else ""
+        update_chart(chart_yoy, {'This Year': current, 'Last Year': previous, 'Change %': change}, axis_data=months)
 
         # Category Pie Chart (for Transactions Tab)
-        exp_breakdown = engine.get_category_breakdown('expense')
+        exp_breakdown = data['expense']
         if exp_breakdown:
-            chart_cat.options['series'][0]['data'] = [
+            update_chart(chart_cat, {'Category': [
                 {'value': x['amount'], 'name': x['category']} for x in exp_breakdown
-            ]
-            chart_cat.update()
+            ]})
+
+    def refresh_rolling_chart():
+        labels, series = view_state['rolling'][view_state['window']]
+        update_chart(chart_rolling, series, axis_data=labels, series_style=ROLLING_SERIES_STYLE)
+
+    def update_chart(chart, series_data, axis_data=None, series_style=None):
+        """
+        Sends only what changed since the last draw: the x axis labels and the data of the changed
+        series (matched by name), merged in the browser by ECharts' setOption.
+        The first draw sends the whole chart, the browser may not have created it yet.
+        With series_style the series themselves come from series_data (e.g. one line per top category),
+        and the chart is redrawn in full whenever that set of names changes.
+        """
+        options = chart.options
+        if series_style is not None and [s['name'] for s in options['series']] != list(series_data):
+            drawn_charts.add(chart.id)
+            options['series'] = [dict(series_style, name=name, data=data) for name, data in series_data.items()]
+            if axis_data is not None:
+                options['xAxis']['data'] = axis_data
+            meter_payload(options)
+            chart.update()
+            return
+
+        delta = {}
+        if axis_data is not None and options['xAxis']['data'] != axis_data:
+            delta['xAxis'] = {'data': axis_data}
+        changed = [{'name': s['name'], 'data': series_data[s['name']]} for s in options['series']
+                   if s['name'] in series_data and s['data'] != series_data[s['name']]]
+        if changed:
+            delta['series'] = changed
+        if not delta:
+            return
+
+        def apply():
+            if 'xAxis' in delta:
+                options['xAxis']['data'] = axis_data
+            for series in options['series']:
+                if series['name'] in series_data:
+                    series['data'] = series_data[series['name']]
+
+        if chart.id not in drawn_charts:
+            drawn_charts.add(chart.id)
+            apply()
+            meter_payload(options)
+            chart.update()
+            return
+
+        # Keep the server-side options current (for re-renders) without resending them
+        with chart.props.suspend_updates():
+            apply()
+        meter_payload(delta)
+        chart.run_chart_method('setOption', delta)
 
     # --- HELPER: UI COMPONENTS ---
-    def render_kpi_card(title, value, icon, color, sub_text, display_value):
-        card_classes = f'p-5 rounded-xl border border-{color}/30 bg-{color}/15 shadow-sm hover:shadow-md transition-all'
-        
-        with ui.card().classes(card_classes):
+    def kpi_classes(color):
+        return {
+            'card': f'p-5 rounded-xl border border-{color}/30 bg-{color}/15 shadow-sm hover:shadow-md transition-all',
+            'icon': f'p-3 rounded-lg bg-{color}/20 text-{color}',
+            'sub': f'text-xs font-medium mt-3 text-{color}',
+        }
+
+    def render_kpi_card(title, icon, color, sub_text):
+        """Draws an empty KPI card and returns its elements, filled in by update_kpi_card."""
+        classes = kpi_classes(color)
+        kpi = {'color': color}
+
+        with ui.card().classes(classes['card']) as kpi['card']:
             with ui.row().classes('justify-between items-start w-full'):
                 with ui.column().classes('gap-1'):
                     ui.label(title).classes('text-slate-400 text-sm font-medium uppercase tracking-wider')
-                    ui.label(display_value).classes(f'text-2xl font-bold text-white')
+                    kpi['value'] = ui.label().classes(f'text-2xl font-bold text-white')
                 
                 # Icon box with slightly stronger color (20% opacity)
-                with ui.element('div').classes(f'p-3 rounded-lg bg-{color}/20 text-{color}'):
+                with ui.element('div').classes(classes['icon']) as kpi['icon']:
                     ui.icon(icon, size='sm')
             
-            ui.label(sub_text).classes(f'text-xs font-medium mt-3 text-{color}')
+            kpi['sub'] = ui.label(sub_text).classes(classes['sub'])
+        return kpi
+
+    def update_kpi_card(kpi, display_value, color=None):
+        kpi['value'].text = display_value
+        if color and color != kpi['color']:
+            kpi['color'] = color
+            for part, classes in kpi_classes(color).items():
+                kpi[part].classes(replace=classes)
+
+    def render_breakdown_card(title, is_income):
+        """Draws a breakdown card without rows. Rows are added by update_breakdown_card when first needed."""
+        breakdown = {'is_income': is_income, 'rows': []}
 
-    def render_breakdown_card(title, items, is_income):
         with ui.card().classes('p-6 rounded-xl border border-slate-700 bg-slate-800 shadow-sm h-full'):
             # --- Header ---
             with ui.row().classes('items-center justify-between w-full mb-6'):
@@ -102,36 +315,57 @@ def dashboard():
                 ui.button(icon='more_horiz').props('flat round dense color=grey-6')
             
             # --- List Area ---
-            with ui.scroll_area().classes('h-64 pr-4'):
-                if not items:
-                    ui.label("No data available").classes('text-slate-500 italic')
+            with ui.scroll_area().classes('h-64 pr-4') as breakdown['list']:
+                breakdown['empty'] = ui.label("No data available").classes('text-slate-500 italic')
+        return breakdown
+
+    def update_breakdown_card(breakdown, items):
+        """Rewrites the rows in place. Rows beyond the current item count are hidden and kept for later."""
+        rows = breakdown['rows']
+        breakdown['empty'].visible = not items
+
+        for i, item in enumerate(items):
+            if i == len(rows):
+                with breakdown['list']:
+                    rows.append(render_breakdown_row(breakdown['is_income']))
+            row = rows[i]
+            row['row'].visible = True
+            row['icon'].name = item.get('icon', 'circle')
+            row['category'].text = item['category']
+            row['pct'].text = f"{item['pct']}%"
+            row['bar'].style(replace=f"width: {item['pct']}%")
+            row['amount'].text = f"{item['amount']:,.0f} ₪"
+
+        for row in rows[len(items):]:
+            row['row'].visible = False
+
+    def render_breakdown_row(is_income):
+        bar_color = "bg-emerald-500" if is_income else "bg-rose-500"
+        row = {}
+
+        with ui.row() \
+            .classes('w-full justify-between items-center mb-2 group cursor-pointer hover:bg-slate-700/30 p-2 rounded-lg transition-colors') as row['row']:
+            
+            # Left Side: Icon + Details
+            with ui.row().classes('items-center gap-2 flex-grow'): # Increased gap from gap-3 to gap-4
+                
+                # Icon Box - Increased padding (p-3) and icon size ('sm')
+                with ui.element('div').classes('p-3 rounded-lg bg-slate-700 text-slate-300 group-hover:text-white group-hover:bg-blue-500/20 transition-all'):
+                    row['icon'] = ui.icon('circle', size='sm') 
                 
-                for item in items:
-                    icon_name = item.get('icon', 'circle') 
-                    bar_color = "bg-emerald-500" if is_income else "bg-rose-500"
+                with ui.column().classes('gap-1 flex-grow min-w-[200px]'):
+                    with ui.row().classes('justify-between w-full'):
+                        # Category Name: Increased to text-base (was text-sm)
+                        row['category'] = ui.label().classes('font-medium text-slate-200 text-base')
+                        # Percentage: Increased to text-sm (was text-xs)
+                        row['pct'] = ui.label().classes('text-sm text-slate-500')
                     
-                    with ui.row() \
-                        .classes('w-full justify-between items-center mb-2 group cursor-pointer hover:bg-slate-700/30 p-2 rounded-lg transition-colors'):
-                        
-                        # Left Side: Icon + Details
-                        with ui.row().classes('items-center gap-2 flex-grow'): # Increased gap from gap-3 to gap-4
-                            
-                            # Icon Box - Increased padding (p-3) and icon size ('sm')
-                            with ui.element('div').classes('p-3 rounded-lg bg-slate-700 text-slate-300 group-hover:text-white group-hover:bg-blue-500/20 transition-all'):
-                                ui.icon(icon_name, size='sm') 
-                            
-                            with ui.column().classes('gap-1 flex-grow min-w-[200px]'):
-                                with ui.row().classes('justify-between w-full'):
-                                    # Category Name: Increased to text-base (was text-sm)
-                                    ui.label(item['category']).classes('font-medium text-slate-200 text-base')
-                                    # Percentage: Increased to text-sm (was text-xs)
-                                    ui.label(f"{item['pct']}%").classes('text-sm text-slate-500')
-                                
-                                with ui.element('div').classes('w-full h-2 rounded-full bg-slate-700 overflow-hidden'): # Thicker bar (h-2)
-                                    ui.element('div').classes(f'h-full rounded-full {bar_color}').style(f"width: {item['pct']}%")
-
-                        # Amount: Increased to text-base (was text-sm)
-                        ui.label(f"{item['amount']:,.0f} ₪").classes('font-bold text-slate-200 text-base ml-4')
+                    with ui.element('div').classes('w-full h-2 rounded-full bg-slate-700 overflow-hidden'): # Thicker bar (h-2)
+                        row['bar'] = ui.element('div').classes(f'h-full rounded-full {bar_color}')
+
+            # Amount: Increased to text-base (was text-sm)
+            row['amount'] = ui.label().classes('font-bold text-slate-200 text-base ml-4')
+        return row
 
     # --- LAYOUT CONSTRUCTION ---
     with ui.column().classes('w-full max-w-7xl mx-auto px-4 md:px-6 lg:px-8 py-6'):
@@ -145,17 +379,17 @@ def dashboard():
                 
                 with ui.row().classes('items-center gap-6'):
                     # Year Nav
-                    def change_year(val):
-                        engine.filter_data(val, sel_month.value)
+                    async def change_year(val):
+                        data = await refresh(val, sel_month.value)
+                        if data is None: return # superseded by a newer click
                         # Update months dropdown based on selected year
-                        sel_month.options = engine.available_months
-                        if sel_month.value not in engine.available_months:
+                        sel_month.options = data['available_months']
+                        sel_month.update()
+                        if sel_month.value not in data['available_months']:
                             sel_month.value = "All Months"
-                        refresh_ui()
 
                     def nav_year(direction):
-                        years = engine.available_years
-                        print(years)
+                        years = sel_year.options
                         if not years: return
                         try:
                             idx = years.index(sel_year.value)
@@ -165,16 +399,15 @@ def dashboard():
 
                     with ui.row().classes('items-center bg-slate-700 rounded-lg p-1 border border-slate-600 gap-1'):
                         ui.button(icon='chevron_left', on_click=lambda: nav_year(-1)).props('flat dense color=grey-4')
-                        sel_year = ui.select(engine.available_years, value=engine.current_year, on_change=lambda e: change_year(e.value)).props('standout="bg-grey-9 text-white" dense options-dense borderless').classes('text-lg font-bold text-white w-28 text-center')
+                        sel_year = ui.select(engine.available_years, value="All Years", on_change=lambda e: change_year(e.value)).props('standout="bg-grey-9 text-white" dense options-dense borderless').classes('text-lg font-bold text-white w-28 text-center')
                         ui.button(icon='chevron_right', on_click=lambda: nav_year(1)).props('flat dense color=grey-4')
 
                     # Month Nav
-                    def change_month(val):
-                        engine.filter_data(sel_year.value, val)
-                        refresh_ui()
+                    async def change_month(val):
+                        await refresh(sel_year.value, val)
 
                     def nav_month(direction):
-                        months = engine.available_months
+                        months = sel_month.options
                         if not months: return
                         try:
                             idx = months.index(sel_month.value)
@@ -184,10 +417,17 @@ def dashboard():
 
                     with ui.row().classes('items-center bg-slate-700 rounded-lg p-1 border border-slate-600 gap-1'):
                         ui.button(icon='chevron_left', on_click=lambda: nav_month(-1)).props('flat dense color=grey-4')
-                        sel_month = ui.select(engine.available_months, value=engine.current_month, on_change=lambda e: change_month(e.value)).props('standout="bg-grey-9 text-white" dense options-dense borderless').classes('text-sm text-slate-400 w-28 text-center')
+                        sel_month = ui.select(engine.available_months, value="All Months", on_change=lambda e: change_month(e.value)).props('standout="bg-grey-9 text-white" dense options-dense borderless').classes('text-sm text-slate-400 w-28 text-center')
                         ui.button(icon='chevron_right', on_click=lambda: nav_month(1)).props('flat dense color=grey-4')
 
-                    
+                    # Loading state, visible while data is being loaded or computed
+                    spinner = ui.spinner(size='lg').props('color=blue-5')
+
+                    # Writes the selected period's rows to EXPORT_FOLDER (Parquet/CSV, see exporter.py)
+                    ui.button(icon='file_download', on_click=lambda: export_view()).props('flat round dense color=grey-5').tooltip('Export')
+
+                    # Timings and counters of the loader and the engine
+                    ui.button(icon='speed', on_click=lambda: ui.navigate.to('/admin')).props('flat round dense color=grey-5').tooltip('Metrics')
 
                     # User Avatar (Preserved)
                     with ui.row().classes('items-center gap-3 border-l border-slate-600 pl-6'):
@@ -207,10 +447,20 @@ def dashboard():
             # 1. OVERVIEW TAB
             with ui.tab_panel(tab_overview).classes('p-0 gap-6'):
                 # KPI Grid
-                con_top_cards = ui.grid().classes('grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 w-full')
+                with ui.grid().classes('grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 w-full'):
+                    kpi_cards = {
+                        'net': render_kpi_card("Total Net", "savings", "blue-500", "Total savings"),
+                        'income': render_kpi_card("Total Income", "trending_up", "emerald-500", "Earnings"),
+                        'expense': render_kpi_card("Total Expenses", "trending_down", "rose-500", "Spending"),
+                        'savings': render_kpi_card("Savings Rate", "pie_chart", "emerald-500", "Target: 20%"),
+                    }
                 
                 # Breakdown Grid
-                con_breakdowns = ui.grid().classes('grid-cols-1 lg:grid-cols-2 gap-6 w-full')
+                with ui.grid().classes('grid-cols-1 lg:grid-cols-2 gap-6 w-full'):
+                    breakdown_cards = {
+                        'income': render_breakdown_card("Income Breakdown", is_income=True),
+                        'expense': render_breakdown_card("Expense Breakdown", is_income=False),
+                    }
 
                 # Monthly Trend Chart Area
                 with ui.card().classes('w-full p-6 rounded-xl border border-slate-700 bg-slate-800 shadow-sm mt-6'):
@@ -227,6 +477,61 @@ def dashboard():
                         ]
                     }).classes('h-72 w-full')
 
+                # Trend Analytics Area
+                with ui.grid().classes('grid-cols-1 lg:grid-cols-2 gap-6 w-full mt-6'):
+                    with ui.card().classes('lg:col-span-2 p-6 rounded-xl border border-slate-700 bg-slate-800 shadow-sm'):
+                        ui.label("Running Balance").classes('text-lg font-bold text-slate-100 mb-4')
+                        chart_balance = ui.echart({
+                            'tooltip': {'trigger': 'axis'},
+                            'grid': {'left': '3%', 'right': '4%', 'bottom': '5%', 'containLabel': True},
+                            'xAxis': {'type': 'category', 'data': [], 'axisLine': {'lineStyle': {'color': '#475569'}}},
+                            'yAxis': {'type': 'value', 'splitLine': {'lineStyle': {'color': '#334155'}}},
+                            'series': [
+                                {'name': 'Balance', 'type': 'line', 'data': [], 'smooth': True, 'showSymbol': False,
+                                 'itemStyle': {'color': '#3b82f6'}, 'areaStyle': {'opacity': 0.15}}
+                            ]
+                        }).classes('h-64 w-full')
+
+                    with ui.card().classes('p-6 rounded-xl border border-slate-700 bg-slate-800 shadow-sm'):
+                        with ui.row().classes('w-full justify-between items-center mb-4'):
+                            ui.label("Rolling Average Spend").classes('text-lg font-bold text-slate-100')
+
+                            def change_window(window):
+                                view_state['window'] = window
+                                if view_state['rolling']:
+                                    refresh_rolling_chart()
+
+                            ui.toggle({w: f"{w}M" for w in config.ROLLING_WINDOWS}, value=view_state['window'],
+                                      on_change=lambda e: change_window(e.value)).props('dense no-caps toggle-color=blue-6 color=grey-9')
+                        chart_rolling = ui.echart({
+                            'tooltip': {'trigger': 'axis'},
+                            'legend': {'textStyle': {'color': '#94a3b8'}, 'bottom': 0},
+                            'grid': {'left': '3%', 'right': '4%', 'bottom': '15%', 'containLabel': True},
+                            'xAxis': {'type': 'category', 'data': [], 'axisLine': {'lineStyle': {'color': '#475569'}}},
+                            'yAxis': {'type': 'value', 'splitLine': {'lineStyle': {'color': '#334155'}}},
+                            'series': []
+                        }).classes('h-72 w-full')
+
+                    with ui.card().classes('p-6 rounded-xl border border-slate-700 bg-slate-800 shadow-sm'):
+                        with ui.row().classes('w-full justify-between items-center mb-4'):
+                            ui.label("Year over Year Spend").classes('text-lg font-bold text-slate-100')
+                            lbl_yoy = ui.label().classes('text-sm text-slate-400')
+                        chart_yoy = ui.echart({
+                            'tooltip': {'trigger': 'axis'},
+                            'legend': {'textStyle': {'color': '#94a3b8'}, 'bottom': 0},
+                            'grid': {'left': '3%', 'right': '4%', 'bottom': '15%', 'containLabel': True},
+                            'xAxis': {'type': 'category', 'data': [], 'axisLine': {'lineStyle': {'color': '#475569'}}},
+                            'yAxis': [
+                                {'type': 'value', 'splitLine': {'lineStyle': {'color': '#334155'}}},
+                                {'type': 'value', 'axisLabel': {'formatter': '{value}%'}, 'splitLine': {'show': False}},
+                            ],
+                            'series': [
+                                {'name': 'This Year', 'type': 'bar', 'data': [], 'itemStyle': {'color': '#ef4444'}, 'barMaxWidth': 14},
+                                {'name': 'Last Year', 'type': 'bar', 'data': [], 'itemStyle': {'color': '#64748b'}, 'barMaxWidth': 14},
+                                {'name': 'Change %', 'type': 'line', 'yAxisIndex': 1, 'data': [], 'itemStyle': {'color': '#f59e0b'}}
+                            ]
+                        }).classes('h-72 w-full')
+
             # 2. TRANSACTIONS TAB
             with ui.tab_panel(tab_transactions).classes('p-0 mt-6'):
                 
@@ -286,8 +591,9 @@ def dashboard():
 
                 # --- INTERACTIVITY LOGIC ---
                 
-                def show_category_details(category):
-                    txs = engine.get_transactions_by_category(category)
+                async def show_category_details(category):
+                    # Server-side paging: only the visible page is computed and sent to the grid
+                    state = {'offset': 0, 'sort_by': 'Date', 'descending': True, 'text': '', 'request': 0}
                     icon = config.CATEGORY_ICONS.get(category, 'circle')
 
                     tx_details_container.clear()
@@ -299,31 +605,81 @@ def dashboard():
                                     ui.icon(icon)
                                 with ui.column().classes('gap-0'):
                                     ui.label(f"{category} Transactions").classes('text-xl font-bold text-slate-100')
-                                    ui.label(f"{len(txs)} records found").classes('text-xs text-slate-400')
+                                    lbl_count = ui.label().classes('text-xs text-slate-400')
                             
                             ui.button(icon='close', on_click=lambda: reset_details_view()).props('flat round dense color=grey')
 
-                        # 2. Table (Fills remaining height)
-                        if not txs:
-                            with ui.column().classes('w-full flex-grow justify-center items-center'):
-                                ui.label("No transactions found.").classes('text-slate-500 italic')
-                        else:
-                            # 'flex-grow' forces the table to stretch to the bottom of the card
-                            # 'sticky-header' keeps the header fixed while scrolling rows
-                            ui.aggrid({
-                                'columnDefs': [
-                                    {'headerName': 'Date', 'field': 'Date', 'filter': True},
-                                    {'headerName': 'Description', 'field': 'Description', 'filter': True},
-                                    {'headerName': 'Amount', 'field': 'Amount', 'filter': True}
-                                ],
-                                'rowData': txs,
-                                'pagination': {'rowsPerPage': 8},
-                                'paginationPageSize': 8,
-                                'defaultColDef': {
-                                    'resizable': True,
-                                    'sortable': True
-                                }
-                            }).classes('w-full flex-grow').props('flat bordered dark')
+                        # 2. Search + Sort controls (handled by the engine, not by the browser)
+                        with ui.row().classes('w-full items-center gap-3 mb-2'):
+                            ui.input(placeholder='Search description', on_change=lambda e: set_filter(e.value)) \
+                                .props('dense outlined dark clearable debounce=300').classes('flex-grow')
+                            ui.select(list(PAGE_SORT_COLUMNS), value='Date', on_change=lambda e: set_sort(e.value)) \
+                                .props('dense outlined dark options-dense').classes('w-36')
+                            btn_dir = ui.button(icon='south', on_click=lambda: toggle_direction()).props('flat round dense color=grey-4')
+
+                        # 3. Table (Fills remaining height)
+                        # 'flex-grow' forces the table to stretch to the bottom of the card
+                        grid = ui.aggrid({
+                            'columnDefs': [
+                                {'headerName': 'Date', 'field': 'Date'},
+                                {'headerName': 'Description', 'field': 'Description'},
+                                {'headerName': 'Amount', 'field': 'Amount'}
+                            ],
+                            'rowData': [],
+                            'defaultColDef': {
+                                'resizable': True,
+                                'sortable': False
+                            }
+                        }).classes('w-full flex-grow').props('flat bordered dark')
+
+                        # 4. Pager
+                        with ui.row().classes('w-full justify-end items-center gap-2 mt-2'):
+                            btn_prev = ui.button(icon='chevron_left', on_click=lambda: turn_page(-1)).props('flat dense color=grey-4')
+                            lbl_page = ui.label().classes('text-sm text-slate-400')
+                            btn_next = ui.button(icon='chevron_right', on_click=lambda: turn_page(1)).props('flat dense color=grey-4')
+
+                    async def load_page():
+                        state['request'] += 1
+                        token = state['request']
+                        rows, total = await run.io_bound(
+                            engine.get_period_transactions_page, sel_year.value, sel_month.value,
+                            category, state['offset'], TX_PAGE_SIZE,
+                            state['sort_by'], state['descending'], state['text'])
+
+                        # A newer page/search request was made while this one was running
+                        if token != state['request']: return
+
+                        grid.options['rowData'] = rows
+                        meter_payload(rows)
+                        grid.update()
+
+                        lbl_count.text = f"{total} records found"
+                        first = state['offset'] + 1 if total else 0
+                        lbl_page.text = f"{first}-{state['offset'] + len(rows)} of {total}"
+                        btn_prev.enabled = state['offset'] > 0
+                        btn_next.enabled = state['offset'] + TX_PAGE_SIZE < total
+
+                    async def turn_page(direction):
+                        state['offset'] = max(0, state['offset'] + direction * TX_PAGE_SIZE)
+                        await load_page()
+
+                    async def set_filter(text):
+                        state['text'] = text or ''
+                        state['offset'] = 0
+                        await load_page()
+
+                    async def set_sort(column):
+                        state['sort_by'] = column
+                        state['offset'] = 0
+                        await load_page()
+
+                    async def toggle_direction():
+                        state['descending'] = not state['descending']
+                        btn_dir.props(f"icon={'south' if state['descending'] else 'north'}")
+                        state['offset'] = 0
+                        await load_page()
+
+                    await load_page()
 
                 def reset_details_view():
                     tx_details_container.clear()
@@ -336,16 +692,144 @@ def dashboard():
                 chart_cat.on_point_click(lambda e: show_category_details(e.data["name"]))
 
     # --- STARTUP ---
-    
-    
-    # 2. Init Dropdowns
-    sel_year.options = engine.available_years
-    sel_year.value = engine.current_year
-    sel_month.options = engine.available_months
-    sel_month.value = engine.current_month
-    
-    # 3. Draw UI
-    refresh_ui()
+    async def startup():
+        # 1. Load Data (no-op if another page or the startup hook already did)
+        spinner.visible = True
+        await ensure_data_loaded()
+
+        # 2. Init Dropdowns
+        sel_year.options = dataset.snapshot.available_years
+        sel_year.update()
+        sel_month.options = dataset.snapshot.all_months
+        sel_month.update()
+
+        # 3. Draw UI
+        await refresh(sel_year.value, sel_month.value)
+
+    # The page is sent to the browser right away, data arrives as soon as it is ready
+    ui.timer(0, startup, once=True)
+    ui.timer(1.0, check_for_new_data)
+
+# --- 3. ADMIN PAGE ---
+@ui.page('/admin')
+def admin():
+    """Where the time goes: stage timings, counters, cache stats and the last ingestion/build runs."""
+    ui.add_head_html('<style>body { background-color: #0f172a; font-family: "Inter", sans-serif; color: #f1f5f9; }</style>')
+
+    def ms(value):
+        return f"{value:,.1f}"
+
+    def stage_rows(stages):
+        return [{"stage": name, "ms": ms(value)} for name, value in sorted(stages.items(), key=lambda kv: -kv[1])]
+
+    @ui.refreshable
+    def render():
+        snap = metrics.METRICS.snapshot()
+        card = 'w-full bg-slate-800 rounded-xl p-4 border border-slate-700'
+
+        # 1. Totals per stage, slowest first
+        with ui.card().classes(card):
+            ui.label('Stages').classes('text-lg font-bold text-white')
+            rows = [{
+                "stage": name,
+                "calls": stat["calls"],
+                "last": ms(stat["last_ms"]),
+                "avg": ms(stat["total_ms"] / stat["calls"]),
+                "max": ms(stat["max_ms"]),
+                "total": ms(stat["total_ms"]),
+            } for name, stat in sorted(snap["stages"].items(), key=lambda kv: -kv[1]["total_ms"])]
+            columns = [{"name": k, "label": k.title() + ("" if k in ("stage", "calls") else " (ms)"), "field": k, "align": "left"}
+                       for k in ("stage", "calls", "last", "avg", "max", "total")]
+            ui.table(columns=columns, rows=rows).props('dense flat dark').classes('w-full')
+
+        # 2. Counters and caches
+        with ui.card().classes(card):
+            ui.label('Counters').classes('text-lg font-bold text-white')
+            counters = dict(snap["counters"])
+            counters.update({f"query_cache_{k}": v for k, v in dataset.results.stats().items()})
+            counters["data_version"] = dataset.data_version
+            counters["master_rows"] = len(dataset.snapshot.master_df)
+            if counters.get("ui_refreshes"):
+                counters["ui_bytes_per_refresh"] = counters.get("ui_bytes_sent", 0) // counters["ui_refreshes"]
+            with ui.row().classes('gap-6 flex-wrap'):
+                for name, value in counters.items():
+                    with ui.column().classes('gap-0'):
+                        ui.label(name).classes('text-xs text-slate-400')
+                        ui.label(f"{value:,}" if isinstance(value, int) else str(value)).classes('font-mono text-slate-100')
+
+        # 3. Reconciliation: rows dropped after merging, and which bank bill was matched to which card month
+        with ui.card().classes(card):
+            ui.label('Reconciliation').classes('text-lg font-bold text-white')
+            excluded = dataset.snapshot.excluded
+            reasons = excluded["Reason"].value_counts() if not excluded.empty else {}
+            ui.label(', '.join(f"{count:,} {reason}" for reason, count in reasons.items()) or 'Nothing dropped') \
+                .classes('text-sm text-slate-400')
+            report = dataset.snapshot.report
+            reconciliation = report.reconciliation if report is not None else None
+            if reconciliation is not None and not (reconciliation.links.empty and reconciliation.unmatched.empty):
+                # Linked bills were dropped, unmatched ones are off by more than CARD_BILL_TOLERANCE and were kept
+                link_rows = [{
+                    "status": status,
+                    "date": str(row.Date)[:10],
+                    "desc": row.Desc,
+                    "card_month": f"{row.Card_Month_Num:02d}/{row.Card_Year}",
+                    "bill": f"{row.Bill:,.2f}",
+                    "card_total": f"{row.Card_Total:,.2f}",
+                    "difference": f"{row.Difference:,.2f}",
+                } for status, links in (("unmatched (kept)", reconciliation.unmatched), ("linked", reconciliation.links))
+                  for row in links.itertuples(index=False)]
+                link_columns = [{"name": k, "label": k.replace('_', ' ').title(), "field": k, "align": "left"}
+                                for k in ("status", "date", "desc", "card_month", "bill", "card_total", "difference")]
+                ui.table(columns=link_columns, rows=link_rows, pagination=10).props('dense flat dark').classes('w-full')
+
+        # 4. Last runs, newest first
+        with ui.card().classes(card):
+            ui.label('Last runs').classes('text-lg font-bold text-white')
+            for record in reversed(snap["runs"]):
+                started = time.strftime('%H:%M:%S', time.localtime(record.started))
+                peak = f" · peak {record.peak_bytes / 2**20:,.1f} MB" if record.peak_bytes else ""
+                with ui.expansion(f"{started} · {record.name} · {ms(record.wall_ms)} ms{peak}").classes('w-full text-slate-200'):
+                    stage_columns = [{"name": "stage", "label": "Stage", "field": "stage", "align": "left"},
+                                     {"name": "ms", "label": "ms", "field": "ms", "align": "right"}]
+                    ui.table(columns=stage_columns, rows=stage_rows(record.stages)).props('dense flat dark')
+
+                    if record.files:
+                        file_rows = [{
+                            "file": os.path.basename(f["path"]),
+                            "rows": f["rows"],
+                            "bytes": f["bytes"],
+                            "cached": "yes" if f["cached"] else "",
+                            "error": f["error"] or "",
+                        } for f in record.files]
+                        file_columns = [{"name": k, "label": k.title(), "field": k, "align": "left", "sortable": True}
+                                        for k in ("file", "rows", "bytes", "cached", "error")]
+                        ui.table(columns=file_columns, rows=file_rows, pagination=10).props('dense flat dark').classes('w-full')
+
+                    if record.profile:
+                        ui.code(record.profile, language='text').classes('w-full text-xs')
+
+    with ui.column().classes('w-full max-w-[1200px] mx-auto p-6 gap-4'):
+        with ui.row().classes('w-full items-center justify-between'):
+            ui.label('Metrics').classes('text-2xl font-bold text-white')
+            with ui.row().classes('gap-2'):
+                ui.button('Dashboard', icon='dashboard', on_click=lambda: ui.navigate.to('/')).props('flat color=grey-4')
+                ui.button('Refresh', icon='refresh', on_click=render.refresh).props('flat color=blue-5')
+        render()
+
+    ui.timer(5.0, render.refresh)
 
 # --- RUN ---
-ui.run(title="Finance Dashboard", dark=True, port=8085)
\ No newline at end of file
+# Nothing is built when this file is imported (tests, scripts). Spawned worker processes (run.cpu_bound,
+# the parallel loader) run it as __mp_main__ like the reload server does, but ui.run returns at once there
+# and the startup hook, which starts the watcher and loads the data, never fires.
+if __name__ in {"__main__", "__mp_main__"}:
+    dataset = FinanceDataset()
+    watcher = DataFolderWatcher(config.DATA_FOLDER, on_data_change)
+    # Computes the periods next to the one a page shows in the background, see prefetcher.py
+    prefetcher = Prefetcher(dataset)
+
+    # Start loading as soon as the server is up, so the first visitor waits less
+    app.on_startup(start_background_services)
+    app.on_shutdown(stop_background_services)
+
+    ui.run(title="Finance Dashboard", dark=True, port=8085)
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+This file is the address book of the sorting machine.
+The same merchant shows up under many spellings: "Dominos Pizza", "DOMINOS TLV 123", a Hebrew name
+with or without final letters or direction marks. Each description is canonicalized to one merchant
+name, interned to a merchant id, and classified once per merchant instead of once per row.
+
+Merchants that no rule keyword matches get a second chance: a trigram index over the keywords finds
+the closest one (e.g. "DOMINO PIZZA" -> DOMINOS), so near-misses stop falling into 'Other'.
+Only the rule book is indexed, so a merchant gets the same category in every file and worker process.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from category_classifier import DEFAULT_CATEGORY, MAX_MEMO_SIZE, CategoryClassifier, rules_key
+
+# Hebrew final letters and their regular forms (ך -> כ), so both spellings canonicalize the same
+_FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+# Niqqud/cantillation marks and bidi control characters
+_INVISIBLE = re.compile('[֑-ׇ‎‏‪-‮⁦-⁩]')
+# Quotes and apostrophes join their neighbours (DOMINO'S, בע"מ), other punctuation and digits split words
+_QUOTES = re.compile('["\'`׳״‘’“”]')
+_SEPARATORS = re.compile(r'[^\w&\s]|[\d_]')
+_SPACES = re.compile(r'\s+')
+
+
+class MerchantIndex:
+    def __init__(self, rules: Dict[str, List[str]], branch_words: List[str] = (),
+                 fuzzy_threshold: float = 0.7, fuzzy_min_length: int = 5):
+        self.rules_key = (rules_key(rules), tuple(branch_words), fuzzy_threshold, fuzzy_min_length)
+        self.fuzzy_threshold = fuzzy_threshold
+
+        # Longest first, so 'TEL AVIV' is stripped as a whole
+        branches = sorted({self._clean(w) for w in branch_words if self._clean(w)}, key=len, reverse=True)
+        self._branch_suffix = re.compile(r'(?:\s(?:' + '|'.join(map(re.escape, branches)) + r'))+$') if branches else None
+
+        # The keywords are canonicalized like the descriptions, so they are matched the same way
+        canonical_rules = {cat: [c for c in map(self.canonicalize, keywords) if c] for cat, keywords in rules.items()}
+        self.classifier = CategoryClassifier(canonical_rules)
+
+        # Trigram -> keywords containing it, for the fuzzy fallback. Ties go to the earlier category
+        self._keywords = []
+        self._postings = defaultdict(list)
+        for rank, (cat, keywords) in enumerate(canonical_rules.items()):
+            for keyword in keywords:
+                if len(keyword) < fuzzy_min_length:
+                    continue
+                grams = _trigrams(keyword)
+                for gram in grams:
+                    self._postings[gram].append(len(self._keywords))
+                self._keywords.append((rank, cat, len(grams)))
+
+        # Interned merchants: canonical name -> id, and the category of every id
+        self._ids: Dict[str, int] = {}
+        # Raw description -> id, so known spellings skip canonicalization
+        self._desc_ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.categories: List[str] = []
+        self.fuzzy_matches = 0
+
+    # --- CANONICAL NAMES ---
+
+    def canonicalize(self, desc) -> str:
+        """'Dominos Pizza TLV 123' -> 'DOMINOS PIZZA'"""
+        name = self._clean(desc)
+        if self._branch_suffix is not None:
+            name = self._branch_suffix.sub('', name)
+        return name
+
+    @staticmethod
+    def _clean(desc) -> str:
+        text = unicodedata.normalize('NFKC', str(desc)).upper()
+        text = _INVISIBLE.sub('', text).translate(_FINAL_LETTERS)
+        text = _SEPARATORS.sub(' ', _QUOTES.sub('', text))
+        return _SPACES.sub(' ', text).strip()
+
+    def merchant_id(self, desc) -> int:
+        """The interned id of a description's merchant. New merchants are classified on the way in."""
+        desc = str(desc)
+        merchant = self._desc_ids.get(desc)
+        if merchant is not None:
+            return merchant
+
+        name = self.canonicalize(desc)
+        merchant = self._ids.get(name)
+        if merchant is None:
+            merchant = self._ids[name] = len(self.names)
+            self.names.append(name)
+            self.categories.append(self._categorize(name))
+        self._desc_ids[desc] = merchant
+        return merchant
+
+    # --- CLASSIFICATION ---
+
+    def classify(self, desc) -> str:
+        self._limit_size()
+        return self.categories[self.merchant_id(desc)]
+
+    def classify_series(self, descs: pd.Series) -> pd.Series:
+        """Classifies a whole column. Each unique description is canonicalized once, each merchant classified once."""
+        self._limit_size()
+        codes, uniques = pd.factorize(descs)
+
+        # Missing values (code -1) land on the extra slot at the end, like str(nan) does in _get_category
+        merchants = [self.merchant_id(u) for u in uniques] + [self.merchant_id(np.nan)]
+        labels = np.array(self.categories, dtype=object)[merchants]
+
+        return pd.Series(labels[codes], index=descs.index)
+
+    def _limit_size(self):
+        # Like the classifier memo, the merchant table is simply dropped when it grows too big
+        if len(self._desc_ids) >= MAX_MEMO_SIZE:
+            self._desc_ids.clear()
+            self._ids.clear()
+            self.names.clear()
+            self.categories.clear()
+
+    def _categorize(self, name: str) -> str:
+        category = self.classifier.classify(name)
+        if category != DEFAULT_CATEGORY or self.fuzzy_threshold >= 1:
+            return category
+
+        fuzzy = self._closest_keyword(name)
+        if fuzzy is None:
+            return category
+        self.fuzzy_matches += 1
+        metrics.count("merchant_fuzzy_matches")
+        return fuzzy
+
+    def _closest_keyword(self, name: str):
+        """The category of the keyword with the largest share of its trigrams in name, if above the threshold."""
+        shared = defaultdict(int)
+        for gram in _trigrams(name):
+            for keyword in self._postings.get(gram, ()):
+                shared[keyword] += 1
+
+        best = None
+        for keyword, n in shared.items():
+            rank, category, total = self._keywords[keyword]
+            score = n / total
+            if score >= self.fuzzy_threshold and (best is None or (score, -rank) > best[:2]):
+                best = (score, -rank, category)
+        return None if best is None else best[2]
+
+
+def _trigrams(name: str) -> set:
+    """Letter trigrams of every word, padded with a space on both ends ('DOM', ' DO', 'OS ')."""
+    grams = set()
+    for word in name.split():
+        word = f" {word} "
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
@@ -0,0 +1,202 @@
+"""
+This file is the stopwatch. It records where the time goes in the loader and the engine.
+
+Code marks its hot paths with `with stage("parse"):`. Timings land in the innermost active
+collector (a run, or the parse of one file) and finally in the process-wide METRICS object,
+which keeps per-stage totals, counters and the history of the last runs for the admin page.
+
+A run (`with run("ingest") as record:`) also measures peak memory (tracemalloc) and can profile
+itself with cProfile or pyinstrument, see METRICS_TRACE_MEMORY and PROFILER in config.py.
+Runs can happen in a worker process, so the finished RunRecord travels back with its result
+and is added to METRICS by whoever receives it.
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import config
+
+# Lines of profiler output kept per run
+PROFILE_LINES = 40
+
+_local = threading.local()
+
+
+@dataclass
+class RunRecord:
+    """One measured run (an ingestion, an engine build): stages, counters, files and peak memory."""
+    name: str
+    started: float = field(default_factory=time.time)
+    wall_ms: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    files: List[dict] = field(default_factory=list)
+    peak_bytes: Optional[int] = None
+    profile: Optional[str] = None
+
+
+class Metrics:
+    """Process-wide totals per stage, counters, and the last runs."""
+    def __init__(self, history: int = 20):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.runs = deque(maxlen=history)
+
+    def add_timing(self, name: str, ms: float, calls: int = 1):
+        with self._lock:
+            stat = self.stages.setdefault(name, {"calls": 0, "total_ms": 0.0, "last_ms": 0.0, "max_ms": 0.0})
+            stat["calls"] += calls
+            stat["total_ms"] += ms
+            stat["last_ms"] = ms
+            stat["max_ms"] = max(stat["max_ms"], ms / calls)
+
+    def add_count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_run(self, record: Optional[RunRecord]):
+        """Keeps a finished run and folds its stages and counters into the totals."""
+        if record is None:
+            return
+        for name, ms in record.stages.items():
+            self.add_timing(name, ms)
+        for name, n in record.counters.items():
+            self.add_count(name, n)
+        with self._lock:
+            self.runs.append(record)
+
+    def snapshot(self) -> dict:
+        """A copy of everything, safe to render while other threads keep recording."""
+        with self._lock:
+            return {
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+                "runs": list(self.runs),
+            }
+
+
+METRICS = Metrics(config.METRICS_HISTORY)
+
+
+# --- RECORDING ---
+
+def record(name: str, ms: float):
+    """Adds a timing to the innermost active collector, or straight to METRICS if there is none."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        timings = stack[-1]
+        timings[name] = timings.get(name, 0.0) + ms
+    else:
+        METRICS.add_timing(name, ms)
+
+def count(name: str, n: int = 1):
+    """Bumps a counter of the innermost collector, else of the active run, or of METRICS if no run is active."""
+    counters = getattr(_local, "counters", None)
+    if counters:
+        counters[-1][name] = counters[-1].get(name, 0) + n
+        return
+
+    current = getattr(_local, "run", None)
+    if current is not None:
+        current.counters[name] = current.counters.get(name, 0) + n
+    else:
+        METRICS.add_count(name, n)
+
+@contextmanager
+def stage(name: str):
+    """Times the block as one stage (stages may nest, e.g. normalize includes classify)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+@contextmanager
+def collect():
+    """Collects the stage timings of the block into a dict instead of passing them on (the caller decides)."""
+    stack = _local.__dict__.setdefault("stack", [])
+    timings = {}
+    stack.append(timings)
+    try:
+        yield timings
+    finally:
+        stack.pop()
+
+@contextmanager
+def collect_counts():
+    """Like collect(), for counters: e.g. a worker process hands them back with its result instead."""
+    stack = _local.__dict__.setdefault("counters", [])
+    counters = {}
+    stack.append(counters)
+    try:
+        yield counters
+    finally:
+        stack.pop()
+
+@contextmanager
+def run(name: str):
+    """Measures a whole run. The yielded RunRecord is complete when the block exits."""
+    record_ = RunRecord(name)
+    previous_run = getattr(_local, "run", None)
+    _local.run = record_
+
+    trace = config.METRICS_TRACE_MEMORY and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    profiler = _start_profiler()
+
+    start = time.perf_counter()
+    try:
+        with collect() as timings:
+            yield record_
+    finally:
+        record_.wall_ms = (time.perf_counter() - start) * 1000
+        record_.stages = timings
+        record_.profile = _stop_profiler(profiler)
+        if trace:
+            record_.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        _local.run = previous_run
+
+
+# --- PROFILING ---
+
+def _start_profiler():
+    if config.PROFILER == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    if config.PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler  # optional dependency
+        except ImportError:
+            print("PROFILER = 'pyinstrument' but pyinstrument is not installed, profiling is off")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+
+    return None
+
+def _stop_profiler(profiler) -> Optional[str]:
+    if profiler is None:
+        return None
+
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        return out.getvalue()
+
+    profiler.stop()
+    return profiler.output_text()
@@ -0,0 +1,99 @@
+"""
+This file is the scout. While the user looks at a period, it computes the periods the year and month
+arrows lead to (KPIs, breakdowns, trends) on a small thread pool. The results land in the shared
+query cache, so the next arrow click is a cache hit instead of a recompute.
+
+The cache's memory budget (QUERY_CACHE_MAX_MB) bounds what prefetching can hold.
+Every session has a generation number. Scheduling new work or cancelling bumps it: queued jobs of an
+older generation are cancelled, and a job that already left the queue checks it before computing.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, List, Tuple
+
+import config
+import metrics
+from finance_engine import FinanceEngine
+
+# (year, month) as the dropdowns show it, e.g. ("2024", "March") or ("All Years", "All Months")
+Period = Tuple[str, str]
+
+
+class Prefetcher:
+    def __init__(self, dataset, workers: int = None):
+        self.dataset = dataset
+        self.workers = config.PREFETCH_WORKERS if workers is None else workers
+
+        # Created on first use, so importing the module starts no threads
+        self._pool = None
+
+        # Per session: the current generation and the jobs queued for it
+        self._generations: Dict[Hashable, int] = {}
+        self._futures: Dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, session: Hashable, periods: List[Period]):
+        """Replaces the session's pending prefetches with periods, computed in the given order."""
+        if not periods:
+            return
+
+        with self._lock:
+            generation = self._cancel(session)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+            is_current = lambda: self._generations.get(session) == generation
+            self._futures[session] = [self._pool.submit(self._compute, period, is_current) for period in periods]
+        metrics.count("prefetch_scheduled", len(periods))
+
+    def cancel(self, session: Hashable):
+        """Drops the session's pending prefetches, e.g. because the user jumped to another period."""
+        with self._lock:
+            self._cancel(session)
+
+    def forget(self, session: Hashable):
+        """Cancels and removes a session that went away."""
+        with self._lock:
+            self._cancel(session)
+            self._generations.pop(session, None)
+
+    def shutdown(self):
+        with self._lock:
+            for session in list(self._generations):
+                self._cancel(session)
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel(self, session) -> int:
+        """Starts a new generation for the session and cancels its queued jobs. Caller holds the lock."""
+        generation = self._generations.get(session, 0) + 1
+        self._generations[session] = generation
+        cancelled = sum(future.cancel() for future in self._futures.pop(session, []))
+        if cancelled:
+            metrics.count("prefetch_cancelled", cancelled)
+        return generation
+
+    def _compute(self, period: Period, is_current):
+        # A throwaway view: the results go into the dataset's shared cache, keyed like the session's own queries
+        try:
+            with metrics.stage("prefetch"):
+                data = FinanceEngine(self.dataset).get_dashboard_data(*period, is_current)
+        except Exception as e:
+            print(f"Prefetch of {period} failed: {e}")
+            return
+        metrics.count("prefetch_cancelled" if data is None else "prefetch_runs")
+
+
+def adjacent_periods(years: List[str], months: List[str], year: str, month: str) -> List[Period]:
+    """The periods one click of the year or month arrows away from (year, month). The arrows wrap around."""
+    periods = []
+    if year in years:
+        i = years.index(year)
+        periods += [(years[(i + 1) % len(years)], month), (years[(i - 1) % len(years)], month)]
+    if month in months:
+        i = months.index(month)
+        periods += [(year, months[(i + 1) % len(months)]), (year, months[(i - 1) % len(months)])]
+
+    # Short lists wrap onto the same neighbour, or onto the period itself
+    return [p for i, p in enumerate(periods) if p != (year, month) and p not in periods[:i]]
@@ -0,0 +1,197 @@
+"""
+This file is the auditor at the end of the assembly line. It runs once all files are merged:
+
+1. Overlapping exports (a period downloaded twice, a statement spanning two months) bring the same
+   transaction in twice. Rows are keyed by (Date, Amount, canonical merchant, Source_Type, account),
+   and a row is a duplicate when an earlier file already holds that key as many times.
+   The statements carry no account number, so the account comes from the file name (see account_of):
+   all files of one account must share its name word, e.g. 'maxit' or 'card2'.
+   Repeats inside a single file (two coffees on the same day) are real purchases and are kept.
+2. The bank statement pays the credit card with one monthly line ('כרטיסי אשראי'), while the card
+   file lists the same spending item by item. A bill line is linked to the card total of the month
+   it pays and dropped when the two agree within a tolerance, so the spending is counted once.
+   Months without a card file keep their bill, and so does a bill that does not match its card month
+   (a missing card file, another card): it is reported as unmatched instead.
+
+Both steps are hashes, sorts and sorted lookups over whole columns, no row-by-row loops.
+Dropped rows are handed back with a Reason, so they can be reported and restored when the files
+they were matched against change.
+"""
+
+import calendar
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+# File name parts that are dates, periods or copy markers, not the account
+_MONTH_WORDS = {m.lower() for m in list(calendar.month_name[1:]) + list(calendar.month_abbr[1:])}
+_PERIOD_WORD = re.compile(r'(q[1-4]|h[12]|ytd|\d+)')
+_COPY_MARKER = re.compile(r'\(\d+\)|\bcopy\b|עותק')
+_WORD_SPLIT = re.compile(r'[\s_\-.]+')
+
+# Bump this whenever reconcile() decides differently for the same rows and settings
+# (the transaction store and the warm snapshot hold its result)
+# 2: period words ('q1', 'h2', 'ytd') are not part of the account
+RECONCILE_VERSION = 2
+
+LINK_COLUMNS = ['Date', 'Desc', 'Bill', 'Card_Year', 'Card_Month_Num', 'Card_Total', 'Difference']
+
+
+@dataclass
+class Reconciliation:
+    """What reconcile() dropped and which bill lines it linked to which card months."""
+    duplicates: int = 0
+    card_bills: int = 0
+    # One row per linked bill: the bill, the card month it pays and that month's card total (in shekels)
+    links: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=LINK_COLUMNS))
+    # Bills whose card month is loaded but whose amount is off by more than the tolerance. They are kept
+    unmatched: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=LINK_COLUMNS))
+
+    def summary(self) -> str:
+        return (f"{self.duplicates} duplicate rows dropped, {self.card_bills} card bills linked to card files, "
+                f"{len(self.unmatched)} kept because they do not match their card month")
+
+
+def reconcile(df: pd.DataFrame, canonicalize: Callable[[str], str], bill_category: str,
+              bill_month_offset: int = 0, amount_scale: int = 1,
+              bill_tolerance: float = 1.0,
+              settled: Optional[np.ndarray] = None) -> Tuple[pd.DataFrame, pd.DataFrame, Reconciliation]:
+    """
+    Returns (kept rows, dropped rows with a 'Reason' column, Reconciliation).
+    df needs Source_File. File order (sorted paths) decides which copy of a duplicate is kept.
+    bill_tolerance: how far (in shekels) a bill may be from its card month's total and still be dropped.
+    settled: mask of rows already known not to be duplicates, whose copies are not in df (a partial
+    reconciliation, see data_loader.store_rows). They only take part in the card bill step.
+    """
+    if df.empty:
+        return df, df.assign(Reason=pd.Series(dtype=str)), Reconciliation()
+
+    if settled is None:
+        duplicate = _duplicate_mask(df, canonicalize)
+    else:
+        duplicate = np.zeros(len(df), dtype=bool)
+        open_rows = np.flatnonzero(~np.asarray(settled, dtype=bool))
+        if len(open_rows):
+            duplicate[open_rows] = _duplicate_mask(df.iloc[open_rows], canonicalize)
+    unique_df = df[~duplicate] if duplicate.any() else df
+
+    # Duplicated card rows would inflate the card totals, so bills are matched after deduplication
+    bill, links, unmatched = _card_bill_mask(unique_df, bill_category, bill_month_offset, amount_scale, bill_tolerance)
+    kept = unique_df[~bill] if bill.any() else unique_df
+
+    dropped = pd.concat([df[duplicate].assign(Reason='duplicate'), unique_df[bill].assign(Reason='card_bill')])
+    result = Reconciliation(int(duplicate.sum()), int(bill.sum()), links, unmatched)
+    return kept, dropped, result
+
+
+def _duplicate_mask(df: pd.DataFrame, canonicalize) -> np.ndarray:
+    # Canonical merchant per row, computed once per unique description
+    codes, uniques = pd.factorize(df['Desc'])
+    merchant_codes = pd.factorize(pd.Index([canonicalize(u) for u in uniques], dtype=object))[0]
+    merchant = np.where(codes >= 0, merchant_codes[codes] if len(merchant_codes) else 0, -1)
+
+    # Two cards can pay the same merchant the same amount on the same day, so the account is part of the key
+    file_codes, files = pd.factorize(df['Source_File'])
+    account = pd.factorize(pd.Index([account_of(f) for f in files], dtype=object))[0][file_codes]
+
+    keys = pd.DataFrame({
+        'Date': df['Date'].to_numpy(),
+        'Amount': df['Amount'].to_numpy(),
+        'Merchant': merchant,
+        'Source_Type': df['Source_Type'].astype(str).to_numpy(),
+        'Account': account,
+    })
+    key = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    file = pd.factorize(df['Source_File'], sort=True)[0]
+    duplicate = np.zeros(len(df), dtype=bool)
+
+    # Almost every key is unique, only rows whose key occurs more than once need a closer look
+    candidates = np.flatnonzero(pd.Series(key).duplicated(keep=False).to_numpy())
+    if not len(candidates):
+        return duplicate
+    key, file = key[candidates], file[candidates]
+
+    # Occurrence of the key inside its own file: the second identical coffee of the day is 1
+    occurrence = pd.Series(key).groupby([file, key], sort=False).cumcount().to_numpy()
+
+    # Sort by (key, occurrence, file). Equal neighbours come from different files, all but the first are copies
+    order = np.lexsort((file, occurrence, key))
+    sorted_key, sorted_occurrence = key[order], occurrence[order]
+    repeat = np.zeros(len(order), dtype=bool)
+    repeat[1:] = (sorted_key[1:] == sorted_key[:-1]) & (sorted_occurrence[1:] == sorted_occurrence[:-1])
+
+    duplicate[candidates[order]] = repeat
+    return duplicate
+
+
+def account_of(file_path) -> str:
+    """
+    The account a statement file belongs to: its name without dates, periods and copy markers.
+    '3_march_2024_maxit.csv', 'maxit_q1.csv', 'maxit_jan-mar_2024 (1).xlsx' -> 'maxit',
+    '1_january_2024_bank2.csv' -> 'bank2'. Any other word stays, so 'maxit_export.csv' is another account.
+    """
+    name = os.path.splitext(os.path.basename(str(file_path)).lower())[0]
+    name = _COPY_MARKER.sub(' ', name)
+    words = [w for w in _WORD_SPLIT.split(name) if w and not _PERIOD_WORD.fullmatch(w) and w not in _MONTH_WORDS]
+    return ' '.join(words)
+
+
+def card_bill_periods(df: pd.DataFrame, bill_category: str, month_offset: int) -> Tuple[Set[int], Set[int]]:
+    """
+    The card bill decisions the rows of df take part in, as (card months, bill months): the card months
+    their card rows add to or their bills pay, and the months of the bills that pay those card months.
+    Months are numbered like _periods.
+    """
+    period = _periods(df)
+    is_card = (df['Source_Type'].astype(str) == 'credit_card').to_numpy()
+    is_bill = ~is_card & (df['Category'].astype(str) == bill_category).to_numpy()
+    card = {int(p) for p in period[is_card]} | {int(p) + month_offset for p in period[is_bill]}
+    return card, {p - month_offset for p in card}
+
+
+def _card_bill_mask(df: pd.DataFrame, bill_category: str, month_offset: int, amount_scale: int, tolerance: float):
+    period = _periods(df)
+    amount = df['Amount'].to_numpy()
+    is_card = (df['Source_Type'].astype(str) == 'credit_card').to_numpy()
+    is_bill = ~is_card & (df['Category'].astype(str) == bill_category).to_numpy()
+
+    # Card total per statement month, sorted by month, then one sorted lookup per bill
+    card_totals = pd.Series(amount[is_card]).groupby(period[is_card]).sum()
+    card_periods = card_totals.index.to_numpy()
+    bill_rows = np.flatnonzero(is_bill)
+    paid_period = period[bill_rows] + month_offset
+    pos = np.minimum(np.searchsorted(card_periods, paid_period), max(len(card_periods) - 1, 0))
+    has_card = (card_periods[pos] == paid_period) if len(card_periods) else np.zeros(len(bill_rows), dtype=bool)
+
+    # Every bill with a card month, compared to that month's total
+    bills = df.iloc[bill_rows[has_card]]
+    bill_amount = -bills['Amount'].to_numpy() / amount_scale
+    card_total = -card_totals.to_numpy()[pos[has_card]] / amount_scale
+    difference = np.round(bill_amount - card_total, 2)
+    candidates = pd.DataFrame({
+        'Date': bills['Date'].to_numpy(),
+        'Desc': bills['Desc'].astype(str).to_numpy(),
+        'Bill': bill_amount,
+        'Card_Year': paid_period[has_card] // 12,
+        'Card_Month_Num': paid_period[has_card] % 12 + 1,
+        'Card_Total': card_total,
+        'Difference': difference,
+    }, columns=LINK_COLUMNS)
+
+    # Only a bill that pays what the card file itemizes is dropped. Any other bill is real spending we cannot see
+    linked = np.abs(difference) <= tolerance
+    mask = np.zeros(len(df), dtype=bool)
+    mask[bill_rows[has_card][linked]] = True
+    return mask, candidates[linked].reset_index(drop=True), candidates[~linked].reset_index(drop=True)
+
+
+def _periods(df: pd.DataFrame) -> np.ndarray:
+    """Statement month of every row as one number (year * 12 + month - 1)."""
+    # Year is text outside the compact schema, so only its few distinct values are converted
+    codes, years = pd.factorize(df['Year'])
+    year = pd.to_numeric(pd.Series(years)).to_numpy(dtype=np.int64)[codes]
+    return year * 12 + pd.to_numeric(df['Month_Num']).to_numpy(dtype=np.int64) - 1
@@ -0,0 +1,95 @@
+"""
+A small bounded LRU cache for query results.
+FinanceEngine keys it by (data version, filter state, method, args), so flipping back
+to a month that was already shown costs a dictionary lookup instead of a recompute.
+
+Besides the entry count the cache has a memory budget: every value's size is estimated
+when it is stored, and the least recently used entries go once the total is over max_bytes.
+Prefetched periods (see prefetcher.py) land here too, so they can never grow it without bound.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = 256, max_bytes: int = None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+
+        # Estimated size of every entry, and their total
+        self._sizes = {}
+        self.bytes = 0
+
+        # Shared by all sessions. The lock only guards the dictionary, values are computed outside it
+        self._lock = threading.Lock()
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, or calls compute() and remembers the result."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        value = compute()
+        size = estimate_size(value) if self.max_bytes is not None else 0
+
+        with self._lock:
+            if key in self._items:  # computed by another thread meanwhile
+                self.bytes -= self._sizes[key]
+            self._items[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+
+            # Evict the least recently used entries (never the one just stored)
+            while len(self._items) > 1 and (len(self._items) > self.maxsize
+                                            or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                old_key, _ = self._items.popitem(last=False)
+                self.bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0.0,
+        }
+
+
+def estimate_size(value) -> int:
+    """Approximate bytes held by a query result (nested dicts/lists of numbers and strings, frames, arrays)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
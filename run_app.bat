@@ -46,8 +46,8 @@ if exist "%REQUIREMENTS%" (
     call uv pip install -r %REQUIREMENTS%
 ) else (
     echo [WARNING] %REQUIREMENTS% not found! 
-    echo Installing default dependencies (nicegui, pandas, numpy, openpyxl)...
-    call uv pip install nicegui pandas numpy openpyxl
+    echo Installing default dependencies (nicegui, pandas, numpy, openpyxl, pyarrow)...
+    call uv pip install nicegui pandas numpy openpyxl pyarrow
 )
 echo [OK] Installation complete.
 
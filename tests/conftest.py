@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+
+@pytest.fixture
+def tmp_config(tmp_path, monkeypatch):
+    """Points every on-disk location of config.py into tmp_path, so tests never touch the real .cache."""
+    monkeypatch.setattr(config, "CACHE_FOLDER", str(tmp_path / "cache"))
+    monkeypatch.setattr(config, "STORE_PATH", str(tmp_path / "cache" / "transactions.sqlite"))
+    monkeypatch.setattr(config, "SNAPSHOT_FOLDER", str(tmp_path / "cache" / "snapshot"))
+    monkeypatch.setattr(config, "EXPORT_FOLDER", str(tmp_path / "export"))
+    monkeypatch.setattr(config, "WARM_START", False)
+    monkeypatch.setattr(config, "WATCH_DATA_FOLDER", False)
+    return tmp_path
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+import config
+import ingest_cache
+from ingest_cache import IngestCache
+
+
+@pytest.fixture
+def cached_file(tmp_path):
+    """A statement file with its frame stored in a fresh cache folder."""
+    statement = tmp_path / "1_january_2024.csv"
+    statement.write_text("Date,Desc,Amount\n01/01/2024,SHUFERSAL,-10\n", encoding="utf-8")
+    cache = IngestCache(str(tmp_path / "cache"))
+    cache.put(str(statement), pd.DataFrame({"Desc": ["SHUFERSAL"], "Amount": [-10.0]}))
+    cache.save()
+    return statement, str(tmp_path / "cache")
+
+
+def test_unchanged_file_is_served_from_cache(cached_file):
+    statement, folder = cached_file
+    frame = IngestCache(folder).get(str(statement))
+    assert frame is not None and frame["Desc"].tolist() == ["SHUFERSAL"]
+
+
+def test_changed_file_is_parsed_again(cached_file):
+    statement, folder = cached_file
+    statement.write_text("Date,Desc,Amount\n02/01/2024,RAMI LEVY,-20\n", encoding="utf-8")
+    assert IngestCache(folder).get(str(statement)) is None
+
+
+def test_rule_change_invalidates_cache(cached_file, monkeypatch):
+    statement, folder = cached_file
+    rules = dict(config.CATEGORY_RULES)
+    rules["Groceries"] = rules["Groceries"] + ["NEW MARKET"]
+    monkeypatch.setattr(config, "CATEGORY_RULES", rules)
+    assert IngestCache(folder).get(str(statement)) is None
+
+
+def test_rule_order_change_invalidates_cache(cached_file, monkeypatch):
+    # The first matching category wins, so reordering the rules can change categories
+    statement, folder = cached_file
+    monkeypatch.setattr(config, "CATEGORY_RULES", dict(reversed(list(config.CATEGORY_RULES.items()))))
+    assert IngestCache(folder).get(str(statement)) is None
+
+
+def test_merchant_settings_change_invalidates_cache(cached_file, monkeypatch):
+    statement, folder = cached_file
+    monkeypatch.setattr(config, "MERCHANT_FUZZY_THRESHOLD", 0.9)
+    assert IngestCache(folder).get(str(statement)) is None
+
+
+def test_cache_version_change_invalidates_cache(cached_file, monkeypatch):
+    statement, folder = cached_file
+    monkeypatch.setattr(ingest_cache, "CACHE_VERSION", ingest_cache.CACHE_VERSION + 1)
+    assert IngestCache(folder).get(str(statement)) is None
+
+
+def test_store_is_emptied_when_the_loader_output_changes(tmp_path, monkeypatch):
+    import transaction_store
+    from transaction_store import TransactionStore
+
+    path = str(tmp_path / "store.sqlite")
+    store = TransactionStore(path)
+    rows = pd.DataFrame({"Date": ["2024-01-01"], "Year": ["2024"], "Month": ["January"], "Month_Num": [1],
+                         "Desc": ["SHUFERSAL"], "Category": ["Groceries"], "Amount": [-10.0],
+                         "Source_Type": ["bank"], "Source_File": ["a.csv"]})
+    store.replace_files(rows, {"a.csv": (1, 1.0)})
+    store.close()
+
+    store = TransactionStore(path)
+    assert store.count() == 1
+    store.close()
+
+    monkeypatch.setattr(transaction_store, "CACHE_VERSION", ingest_cache.CACHE_VERSION + 1)
+    store = TransactionStore(path)
+    assert store.count() == 0 and store.file_stats() == {}
+    store.close()
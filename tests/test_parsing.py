@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import _load_file, _normalize_data, _read_excel_once, parse_amounts, parse_dates, stream_file
+
+
+def amounts(*values):
+    return parse_amounts(pd.Series(list(values), dtype=object)).tolist()
+
+
+def same(actual, expected):
+    return np.allclose(actual, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["1,234.56", "12.50", "3"], [1234.56, 12.5, 3.0]),
+    (["1,234", "1,000,000"], [1234.0, 1000000.0]),
+    (["₪ 1,200", "300 ש\"ח", "NIS 15.5"], [1200.0, 300.0, 15.5]),
+    (["(45.90)", "45.90-", "− 7", "-3"], [-45.9, -45.9, -7.0, -3.0]),
+    (["abc", None], [np.nan, np.nan]),
+])
+def test_dot_decimal_amounts(values, expected):
+    assert same(amounts(*values), expected)
+
+
+def test_decimal_comma_column():
+    # European exports: ',' is the decimal point and '.' groups thousands
+    assert same(amounts("1.234,56", "3,5", "12,50", "1.000", "7"), [1234.56, 3.5, 12.5, 1000.0, 7.0])
+    assert same(amounts("(1.234,56)", "-3,5"), [-1234.56, -3.5])
+
+
+def test_ambiguous_amount_is_not_misparsed():
+    # The column writes decimals with '.', so '3,5' cannot be read safely (it is not 35)
+    assert same(amounts("3,5", "2.5", "4.75"), [np.nan, 2.5, 4.75])
+
+
+def test_rows_with_unreadable_amounts_are_dropped_not_zeroed():
+    card = pd.DataFrame({"תאריך עסקה": ["01/03/2024"] * 5,
+                         "שם בית העסק": ["A", "B", "C", "D", "E"],
+                         "סכום חיוב": ["3,5", "2.50", "abc", "4.75", None]})
+    norm = _normalize_data(card, "credit_card")
+    assert norm["Desc"].tolist() == ["B", "D", "E"]
+    assert norm["Amount"].tolist() == [-2.5, -4.75, 0.0]  # an empty amount cell is still 0
+
+    # In a bank statement one side is empty on every row, only an unreadable side rejects the row
+    bank = pd.DataFrame({"תאריך": ["01/03/2024"] * 4,
+                         "פרטים": ["salary", "rent", "odd", "fee"],
+                         "זכות": ["1,000.00", "", "", None],
+                         "חובה": ["", "4,500.00", "3,5", "12.50"]})
+    norm = _normalize_data(bank, "bank")
+    assert norm["Desc"].tolist() == ["salary", "rent", "fee"]
+    assert norm["Amount"].tolist() == [1000.0, -4500.0, -12.5]
+
+
+def test_numeric_column_passes_through():
+    assert parse_amounts(pd.Series([1, -2, 3])).tolist() == [1.0, -2.0, 3.0]
+
+
+def test_dates_in_the_column_format():
+    dates = parse_dates(pd.Series(["15/03/2024", "01/02/2024", "31/12/2023"]))
+    assert dates.tolist() == [pd.Timestamp(2024, 3, 15), pd.Timestamp(2024, 2, 1), pd.Timestamp(2023, 12, 31)]
+
+
+def test_stray_dates_fall_back_to_day_first():
+    values = pd.Series(["15/03/2024", "16/03/2024", " 17/03/2024 ", "2024-03-18", "19.03.24", "garbage", None])
+    assert parse_dates(values).tolist() == [pd.Timestamp(2024, 3, d) for d in (15, 16, 17, 18, 19)] + [pd.NaT, pd.NaT]
+
+
+def test_explicit_date_format_and_real_dates():
+    assert parse_dates(pd.Series(["03/15/2024"]), "%m/%d/%Y").tolist() == [pd.Timestamp(2024, 3, 15)]
+    real = pd.Series(pd.to_datetime(["2024-03-15"]))
+    assert parse_dates(real) is real
+
+
+def test_excel_header_with_repeated_names(tmp_path):
+    # Bank exports put a title above the table and can repeat a column name (two "Amount" columns)
+    path = str(tmp_path / "statement.xlsx")
+    sheet = pd.DataFrame([["Account statement", None, None, None],
+                          ["Date", "Description", "Amount", "Amount"],
+                          ["15/03/2024", "SHUFERSAL", 10.5, 0],
+                          ["16/03/2024", "PAZ", 200, 0]])
+    sheet.to_excel(path, header=False, index=False)
+
+    df = _read_excel_once(path)
+    assert list(df.columns) == ["Date", "Description", "Amount", "Amount.1"]
+    assert df["Amount"].tolist() == [10.5, 200]
+
+
+def test_streamed_workbook_with_repeated_header_names(tmp_path):
+    # A card statement with the charged amount twice (the second one in another currency)
+    path = str(tmp_path / "3_march_2024_maxit.xlsx")
+    sheet = pd.DataFrame([["Card statement", None, None, None],
+                          ["תאריך עסקה", "שם בית העסק", "סכום חיוב", "סכום חיוב"],
+                          ["15/03/2024", "SHUFERSAL", 10.5, 3.0],
+                          ["16/03/2024", "PAZ", 200, 55.0],
+                          ["17/03/2024", "AROMA", 18, 5.0]])
+    sheet.to_excel(path, header=False, index=False)
+
+    streamed = pd.concat(list(stream_file(path, chunk_rows=2)), ignore_index=True)
+    assert streamed["Amount"].tolist() == [-10.5, -200.0, -18.0]
+    pd.testing.assert_frame_equal(streamed, _load_file(path).reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_counters_reach_the_run_from_worker_processes(tmp_config, monkeypatch, workers):
+    import config
+    import data_loader
+
+    monkeypatch.setattr(config, "PARALLEL_MIN_FILES", 1)
+    paths = []
+    for month in ("january", "february"):
+        path = tmp_config / f"1_{month}_2024_maxit.csv"
+        pd.DataFrame({"תאריך עסקה": ["01/01/2024", "02/01/2024", "03/01/2024"],
+                      "שם בית העסק": ["A", "B", "C"],
+                      "סכום חיוב": ["2.50", "3,5", "4.75"]}).to_csv(path, index=False)
+        paths.append(str(path))
+
+    report = data_loader._ingest(paths, False, workers)
+    assert report.workers == workers
+    assert len(report.master_df) == 4
+    assert report.run.counters["amounts_ambiguous"] == 2
+    assert report.run.counters["amounts_rejected"] == 2
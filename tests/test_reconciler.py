@@ -0,0 +1,219 @@
+import os
+
+import pandas as pd
+import pytest
+
+import config
+import data_loader
+from reconciler import account_of, reconcile
+
+BILL = "Credit Cards"
+
+
+def rows(*records):
+    """records: (date, desc, amount, source_type, source_file[, category])"""
+    df = pd.DataFrame([r if len(r) == 6 else (*r, "Other") for r in records],
+                      columns=["Date", "Desc", "Amount", "Source_Type", "Source_File", "Category"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Year"] = df["Date"].dt.year.astype(str)
+    df["Month_Num"] = df["Date"].dt.month
+    return df
+
+
+def run(df, **kwargs):
+    return reconcile(df, lambda desc: str(desc).upper(), BILL, **kwargs)
+
+
+def test_overlapping_exports_are_deduplicated():
+    df = rows(("2024-03-05", "Shufersal", -120.0, "credit_card", "/d/3_march_2024_maxit.csv"),
+              ("2024-03-06", "Paz", -200.0, "credit_card", "/d/3_march_2024_maxit.csv"),
+              # The same March rows again, in an export that spans two months
+              ("2024-03-05", "SHUFERSAL", -120.0, "credit_card", "/d/maxit_mar-apr_2024.csv"),
+              ("2024-03-06", "Paz", -200.0, "credit_card", "/d/maxit_mar-apr_2024.csv"),
+              ("2024-04-01", "Paz", -200.0, "credit_card", "/d/maxit_mar-apr_2024.csv"))
+    kept, dropped, result = run(df)
+
+    assert result.duplicates == 2
+    assert (dropped["Reason"] == "duplicate").all()
+    # File order decides: the copies in the later file go
+    assert set(dropped["Source_File"]) == {"/d/maxit_mar-apr_2024.csv"}
+    assert len(kept) == 3
+
+
+def test_repeats_inside_a_file_and_across_accounts_are_kept():
+    df = rows(("2024-03-05", "Aroma", -18.0, "credit_card", "/d/3_march_2024_maxit.csv"),
+              ("2024-03-05", "Aroma", -18.0, "credit_card", "/d/3_march_2024_maxit.csv"),
+              ("2024-03-05", "Aroma", -18.0, "credit_card", "/d/3_march_2024_card2.csv"))
+    kept, dropped, result = run(df)
+    assert result.duplicates == 0 and len(kept) == 3 and dropped.empty
+
+
+def test_second_copy_of_a_repeat_is_dropped_once():
+    # Two real coffees in the first export, the second export holds them again plus nothing new
+    coffee = ("2024-03-05", "Aroma", -18.0, "credit_card")
+    df = rows((*coffee, "/d/3_march_2024_maxit.csv"), (*coffee, "/d/3_march_2024_maxit.csv"),
+              (*coffee, "/d/3_march_2024_maxit (1).csv"), (*coffee, "/d/3_march_2024_maxit (1).csv"))
+    kept, _, result = run(df)
+    assert result.duplicates == 2 and len(kept) == 2
+
+
+def card_month(bill_amount, bill_month="2024-03-02", card_amounts=(-1000.0, -500.5)):
+    card = [(f"2024-03-{10 + i}", f"Shop {i}", a, "credit_card", "/d/3_march_2024_maxit.csv")
+            for i, a in enumerate(card_amounts)]
+    bill = (bill_month, "כרטיסי אשראי", bill_amount, "bank", "/d/3_march_2024.csv", BILL)
+    salary = ("2024-03-10", "משכורת", 18000.0, "bank", "/d/3_march_2024.csv", "Income")
+    return rows(*card, bill, salary)
+
+
+def test_matching_card_bill_is_dropped_and_linked():
+    kept, dropped, result = run(card_month(-1500.5))
+    assert result.card_bills == 1 and list(dropped["Reason"]) == ["card_bill"]
+    assert BILL not in set(kept["Category"])
+    link = result.links.iloc[0]
+    assert (link["Card_Year"], link["Card_Month_Num"]) == (2024, 3)
+    assert link["Bill"] == 1500.5 and link["Card_Total"] == 1500.5 and link["Difference"] == 0
+    assert result.unmatched.empty
+
+
+def test_card_bill_within_tolerance_is_dropped():
+    _, _, result = run(card_month(-1501.0), bill_tolerance=1.0)
+    assert result.card_bills == 1 and result.links.iloc[0]["Difference"] == 0.5
+
+
+def test_card_bill_that_does_not_match_is_kept_and_reported():
+    kept, dropped, result = run(card_month(-4200.0), bill_tolerance=1.0)
+    assert result.card_bills == 0 and dropped.empty
+    assert BILL in set(kept["Category"])
+    assert len(result.unmatched) == 1 and result.unmatched.iloc[0]["Difference"] == 2699.5
+    assert result.links.empty
+    assert "1 kept" in result.summary()
+
+
+def test_card_bill_without_a_card_month_is_kept_silently():
+    kept, _, result = run(card_month(-1500.5, bill_month="2024-04-02"))
+    assert result.card_bills == 0 and BILL in set(kept["Category"])
+    assert result.links.empty and result.unmatched.empty
+
+
+def test_card_bill_month_offset_and_compact_amounts():
+    # The April bill pays March; compact frames hold amounts in agorot
+    df = card_month(-1500.5, bill_month="2024-04-02")
+    df["Amount"] = (df["Amount"] * 100).round().astype("int64")
+    _, _, result = run(df, bill_month_offset=-1, amount_scale=100)
+    assert result.card_bills == 1 and result.links.iloc[0]["Bill"] == pytest.approx(1500.5)
+
+
+@pytest.mark.parametrize("path, account", [
+    ("/d/2024/3_march_2024_maxit.csv", "maxit"),
+    ("/d/maxit_jan-mar_2024 (1).xlsx", "maxit"),
+    ("/d/1_january_2024_bank2.csv", "bank2"),
+    ("/d/1_january_2024_bank2 copy.csv", "bank2"),
+    ("/d/maxit_q1.csv", "maxit"),
+    ("/d/maxit_2024_h2_ytd.xlsx", "maxit"),
+    ("/d/maxit_export.csv", "maxit export"),
+])
+def test_account_of(path, account):
+    assert account_of(path) == account
+
+
+def test_renamed_export_of_the_same_account_is_deduplicated():
+    # A quarterly export saved under another name still belongs to 'maxit'
+    df = rows(("2024-03-05", "Shufersal", -120.0, "credit_card", "/d/2024/3_march_2024_maxit.csv"),
+              ("2024-02-11", "Paz", -200.0, "credit_card", "/d/maxit_q1.csv"),
+              ("2024-03-05", "Shufersal", -120.0, "credit_card", "/d/maxit_q1.csv"))
+    kept, dropped, result = run(df)
+    assert result.duplicates == 1 and len(kept) == 2
+    assert dropped.iloc[0]["Source_File"] == "/d/maxit_q1.csv"
+
+
+def test_files_named_after_another_account_are_not_deduplicated():
+    # Without the account's name word the file counts as another account (see account_of)
+    df = rows(("2024-03-05", "Shufersal", -120.0, "credit_card", "/d/2024/3_march_2024_maxit.csv"),
+              ("2024-03-05", "Shufersal", -120.0, "credit_card", "/d/max_card_march.csv"))
+    _, _, result = run(df)
+    assert result.duplicates == 0
+
+
+# --- SQLite store: reconciled on every sync ---
+
+@pytest.fixture
+def statements(tmp_config, monkeypatch):
+    import shutil
+    from tests.test_exporter import DEMO_FOLDER
+
+    folder = tmp_config / "data"
+    shutil.copytree(DEMO_FOLDER, folder)
+    monkeypatch.setattr(config, "USE_INGEST_CACHE", False)
+    monkeypatch.setattr(config, "DATA_FOLDER", str(folder))
+    return folder
+
+
+def store_state(store_path):
+    from transaction_store import TransactionStore
+    store = TransactionStore(store_path)
+    try:
+        return store.count(), store.excluded_rows()["Reason"].value_counts().to_dict(), store.kpis("All Years", "All Months")
+    finally:
+        store.close()
+
+
+def test_store_sync_is_reconciled_like_a_folder_load(statements):
+    data_loader.sync_store(str(statements), config.STORE_PATH)
+    report = data_loader.ingest_folder(str(statements))
+
+    count, reasons, _ = store_state(config.STORE_PATH)
+    assert count == len(report.master_df)
+    assert reasons == report.excluded["Reason"].value_counts().to_dict()
+
+
+def test_store_hot_reload_reconciles_against_stored_rows(statements):
+    import shutil
+    data_loader.sync_store(str(statements), config.STORE_PATH)
+    before = store_state(config.STORE_PATH)
+
+    # A second download of the March card statement: its rows are all duplicates
+    original = statements / "2024" / "3_march_2024_maxit.csv"
+    copy = shutil.copy(original, statements / "2024" / "3_march_2024_maxit (1).csv")
+    report = data_loader.sync_store_files([copy], store_path=config.STORE_PATH)
+    rows = len(pd.read_csv(original))
+    assert report.reconciliation.duplicates == rows
+    count, reasons, kpis = store_state(config.STORE_PATH)
+    assert count == before[0] and reasons.get("duplicate", 0) == rows and kpis == before[2]
+
+    # Removing the original brings the copy's rows back
+    os.remove(original)
+    data_loader.sync_store_files([], [str(original)], store_path=config.STORE_PATH)
+    count, reasons, kpis = store_state(config.STORE_PATH)
+    assert count == before[0] and "duplicate" not in reasons and kpis == pytest.approx(before[2])
+
+
+def test_store_sync_of_a_card_month_matches_a_folder_load(statements, tmp_path, monkeypatch):
+    import shutil
+    from transaction_store import TransactionStore
+
+    # Every bill links to the card month before it, so the arriving card file takes a bill out
+    monkeypatch.setattr(config, "CARD_BILL_MONTH_OFFSET", -1)
+    monkeypatch.setattr(config, "CARD_BILL_TOLERANCE", 1e9)
+
+    # The store holds everything but the March card file, then the file arrives with a second download of May
+    card_file = statements / "2024" / "3_march_2024_maxit.csv"
+    shutil.move(card_file, tmp_path / card_file.name)
+    data_loader.sync_store(str(statements), config.STORE_PATH)
+    shutil.move(tmp_path / card_file.name, card_file)
+    shutil.copy(statements / "2024" / "5_may_2024.csv", statements / "2024" / "5_may_2024 (1).csv")
+
+    # Only the rows the new files can affect are read back from the store
+    read = []
+    for name in ("rows_on", "card_bill_rows"):
+        method = getattr(TransactionStore, name)
+        monkeypatch.setattr(TransactionStore, name,
+                            lambda self, *args, _method=method: read.append(_method(self, *args)) or read[-1])
+    data_loader.sync_store(str(statements), config.STORE_PATH)
+    count, reasons, kpis = store_state(config.STORE_PATH)
+    assert 0 < sum(map(len, read)) < count / 2
+
+    report = data_loader.ingest_folder(str(statements))
+    assert count == len(report.master_df) and reasons["card_bill"] > 0
+    assert reasons == report.excluded["Reason"].value_counts().to_dict()
+    assert kpis == pytest.approx((report.master_df["Amount"].clip(lower=0).sum(),
+                                  report.master_df["Amount"].clip(upper=0).sum()))
@@ -0,0 +1,68 @@
+import asyncio
+import gc
+import os
+import shutil
+
+import pytest
+from nicegui import run, ui
+from nicegui.testing import User
+
+import config
+import metrics
+from finance_engine import FinanceDataset
+
+pytestmark = pytest.mark.nicegui_main_file("tests/ui_main.py")
+
+
+def select_with(user: User, option: str) -> ui.select:
+    return next(s for s in user.find(ui.select).elements if option in s.options)
+
+
+def loaded_dataset() -> FinanceDataset:
+    """The dataset main.py loaded for this test (the ones of earlier tests may still be in memory)."""
+    return next(o for o in gc.get_objects() if isinstance(o, FinanceDataset) and o.data_version
+                and str(o.snapshot.master_df["Source_File"].iloc[0]).startswith(config.DATA_FOLDER))
+
+
+async def open_dashboard(user: User):
+    await user.open("/")
+    for _ in range(50):  # the data is loaded in the background
+        await asyncio.sleep(0.1)
+        if len(select_with(user, "All Years").options) > 1:
+            break
+    await user.should_see("Total Income")
+
+
+async def test_month_dropdown_is_filled_on_startup(user: User):
+    await open_dashboard(user)
+    months = select_with(user, "All Months").options
+    assert months[0] == "All Months"
+    assert "March" in months and "December" not in months  # December is held back by ui_main.py
+    assert len(months) == 12
+
+
+async def test_month_dropdown_follows_hot_reload(user: User):
+    await open_dashboard(user)
+    held_back = config.DATA_FOLDER + "_held_back"
+    added = []
+    for name in os.listdir(held_back):
+        added.append(shutil.copy(os.path.join(held_back, name), config.DATA_FOLDER))
+
+    await run.io_bound(loaded_dataset().reload_files, added)
+    await asyncio.sleep(1.5)  # the page polls for new data every second
+
+    assert "December" in select_with(user, "All Months").options
+
+
+async def test_chart_traffic_is_metered(user: User):
+    before = metrics.METRICS.counters.get("ui_bytes_sent", 0)
+    await open_dashboard(user)
+    await asyncio.sleep(0.5)  # the first draw follows the data
+    sent = metrics.METRICS.counters.get("ui_bytes_sent", 0) - before
+    assert sent > 1000  # the first draw sends whole charts
+
+    # Flipping the month only sends the chart deltas
+    before = metrics.METRICS.counters.get("ui_bytes_sent", 0)
+    select_with(user, "All Months").set_value("March")
+    await asyncio.sleep(0.5)
+    assert 0 < metrics.METRICS.counters.get("ui_bytes_sent", 0) - before < sent
@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pytest
+
+import config
+import warm_start
+from finance_engine import FinanceDataset
+from tests.test_exporter import DEMO_FOLDER
+
+
+@pytest.fixture
+def statements(tmp_config, monkeypatch):
+    """A data folder with the 2024 statements only, the 2025 ones are copied in by the tests."""
+    folder = tmp_config / "data"
+    shutil.copytree(os.path.join(DEMO_FOLDER, "2024"), folder / "2024")
+    monkeypatch.setattr(config, "USE_INGEST_CACHE", False)
+    monkeypatch.setattr(config, "DATA_FOLDER", str(folder))
+    return folder
+
+
+def add_2025(folder):
+    return [shutil.copy(os.path.join(DEMO_FOLDER, "2025", name), folder / name)
+            for name in sorted(os.listdir(os.path.join(DEMO_FOLDER, "2025")))]
+
+
+def cold_rows():
+    dataset = FinanceDataset()
+    dataset.load()
+    return len(dataset.snapshot.master_df)
+
+
+def test_files_added_after_the_load_are_ingested_on_restore(statements):
+    dataset = FinanceDataset()
+    dataset.load()
+    loaded = len(dataset.snapshot.master_df)
+
+    # New statements arrive while the dashboard runs (no watcher), then it shuts down
+    add_2025(statements)
+    dataset.save_snapshot()
+
+    restored = FinanceDataset()
+    assert restored.restore_snapshot()
+    assert len(restored.snapshot.master_df) == cold_rows() > loaded
+    assert "2025" in restored.snapshot.available_years
+
+
+def test_hot_reloaded_files_are_recorded_as_read(statements):
+    dataset = FinanceDataset()
+    dataset.load()
+    dataset.reload_files(add_2025(statements))
+    dataset.save_snapshot()
+
+    warm = warm_start.load(config.SNAPSHOT_FOLDER, config.DATA_FOLDER, [str(p) for p in statements.rglob("*.csv")])
+    assert warm.changed_files == [] and warm.removed_files == []
+    assert len(warm.master_df) == cold_rows()
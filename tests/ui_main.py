@@ -0,0 +1,31 @@
+"""
+Runs main.py against a copy of the demo data, with every on-disk location in a temporary folder.
+The December statements are held back in DATA_FOLDER + "_held_back", for hot reload tests.
+"""
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+tmp = tempfile.mkdtemp(prefix="finance_ui_")
+config.DATA_FOLDER = os.path.join(tmp, "data")
+shutil.copytree(os.path.join(ROOT, "demo_data"), config.DATA_FOLDER)
+os.makedirs(config.DATA_FOLDER + "_held_back")
+for year in os.listdir(config.DATA_FOLDER):
+    for name in os.listdir(os.path.join(config.DATA_FOLDER, year)):
+        if "december" in name:
+            shutil.move(os.path.join(config.DATA_FOLDER, year, name), config.DATA_FOLDER + "_held_back")
+config.CACHE_FOLDER = os.path.join(tmp, "cache")
+config.STORE_PATH = os.path.join(tmp, "cache", "transactions.sqlite")
+config.SNAPSHOT_FOLDER = os.path.join(tmp, "cache", "snapshot")
+config.EXPORT_FOLDER = os.path.join(tmp, "export")
+config.WARM_START = False
+config.WATCH_DATA_FOLDER = False
+
+runpy.run_path(os.path.join(ROOT, "main.py"), run_name="__main__")
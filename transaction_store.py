@@ -0,0 +1,324 @@
+"""
+This file is the archive room. An optional on-disk home for the master data,
+for when years of statements across many accounts should not be re-read into memory on every start.
+
+The normalized rows live in a local SQLite file (no server, works fully offline).
+Every dashboard number is answered by an indexed SQL query instead of a scan of an in-memory frame,
+so startup is near-instant and memory does not grow with the history.
+
+Rows the reconciliation dropped (duplicates, linked card bills) are kept in a side table, so a later
+sync can bring them back when the files they were matched against change.
+
+It answers the same questions as AggregateCube (kpis, category_totals, monthly_trend),
+so FinanceEngine can read from either one.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from aggregate_cube import CUBE_COLUMNS
+from ingest_cache import CACHE_VERSION, reconcile_fingerprint, rules_fingerprint
+
+# Bump this when the table layout changes, the store is then rebuilt from the statement files
+SCHEMA_VERSION = 2
+
+# Columns stored per transaction. Date is kept as ISO text (YYYY-MM-DD), so it sorts as text
+STORE_COLUMNS = ['Date', 'Year', 'Month', 'Month_Num', 'Desc', 'Category', 'Amount', 'Source_Type', 'Source_File']
+
+# Sort keys of the drill-down grid (UI name -> column)
+SORT_COLUMNS = {"Date": "Date", "Description": "Desc", "Amount": "Amount"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    Date TEXT NOT NULL,
+    Year TEXT NOT NULL,
+    Month TEXT NOT NULL,
+    Month_Num INTEGER NOT NULL,
+    Desc TEXT,
+    Category TEXT NOT NULL,
+    Amount REAL NOT NULL,
+    Source_Type TEXT,
+    Source_File TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_period ON transactions (Year, Month_Num, Category, Date);
+CREATE INDEX IF NOT EXISTS ix_month ON transactions (Month, Category);
+CREATE INDEX IF NOT EXISTS ix_source ON transactions (Source_File);
+
+-- Rows dropped by the reconciliation, with the reason (see reconciler.py)
+CREATE TABLE IF NOT EXISTS excluded (
+    Date TEXT NOT NULL,
+    Year TEXT NOT NULL,
+    Month TEXT NOT NULL,
+    Month_Num INTEGER NOT NULL,
+    Desc TEXT,
+    Category TEXT NOT NULL,
+    Amount REAL NOT NULL,
+    Source_Type TEXT,
+    Source_File TEXT,
+    Reason TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_excluded_source ON excluded (Source_File);
+
+-- One row per ingested statement file, to tell which files changed since the last sync
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class TransactionStore:
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        # The UI queries from worker threads. One connection, used by one thread at a time
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            # WAL lets the dashboard keep reading while a sync process writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self._check_meta()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- WRITING ---
+
+    def file_stats(self) -> Dict[str, Tuple[int, float]]:
+        """(size, mtime) of every file the store holds rows of."""
+        rows = self._query("SELECT path, size, mtime FROM files")
+        return {path: (size, mtime) for path, size, mtime in rows}
+
+    def replace_files(self, df: pd.DataFrame, file_stats: Dict[str, Tuple[int, float]], drop_files=()):
+        """
+        In one transaction: deletes the rows of drop_files, inserts df and records file_stats.
+        A crash in the middle leaves the store as it was before.
+        """
+        rows = _store_rows(df, STORE_COLUMNS)
+        counts = rows['Source_File'].value_counts()
+
+        with self._lock, self._conn:
+            drop = [(p,) for p in drop_files]
+            self._conn.executemany("DELETE FROM transactions WHERE Source_File = ?", drop)
+            self._conn.executemany("DELETE FROM excluded WHERE Source_File = ?", drop)
+            self._conn.executemany("DELETE FROM files WHERE path = ?", drop)
+            self._insert("transactions", rows)
+            self._record_files(file_stats, counts)
+
+    def patch(self, kept: pd.DataFrame, excluded: pd.DataFrame, removed: Dict[str, List[int]],
+              file_stats: Dict[str, Tuple[int, float]], drop_files=()):
+        """
+        In one transaction: deletes the rows of drop_files and the rows listed in removed ({table: rowids}),
+        inserts kept and excluded (with a Reason column) and records file_stats.
+        Used by a partial reconciliation, which rewrites only the rows that change sides.
+        """
+        kept = _store_rows(kept, STORE_COLUMNS)
+        excluded = _store_rows(excluded, STORE_COLUMNS + ["Reason"])
+        counts = kept['Source_File'].value_counts().add(excluded['Source_File'].value_counts(), fill_value=0)
+
+        with self._lock, self._conn:
+            drop = [(p,) for p in drop_files]
+            self._conn.executemany("DELETE FROM transactions WHERE Source_File = ?", drop)
+            self._conn.executemany("DELETE FROM excluded WHERE Source_File = ?", drop)
+            self._conn.executemany("DELETE FROM files WHERE path = ?", drop)
+            for table, rowids in removed.items():
+                self._conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(int(r),) for r in rowids])
+            self._insert("transactions", kept)
+            self._insert("excluded", excluded)
+            self._record_files(file_stats, counts)
+
+    def excluded_rows(self) -> pd.DataFrame:
+        """The rows the reconciliation dropped, with their Reason."""
+        rows = self._query(f"SELECT {', '.join(STORE_COLUMNS)}, Reason FROM excluded ORDER BY rowid")
+        return _typed(pd.DataFrame(rows, columns=STORE_COLUMNS + ["Reason"]))
+
+    # --- PARTIAL RECONCILIATION (see data_loader.store_rows) ---
+    # These read rows of both tables, with the table and rowid they came from (_Table, _Rowid) and the Reason
+    # of excluded ones, so only the rows whose side changes have to be written back
+
+    def source_files(self) -> List[str]:
+        """Every file that has stored or excluded rows."""
+        rows = self._query("SELECT Source_File FROM transactions UNION SELECT Source_File FROM excluded")
+        return [f for (f,) in rows if f is not None]
+
+    def rows_on(self, files, dates=None) -> pd.DataFrame:
+        """The stored and excluded rows of files, only those on dates (datetimes) when given."""
+        condition = "Source_File IN (SELECT value FROM json_each(?))"
+        params = [json.dumps(list(files))]
+        if dates is not None:
+            condition += " AND Date IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps([pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates]))
+        return self._scope(condition, params)
+
+    def card_bill_rows(self, card_periods, bill_periods, bill_category: str) -> pd.DataFrame:
+        """
+        The rows card bill matching needs for some card months: their card rows and the bills of bill_periods
+        (months numbered year * 12 + month - 1). Duplicates take no part in it and are left out.
+        """
+        period = "CAST(Year AS INTEGER) * 12 + Month_Num - 1 IN (SELECT value FROM json_each(?))"
+        condition = (f"(Source_Type = 'credit_card' AND {period}) OR "
+                     f"(Source_Type IS NOT 'credit_card' AND Category = ? AND {period})")
+        params = [json.dumps(sorted(card_periods)), bill_category, json.dumps(sorted(bill_periods))]
+        return self._scope(condition, params, skip_reason="duplicate")
+
+    # --- QUERIES (same answers as AggregateCube) ---
+
+    def count(self, year="All Years", month="All Months") -> int:
+        where, params = _period_filter(year, month)
+        return self._query(f"SELECT COUNT(*) FROM transactions {where}", params)[0][0]
+
+    def years(self) -> List[str]:
+        return [y for (y,) in self._query("SELECT DISTINCT Year FROM transactions ORDER BY Year DESC")]
+
+    def months(self) -> List[str]:
+        return [m for (m,) in self._query("SELECT DISTINCT Month FROM transactions ORDER BY Month")]
+
+    def kpis(self, year, month):
+        """Total income (positive) and total expense (negative) of a selection."""
+        where, params = _period_filter(year, month)
+        income, expense = self._query(
+            f"SELECT TOTAL(CASE WHEN Amount > 0 THEN Amount END), TOTAL(CASE WHEN Amount < 0 THEN Amount END) "
+            f"FROM transactions {where}", params)[0]
+        return income, expense
+
+    def category_totals(self, year, month, sign) -> pd.Series:
+        """Absolute amount per category for one sign (+1 income, -1 expense), largest first."""
+        where, params = _period_filter(year, month, "Amount > 0" if sign > 0 else "Amount < 0")
+        rows = self._query(
+            f"SELECT Category, ABS(SUM(Amount)) AS Total FROM transactions {where} "
+            f"GROUP BY Category ORDER BY Total DESC, Category", params)
+        return pd.Series({cat: total for cat, total in rows}, dtype=float)
+
+    def monthly_trend(self, year) -> pd.DataFrame:
+        """Income and (positive) expense per month, oldest first."""
+        where, params = _period_filter(year)
+        rows = self._query(
+            f"SELECT Year, Month_Num, Month, TOTAL(CASE WHEN Amount > 0 THEN Amount END), "
+            f"-TOTAL(CASE WHEN Amount < 0 THEN Amount END) FROM transactions {where} "
+            f"GROUP BY Year, Month_Num, Month ORDER BY Year, Month_Num", params)
+        return pd.DataFrame(rows, columns=['Year', 'Month_Num', 'Month', 'Income', 'Expense'])
+
+    def cube_cells(self) -> pd.DataFrame:
+        """Sum and count per Year x Month x Category x sign, the same cells as an AggregateCube."""
+        rows = self._query(
+            "SELECT Year, Month_Num, Month, Category, CASE WHEN Amount > 0 THEN 1 WHEN Amount < 0 THEN -1 ELSE 0 END AS Sign, "
+            "TOTAL(Amount), COUNT(*) FROM transactions GROUP BY Year, Month_Num, Month, Category, Sign")
+        return pd.DataFrame(rows, columns=CUBE_COLUMNS)
+
+    def transactions_page(self, year, month, category, offset=0, limit=50, sort_by="Date",
+                          descending=True, text_filter="") -> Tuple[pd.DataFrame, int]:
+        """
+        One page of a category's transactions, plus the total match count.
+        Same order as the in-memory engine: newest first, same-day rows in load order.
+        """
+        conditions = ["Category = ?"]
+        params = [category]
+        if text_filter:
+            conditions.append("instr(lower(Desc), lower(?)) > 0")
+            params.append(text_filter)
+        where, params = _period_filter(year, month, *conditions, params=params)
+
+        total = self._query(f"SELECT COUNT(*) FROM transactions {where}", params)[0][0]
+
+        direction = "DESC" if descending else "ASC"
+        if sort_by == "Date":
+            order = f"Date {direction}, rowid {'ASC' if descending else 'DESC'}"
+        else:
+            order = f"{SORT_COLUMNS[sort_by]} {direction}, Date DESC, rowid ASC"
+
+        rows = self._query(
+            f"SELECT Date, Desc, Amount FROM transactions {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset])
+        page = pd.DataFrame(rows, columns=['Date', 'Desc', 'Amount'])
+        page['Date'] = pd.to_datetime(page['Date'], format='%Y-%m-%d')
+        return page, total
+
+    # --- INTERNAL HELPERS ---
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _insert(self, table: str, rows: pd.DataFrame):
+        """Inserts rows into table. Caller holds the lock and the transaction."""
+        columns = list(rows.columns)
+        self._conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            rows.itertuples(index=False, name=None))
+
+    def _record_files(self, file_stats: Dict[str, Tuple[int, float]], counts: pd.Series):
+        """Records (size, mtime, row count) of the ingested files. Caller holds the lock and the transaction."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (path, size, mtime, rows) VALUES (?, ?, ?, ?)",
+            [(p, size, mtime, int(counts.get(p, 0))) for p, (size, mtime) in file_stats.items()])
+
+    def _scope(self, condition: str, params: list, skip_reason=None) -> pd.DataFrame:
+        columns = ', '.join(STORE_COLUMNS)
+        excluded_condition = f"({condition}) AND Reason != ?" if skip_reason else condition
+        rows = self._query(
+            f"SELECT 'transactions', rowid, {columns}, NULL FROM transactions WHERE {condition} "
+            f"UNION ALL SELECT 'excluded', rowid, {columns}, Reason FROM excluded WHERE {excluded_condition} "
+            f"ORDER BY 1 DESC, 2", params + params + ([skip_reason] if skip_reason else []))
+        return _typed(pd.DataFrame(rows, columns=['_Table', '_Rowid'] + STORE_COLUMNS + ['Reason']))
+
+    def _check_meta(self):
+        """
+        Rows are stored normalized, categorized and reconciled, so a new schema, loader output, rule book
+        or reconciliation setting empties the store (the next sync refills it).
+        """
+        meta = dict(self._query("SELECT key, value FROM meta"))
+        expected = {"schema": str(SCHEMA_VERSION), "normalization": str(CACHE_VERSION), "rules": rules_fingerprint(),
+                    "reconcile": reconcile_fingerprint()}
+        if meta == expected:
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM transactions")
+            self._conn.execute("DELETE FROM excluded")
+            self._conn.execute("DELETE FROM files")
+            self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", expected.items())
+
+
+def _store_rows(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """df in the stored form: Date as ISO text, Year as text."""
+    rows = df.reindex(columns=columns)
+    return rows.assign(Date=pd.to_datetime(rows['Date']).dt.strftime('%Y-%m-%d'),
+                       Year=rows['Year'].astype(str), Month_Num=rows['Month_Num'].astype(int))
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Stored rows back in the loader's types."""
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    df['Month_Num'] = df['Month_Num'].astype('int64')
+    df['Amount'] = df['Amount'].astype(float)
+    return df
+
+
+def _period_filter(year="All Years", month="All Months", *conditions, params=None):
+    """WHERE clause and parameters of a year/month selection plus extra conditions."""
+    conditions = list(conditions)
+    params = list(params or [])
+    if year != "All Years":
+        conditions.append("Year = ?")
+        params.append(str(year))
+    if month != "All Months":
+        conditions.append("Month = ?")
+        params.append(month)
+
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    return where, params
@@ -0,0 +1,114 @@
+"""
+This file is the engine's bookmark. On shutdown it writes the master data and the aggregate cube
+to disk (Feather), together with the size/mtime of every statement file they were built from.
+
+On the next start the dashboard is served from that snapshot instead of re-ingesting the folder.
+The recorded file list is compared with the folder first: files added, changed or removed since
+then are handed back to the caller, which patches them in with the normal hot-reload path.
+A snapshot built by another loader version, with other rules, reconciliation settings or another
+schema mode is ignored.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import config
+import data_loader
+from ingest_cache import CACHE_VERSION, reconcile_fingerprint, rules_fingerprint
+
+# Bump this when the snapshot layout changes, old snapshots are then ignored
+SNAPSHOT_VERSION = 2
+META_NAME = "meta.json"
+MASTER_NAME = "master.feather"
+CUBE_NAME = "cube.feather"
+EXCLUDED_NAME = "excluded.feather"
+
+
+@dataclass
+class WarmSnapshot:
+    master_df: pd.DataFrame
+    cube_cells: pd.DataFrame
+    amount_scale: int
+    # Rows the reconciliation dropped, so hot reloads can still bring them back
+    excluded: pd.DataFrame
+    # Files that changed since the snapshot was written, to be re-ingested by the caller
+    changed_files: List[str]
+    removed_files: List[str]
+    # (size, mtime) per file as the snapshot's rows were built from it
+    file_stats: Dict[str, Tuple[int, float]]
+
+
+def save(folder: str, master_df: pd.DataFrame, cube_cells: pd.DataFrame, excluded: pd.DataFrame,
+         amount_scale: int, data_folder: str, file_stats: Dict[str, Tuple[int, float]]):
+    """
+    Writes the snapshot. The meta file goes last, so a half-written snapshot is never picked up.
+    file_stats: (size, mtime) of the files master_df was built from, taken when they were read.
+    A file changed since then (or never read) is re-ingested by the next load.
+    """
+    os.makedirs(folder, exist_ok=True)
+    meta_path = os.path.join(folder, META_NAME)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    # Feather wants a default index. Row order is what matters, and it is kept
+    master_df.reset_index(drop=True).to_feather(os.path.join(folder, MASTER_NAME))
+    cube_cells.reset_index(drop=True).to_feather(os.path.join(folder, CUBE_NAME))
+    excluded.reset_index(drop=True).to_feather(os.path.join(folder, EXCLUDED_NAME))
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "normalization": CACHE_VERSION,
+        "rules": rules_fingerprint(),
+        "reconcile": reconcile_fingerprint(),
+        "amount_scale": amount_scale,
+        "data_folder": os.path.abspath(data_folder),
+        "files": file_stats,
+    }
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, meta_path)
+
+def load(folder: str, data_folder: str, data_files: List[str]) -> Optional[WarmSnapshot]:
+    """Returns the snapshot if it was built from this folder with the current rules and schema, else None."""
+    try:
+        with open(os.path.join(folder, META_NAME), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    amount_scale = data_loader.AMOUNT_SCALE if config.COMPACT_SCHEMA else 1
+    if (meta.get("version") != SNAPSHOT_VERSION or meta.get("normalization") != CACHE_VERSION
+            or meta.get("rules") != rules_fingerprint()
+            or meta.get("reconcile") != reconcile_fingerprint()
+            or meta.get("amount_scale") != amount_scale or meta.get("data_folder") != os.path.abspath(data_folder)):
+        return None
+
+    # Validate against the folder: anything added, touched or deleted since the snapshot is reported
+    recorded = {path: tuple(stat) for path, stat in meta["files"].items()}
+    current = _file_stats(data_files)
+    changed = sorted(p for p, stat in current.items() if recorded.get(p) != stat)
+    removed = sorted(p for p in recorded if p not in current)
+
+    try:
+        master_df = pd.read_feather(os.path.join(folder, MASTER_NAME))
+        cube_cells = pd.read_feather(os.path.join(folder, CUBE_NAME))
+        excluded = pd.read_feather(os.path.join(folder, EXCLUDED_NAME))
+    except Exception as e:
+        print(f"Warm snapshot unreadable ({e}), loading from the statement files")
+        return None
+
+    return WarmSnapshot(master_df, cube_cells, amount_scale, excluded, changed, removed, recorded)
+
+def _file_stats(file_paths: List[str]) -> Dict[str, Tuple[int, float]]:
+    stats = {}
+    for path in file_paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stats[os.path.abspath(path)] = (stat.st_size, stat.st_mtime)
+    return stats